@@ -3,14 +3,10 @@ import pathlib
 import typer
 from rich.console import Console
 
-# Import all necessary functions from your core modules
-from licensync.core.dependency_parser import load_dependencies, flatten_sbom
-from licensync.core.github_api import fetch_github_sbom, fetch_repo_license_spdx
 from licensync.core.license_utils import normalize_license
-from licensync.core.graph_tools import build_graph_recursive, show_graph
-from licensync.core.graph_tools_overlap import build_overlap_graph, draw_overlap_graph
-from licensync.core.prolog_interface import evaluate_license_pair, verdict_and_obligs, obligations_for_license
-from licensync.core.llm_explainer import generate_explanation
+
+# Core modules are imported inside each command, so `--help` and `explain` do
+# not pay for requests, networkx, matplotlib or the Prolog engine up front.
 
 # --- Create a SINGLE Typer App ---
 app = typer.Typer(help="LicenSync CLI: Analyze and explain software license compatibility.")
@@ -20,6 +16,31 @@ def _extract_license_set(flat_deps: list[tuple[str,str]]):
     """Helper function to get unique licenses from a dependency list."""
     return sorted({normalize_license(lic) for _, lic in flat_deps})
 
+def _daemon():
+    """Client for a running `licensync serve`, or None to work in-process."""
+    from licensync.core.daemon import daemon_client
+    return daemon_client()
+
+def _load_repos(repos: list[str], jurisdiction: str, gh_token: str) -> list[tuple[list[tuple[str, str]], str]]:
+    """(dependencies, normalized repo license) per repo, via the daemon when one is running."""
+    client = _daemon()
+    if client is not None:
+        from licensync.core.daemon import DaemonError
+        try:
+            scans = client.scan(repos, jurisdiction, gh_token)
+            errors = [s["error"] for s in scans if s.get("error")]
+            if not errors:
+                return [([tuple(d) for d in s["dependencies"]], s["license"]) for s in scans]
+            console.print(f"Daemon scan failed ({errors[0]}); loading in-process.", style="yellow")
+        except DaemonError as e:
+            console.print(f"{e}; loading in-process.", style="yellow")
+        finally:
+            client.close()
+
+    from licensync.core.dependency_parser import load_dependencies, load_repo_license
+    return [(load_dependencies(pathlib.Path("."), repo, gh_token),
+             normalize_license(load_repo_license(repo, gh_token) or "unknown")) for repo in repos]
+
 # --- First Command: compare ---
 @app.command(name="compare", help="Compare dependency trees of two GitHub repos and generate graphs.")
 def compare_repos(
@@ -28,20 +49,19 @@ def compare_repos(
     jurisdiction: str = typer.Option("global", "--jurisdiction", "-j", help="The legal jurisdiction for evaluation."),
     gh_token: str = typer.Option(os.getenv("GITHUB_TOKEN"), "--gh-token", help="GitHub API token."),
     save_figs: bool = typer.Option(True, help="Save dependency graphs as images."),
+    max_nodes: int = typer.Option(150, "--max-nodes", help="Collapse larger graphs into a level-of-detail summary (0 draws everything)."),
 ):
     console.print(f"Comparing repositories [bold cyan]{repo1}[/] and [bold cyan]{repo2}[/]...", style="blue")
     
-    deps1 = load_dependencies(pathlib.Path("."), repo1, gh_token)
-    deps2 = load_dependencies(pathlib.Path("."), repo2, gh_token)
+    (deps1, root1), (deps2, root2) = _load_repos([repo1, repo2], jurisdiction, gh_token)
     LA = _extract_license_set(deps1)
     LB = _extract_license_set(deps2)
-    root1 = normalize_license(fetch_repo_license_spdx(repo1, gh_token) or "unknown")
-    root2 = normalize_license(fetch_repo_license_spdx(repo2, gh_token) or "unknown")
     console.print(f"{repo1}: [bold yellow]{root1}[/] – Found {len(LA)} unique dependency licenses.")
     console.print(f"{repo2}: [bold yellow]{root2}[/] – Found {len(LB)} unique dependency licenses.")
 
     if save_figs:
         console.print("\\nGenerating dependency graphs...", style="blue")
+        from licensync.core.graph_tools import build_graph_recursive, conflict_nodes, show_graph
         figdir = pathlib.Path("figs"); figdir.mkdir(exist_ok=True)
         edges1 = [dict(name=n, license=lic, parent=repo1) for (n, lic) in deps1]
         edges2 = [dict(name=n, license=lic, parent=repo2) for (n, lic) in deps2]
@@ -49,8 +69,10 @@ def compare_repos(
         G2 = build_graph_recursive(repo2, root2, edges2)
         path1 = str(figdir / f"{repo1.replace('/','_')}_graph.png")
         path2 = str(figdir / f"{repo2.replace('/','_')}_graph.png")
-        show_graph(G1, f"{repo1} Dependency Licenses", outfile=path1)
-        show_graph(G2, f"{repo2} Dependency Licenses", outfile=path2)
+        # Conflict paths stay visible when a large graph is summarised
+        keep = lambda G: conflict_nodes(G, jurisdiction) if max_nodes and G.number_of_nodes() > max_nodes else None
+        show_graph(G1, f"{repo1} Dependency Licenses", outfile=path1, max_nodes=max_nodes, keep=keep(G1))
+        show_graph(G2, f"{repo2} Dependency Licenses", outfile=path2, max_nodes=max_nodes, keep=keep(G2))
         console.print(f"✅ Graphs saved to '{path1}' and '{path2}'")
 
 # --- Second Command: explain ---
@@ -61,14 +83,29 @@ def explain_license_pair(
     jurisdiction: str = typer.Argument(..., help="The legal jurisdiction (e.g., 'global', 'us', 'eu').")
 ):
     """Provides a detailed explanation for the compatibility of two licenses."""
+    from licensync.core.llm_explainer import generate_explanation
+
     console.print(f"Analyzing: [bold cyan]{lic1}[/] vs. [bold cyan]{lic2}[/] in jurisdiction [bold green]{jurisdiction}[/]", justify="center")
     
     
-    verdict, obligs1, obligs2 = verdict_and_obligs(lic1, lic2, jurisdiction)
-    
-    response = evaluate_license_pair(lic1, lic2, jurisdiction)
-    risk = response.get("risk", "undefined")
- 
+    response = None
+    client = _daemon()
+    if client is not None:
+        from licensync.core.daemon import DaemonError
+        try:
+            verdict = client.evaluate([(lic1, lic2, jurisdiction)])[0]
+            obligs = client.obligations([lic1, lic2], jurisdiction)
+            response = {"result": verdict.get("result", "unknown_license"), "risk": verdict.get("risk", "undefined"),
+                        "obligations1": obligs[lic1], "obligations2": obligs[lic2]}
+        except DaemonError as e:
+            console.print(f"{e}; evaluating in-process.", style="yellow")
+        finally:
+            client.close()
+    if response is None:
+        from licensync.core.prolog_interface import evaluate_with_obligations
+        response = evaluate_with_obligations(lic1, lic2, jurisdiction)
+    verdict, risk = response["result"], response["risk"]
+    obligs1, obligs2 = response["obligations1"], response["obligations2"]
 
     verdict_style = "bold green" if verdict == "ok" else "bold red"
     console.print(f"\\nVerdict: [{verdict_style}]{verdict.upper()}[/] | Assessed Risk: [yellow]{risk.capitalize()}[/]")
@@ -99,11 +136,9 @@ def overlap_graphs(
     gh_token: str = typer.Option(os.getenv("GITHUB_TOKEN"), "--gh-token", help="GitHub API token."),
 ):
     console.print(f"Generating overlap graph for [bold cyan]{repo1}[/] and [bold cyan]{repo2}[/]...", style="blue")
-    root1_lic = normalize_license(fetch_repo_license_spdx(repo1, gh_token) or "unknown")
-    root2_lic = normalize_license(fetch_repo_license_spdx(repo2, gh_token) or "unknown")
+    (deps1, root1_lic), (deps2, root2_lic) = _load_repos([repo1, repo2], "global", gh_token)
     roots = [(repo1, root1_lic), (repo2, root2_lic)]
-    deps1 = load_dependencies(pathlib.Path("."), repo1, gh_token)
-    deps2 = load_dependencies(pathlib.Path("."), repo2, gh_token)
+    from licensync.core.graph_tools_overlap import build_overlap_graph, draw_overlap_graph
     
     all_edges = []
     all_edges.extend([{"name": name, "license": license, "parent": repo1} for name, license in deps1])
@@ -115,6 +150,16 @@ def overlap_graphs(
     draw_overlap_graph(G, title=f"Dependency Overlap: {repo1} vs {repo2}", outfile=out_path)
     console.print(f"✅ Overlap graph saved to '{out_path}'")
 
+# --- Fourth Command: serve ---
+@app.command(name="serve", help="Run a local daemon that keeps the rules engine and caches warm for other commands.")
+def serve_daemon(
+    address: str = typer.Option(None, "--address", "-a", help="unix:/path or host:port (default: LICENSYNC_DAEMON_ADDR or a 0600 socket in the cache dir)."),
+    scan_workers: int = typer.Option(8, "--scan-workers", help="Repos scanned concurrently."),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Log every request."),
+):
+    from licensync.core.daemon import DEFAULT_ADDR, serve
+    serve(address or DEFAULT_ADDR, scan_workers=scan_workers, verbose=verbose)
+
 # --- Main execution block ---
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -1,10 +1,9 @@
 import pathlib, typer
 from typing import Optional, List, Tuple, Dict
 
-from licensync.core.dependency_parser import load_dependencies, flatten_sbom
-from licensync.core.github_api import fetch_github_sbom, fetch_repo_license_spdx
+from licensync.core.dependency_parser import load_dependency_edges, load_repo_license
 from licensync.core.license_utils import normalize_license
-from licensync.core.graph_tools_overlap import build_overlap_graph, draw_overlap_graph
+from licensync.core.graph_tools_overlap import build_overlap_graph, draw_overlap_graph, find_transitive_conflicts
 
 app = typer.Typer(help="Draw a single, merged dependency graph for two repos.")
 
@@ -24,22 +23,12 @@ def main(
     figdir.mkdir(parents=True, exist_ok=True)
 
     def _edges_for(repo: str) -> Tuple[str, List[Dict]]:
-        edges: List[Dict] = []
-        lic = "unknown"
-        # Try SBOM first
-        try:
-            sbom = fetch_github_sbom(repo, gh_token)
-            edges = flatten_sbom(repo, sbom)
-        except Exception:
-            pass
-        # Fallback to requirement/pyproject parsing
-        if not edges:
-
-            deps = load_dependencies(pathlib.Path("."), gh_repo=repo, gh_token=gh_token)
-            edges = [dict(parent=repo, name=n, license=normalize_license(lic)) for (n, lic) in deps]
+        # SBOM first, manifest parsing as fallback; both are cached per commit,
+        # so the SBOM is fetched at most once.
+        edges = load_dependency_edges(repo, gh_token)
         # Repo license for root node
         try:
-            lic = normalize_license(fetch_repo_license_spdx(repo, gh_token))
+            lic = normalize_license(load_repo_license(repo, gh_token))
         except Exception:
             lic = "unknown"
         return lic, edges
@@ -54,5 +43,11 @@ def main(
     outfile = str(out or (figdir / f"{repo1.replace('/','_')}__{repo2.replace('/','_')}_overlap.png"))
     draw_overlap_graph(G, title=title, outfile=outfile)
 
+    # Transitive conflicts: dependencies clashing with the root or any ancestor
+    for root, conflicts in find_transitive_conflicts(G, j).items():
+        print(f"{root}: {len(conflicts)} transitive conflict(s) under '{j}'")
+        for c in conflicts:
+            print(f"  {c['ancestor_license']} -> {c['license']} ({c['risk']}): {' -> '.join(c['path'])}")
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,261 @@
+# In licensync/core/cache.py
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Root for everything LicenSync keeps on disk between runs (compiled rules,
+# HTTP validators, fetched SBOMs, ...). Override with LICENSYNC_CACHE_DIR.
+CACHE_DIR = Path(os.getenv("LICENSYNC_CACHE_DIR", Path.home() / ".cache" / "licensync"))
+
+REPO_CACHE_MAX_BYTES = int(os.getenv("LICENSYNC_CACHE_MAX_MB", "512")) * 1024 * 1024
+REF_TTL_SECONDS = float(os.getenv("LICENSYNC_REF_TTL", "3600"))
+# Packages no source knew a license for are asked again after this long
+UNKNOWN_LICENSE_TTL = float(os.getenv("LICENSYNC_UNKNOWN_LICENSE_TTL", str(7 * 24 * 3600)))
+
+_COMMIT_RE = re.compile(r"^[0-9a-f]{40}$")
+
+def is_commit_sha(ref: Optional[str]) -> bool:
+    return bool(ref and _COMMIT_RE.match(ref))
+
+def _slug(owner_repo: str) -> str:
+    return owner_repo.replace("/", "__")
+
+def atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class LRUBudget:
+    """
+    Byte budget for the files matching `pattern` under `root`, least recently
+    modified evicted first. The running total is seeded by one directory scan
+    on first use and then kept up to date by add(), so a write only rescans
+    the directory when it pushes the total past `max_bytes`. Eviction goes
+    down to `low_water` of the budget, so rescans stay rare once it is full.
+    """
+
+    low_water = 0.9
+
+    def __init__(self, root: Path, pattern: str, max_bytes: int):
+        self.root = Path(root)
+        self.pattern = pattern
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+
+    def _scan(self):
+        entries = []
+        for p in self.root.glob(self.pattern):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        return entries
+
+    def add(self, nbytes: int) -> None:
+        """Records `nbytes` newly written and evicts if the budget is exceeded."""
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, size, _ in self._scan())
+            else:
+                self._total += nbytes
+            if self._total <= self.max_bytes:
+                return
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * self.low_water)
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+            self._total = total
+
+
+class RepoCache:
+    """
+    Content-addressed on-disk cache for per-commit artefacts: raw SBOM JSON,
+    manifest blobs, flattened edges, the repo license.
+
+    Values are stored once as gzip-compressed JSON named by the sha256 of
+    their content, and an index maps (owner/repo, commit, kind) to that
+    digest. A commit never changes, so entries for it never go stale. Unpinned
+    refs such as HEAD are resolved to a commit, and that resolution is reused
+    for `ref_ttl` seconds. Object storage is capped at `max_bytes`; the least
+    recently used objects are evicted first.
+    """
+
+    def __init__(self,
+                 root: Path = CACHE_DIR / "repos",
+                 max_bytes: int = REPO_CACHE_MAX_BYTES,
+                 ref_ttl: float = REF_TTL_SECONDS):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ref_ttl = ref_ttl
+        self._budget = LRUBudget(self.root / "objects", "*/*.json.gz", max_bytes)
+
+    # --- paths ---
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.json.gz"
+
+    def _index_path(self, owner_repo: str, commit: str, kind: str) -> Path:
+        return self.root / "index" / _slug(owner_repo) / commit / hashlib.sha1(kind.encode()).hexdigest()
+
+    def _ref_path(self, owner_repo: str, ref: str) -> Path:
+        return self.root / "refs" / _slug(owner_repo) / hashlib.sha1(ref.encode()).hexdigest()
+
+    # --- refs ---
+    def resolve(self, owner_repo: str, ref: str, resolver: Callable[[], Optional[str]]) -> Optional[str]:
+        """Commit SHA for `ref`; pinned SHAs pass through, others are cached for ref_ttl."""
+        if is_commit_sha(ref):
+            return ref
+        path = self._ref_path(owner_repo, ref)
+        try:
+            entry = json.loads(path.read_text())
+            if time.time() - entry["resolved_at"] < self.ref_ttl:
+                return entry["sha"]
+        except (OSError, ValueError, KeyError):
+            pass
+        sha = resolver()
+        if is_commit_sha(sha):
+            atomic_write(path, json.dumps({"ref": ref, "sha": sha, "resolved_at": time.time()}).encode())
+            return sha
+        return None
+
+    # --- values ---
+    def get(self, owner_repo: str, commit: str, kind: str) -> Optional[Any]:
+        try:
+            digest = self._index_path(owner_repo, commit, kind).read_text().strip()
+            obj = self._object_path(digest)
+            value = json.loads(gzip.decompress(obj.read_bytes()))
+        except (OSError, ValueError, EOFError):
+            return None
+        try:
+            os.utime(obj)  # mark as recently used
+        except OSError:
+            pass
+        return value
+
+    def put(self, owner_repo: str, commit: str, kind: str, value: Any) -> None:
+        raw = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        obj = self._object_path(digest)
+        written = 0
+        try:
+            if obj.exists():
+                os.utime(obj)
+            else:
+                data = gzip.compress(raw, compresslevel=6)
+                atomic_write(obj, data)
+                written = len(data)
+            atomic_write(self._index_path(owner_repo, commit, kind), digest.encode())
+        except OSError as e:
+            print(f"Warning: could not write cache entry {owner_repo}@{commit[:7]} {kind}: {e}")
+            return
+        self._budget.add(written)
+
+    def get_or_fetch(self, owner_repo: str, commit: Optional[str], kind: str, fetch: Callable[[], Any]) -> Any:
+        """Cached value for (repo, commit, kind), calling `fetch` on a miss. No commit, no caching."""
+        if commit is None:
+            return fetch()
+        value = self.get(owner_repo, commit, kind)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.put(owner_repo, commit, kind, value)
+        return value
+
+
+_repo_cache: Optional[RepoCache] = None
+_repo_cache_lock = threading.Lock()
+
+def get_repo_cache() -> RepoCache:
+    global _repo_cache
+    if _repo_cache is None:
+        with _repo_cache_lock:
+            if _repo_cache is None:
+                _repo_cache = RepoCache()
+    return _repo_cache
+
+
+class PackageLicenseCache:
+    """
+    Persistent (ecosystem, package) -> license map in one SQLite file, shared
+    by every enrichment run. Known licenses are kept for good; "unknown"
+    answers expire after `unknown_ttl` so new registry data is picked up.
+    """
+
+    def __init__(self,
+                 path: Path = CACHE_DIR / "package_licenses.sqlite",
+                 unknown_ttl: float = UNKNOWN_LICENSE_TTL):
+        self.path = Path(path)
+        self.unknown_ttl = unknown_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS package_license ("
+            " ecosystem TEXT NOT NULL, name TEXT NOT NULL, license TEXT NOT NULL,"
+            " source TEXT, fetched_at REAL NOT NULL, PRIMARY KEY (ecosystem, name))")
+        self._db.commit()
+
+    def get(self, ecosystem: str, name: str) -> Optional[str]:
+        return self.get_many([(ecosystem, name)]).get((ecosystem, name))
+
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Fresh cached licenses for the keys that have one."""
+        keys = list(dict.fromkeys(keys))
+        cutoff = time.time() - self.unknown_ttl
+        out: Dict[Tuple[str, str], str] = {}
+        with self._lock:
+            for i in range(0, len(keys), 400):
+                chunk = keys[i:i + 400]
+                where = " OR ".join("(ecosystem=? AND name=?)" for _ in chunk)
+                params = [v for key in chunk for v in key]
+                for eco, name, lic, fetched_at in self._db.execute(
+                        f"SELECT ecosystem, name, license, fetched_at FROM package_license WHERE {where}", params):
+                    if lic != "unknown" or fetched_at >= cutoff:
+                        out[(eco, name)] = lic
+        return out
+
+    def put(self, ecosystem: str, name: str, license: str, source: str = "") -> None:
+        self.put_many([(ecosystem, name, license, source)])
+
+    def put_many(self, rows: Iterable[Tuple[str, str, str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO package_license VALUES (?, ?, ?, ?, ?)",
+                [(eco, name, lic or "unknown", source, now) for eco, name, lic, source in rows])
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_package_cache: Optional[PackageLicenseCache] = None
+_package_cache_lock = threading.Lock()
+
+def get_package_license_cache() -> PackageLicenseCache:
+    global _package_cache
+    if _package_cache is None:
+        with _package_cache_lock:
+            if _package_cache is None:
+                _package_cache = PackageLicenseCache()
+    return _package_cache
@@ -0,0 +1,241 @@
+# In licensync/core/compact_graph.py
+
+"""
+Array-backed dependency graph for the analysis paths.
+
+Node names are interned to dense ints, licenses are stored as license_id()
+ints, and adjacency is kept in CSR form (indptr/indices), so a node costs a
+few bytes plus its name and an edge costs one int32. networkx is only needed
+to draw; convert with to_networkx(). graph_tools_overlap.find_transitive_conflicts
+runs on either kind, so whole edge dumps can be analysed without networkx:
+
+  G = CompactGraph.from_csv("data/edges")
+  report = find_transitive_conflicts(G, "eu")
+"""
+
+from __future__ import annotations
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .edge_stream import iter_edge_batches
+from .license_utils import UNKNOWN_ID, license_atom, license_id
+
+
+class CompactGraph:
+    """Immutable directed graph; node i is names[i], its license is license_ids[i]."""
+
+    def __init__(self,
+                 names: List[str],
+                 license_ids: np.ndarray,
+                 indptr: np.ndarray,
+                 indices: np.ndarray,
+                 is_root: Optional[np.ndarray] = None):
+        self.names = names
+        self.license_ids = license_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.is_root = is_root if is_root is not None else np.zeros(len(names), dtype=bool)
+        self._index: Optional[Dict[str, int]] = None
+
+    # --- size / lookup ---
+    def number_of_nodes(self) -> int:
+        return len(self.names)
+
+    def number_of_edges(self) -> int:
+        return int(self.indptr[-1])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    @property
+    def index(self) -> Dict[str, int]:
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self.names)}
+        return self._index
+
+    def node_id(self, name: str) -> int:
+        return self.index[name]
+
+    def license(self, node: Union[str, int]) -> str:
+        i = self.node_id(node) if isinstance(node, str) else node
+        return license_atom(int(self.license_ids[i]))
+
+    def roots(self) -> List[str]:
+        return [self.names[i] for i in np.flatnonzero(self.is_root)]
+
+    # --- adjacency ---
+    def successors(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degree(self) -> np.ndarray:
+        return np.bincount(self.indices, minlength=len(self.names))
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(src, dst) int arrays, one entry per edge."""
+        src = np.repeat(np.arange(len(self.names), dtype=np.int32), self.out_degree())
+        return src, self.indices
+
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        src, dst = self.edge_arrays()
+        names = self.names
+        for u, v in zip(src.tolist(), dst.tolist()):
+            yield names[u], names[v]
+
+    def reverse(self) -> "CompactGraph":
+        src, dst = self.edge_arrays()
+        return _from_arrays(self.names, self.license_ids, dst, src, self.is_root)
+
+    def topological_order(self) -> Optional[np.ndarray]:
+        """Kahn's algorithm over the CSR arrays; None if the graph has a cycle."""
+        indeg = self.in_degree()
+        order = np.empty(len(self.names), dtype=np.int32)
+        stack = np.flatnonzero(indeg == 0).tolist()
+        k = 0
+        indptr, indices = self.indptr, self.indices
+        while stack:
+            u = stack.pop()
+            order[k] = u; k += 1
+            for v in indices[indptr[u]:indptr[u + 1]].tolist():
+                indeg[v] -= 1
+                if indeg[v] == 0:
+                    stack.append(v)
+        return order if k == len(self.names) else None
+
+    # --- construction ---
+    @classmethod
+    def from_edges(cls,
+                   edges: Iterable[Dict],
+                   root: Optional[str] = None,
+                   root_license: Optional[str] = None,
+                   attach_orphans: bool = True) -> "CompactGraph":
+        """
+        Same input and shape as graph_tools.build_graph_recursive: `edges` are
+        flatten_sbom dicts (name, license, parent). With `attach_orphans`, nodes
+        nobody depends on hang off `root`. Without a root, an edge with no
+        parent only adds its child node.
+        """
+        b = GraphBuilder()
+        if root is not None:
+            b.add_node(root, root_license, is_root=True)
+        for e in edges:
+            name = e.get("name")
+            if not name:
+                continue
+            parent = e.get("parent") or root
+            if parent is None:
+                b.add_node(name, e.get("license"))
+                continue
+            b.add_edge(parent, name, lic_child=e.get("license"))
+        return b.build(attach_orphans_to=root if attach_orphans else None)
+
+    @classmethod
+    def from_csv(cls, paths: Union[str, Path, Iterable[Union[str, Path]]]) -> "CompactGraph":
+        """
+        Loads edges CSVs (repo, sha, parent, child, lic_parent, lic_child),
+        directories of them or ALL_EDGES.txt into a single graph. Each `repo`
+        is a root, linked to its top-level packages: the parents that are
+        never a child within that repo.
+        """
+        b = GraphBuilder()
+        parents: Dict[int, set] = {}
+        children: Dict[int, set] = {}
+        for batch in iter_edge_batches(paths, require=("parent", "child")):
+            for repo, p, c, lp, lc in zip(batch["repo"], batch["parent"], batch["child"],
+                                          batch["lic_parent"], batch["lic_child"]):
+                if not (p and c):
+                    continue
+                b.add_edge(p, c, lp, lc)
+                if repo:
+                    r = b.add_node(repo, is_root=True)
+                    parents.setdefault(r, set()).add(b.index[p])
+                    children.setdefault(r, set()).add(b.index[c])
+        for r, ps in parents.items():
+            for top in ps - children[r] - {r}:
+                b.src.append(r)
+                b.dst.append(top)
+        return b.build()
+
+    @classmethod
+    def from_networkx(cls, G) -> "CompactGraph":
+        b = GraphBuilder()
+        for n, d in G.nodes(data=True):
+            b.add_node(n, d.get("license"), is_root=bool(d.get("is_root")))
+        for u, v in G.edges():
+            b.add_edge(u, v)
+        return b.build()
+
+    def to_networkx(self):
+        import networkx as nx
+        G = nx.DiGraph()
+        for i, name in enumerate(self.names):
+            G.add_node(name, license=license_atom(int(self.license_ids[i])), is_root=bool(self.is_root[i]))
+        G.add_edges_from(self.edges())
+        return G
+
+
+class GraphBuilder:
+    """Accumulates nodes and edges into flat int arrays, then freezes them as a CompactGraph."""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.license_ids = array("i")
+        self.roots = set()
+        self.src = array("i")
+        self.dst = array("i")
+
+    def add_node(self, name: str, lic: Optional[str] = None, is_root: bool = False) -> int:
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.license_ids.append(license_id(lic) if lic else UNKNOWN_ID)
+        elif lic and self.license_ids[i] == UNKNOWN_ID:
+            # First known license wins, as in build_overlap_graph
+            self.license_ids[i] = license_id(lic)
+        if is_root:
+            self.roots.add(i)
+        return i
+
+    def add_edge(self, parent: str, child: str,
+                 lic_parent: Optional[str] = None, lic_child: Optional[str] = None) -> None:
+        self.src.append(self.add_node(parent, lic_parent))
+        self.dst.append(self.add_node(child, lic_child))
+
+    def build(self, attach_orphans_to: Optional[str] = None) -> CompactGraph:
+        # Copies, so the builder's arrays can still grow after build()
+        src = np.array(self.src, dtype=np.int32)
+        dst = np.array(self.dst, dtype=np.int32)
+        if attach_orphans_to is not None:
+            r = self.add_node(attach_orphans_to)
+            has_parent = np.zeros(len(self.names), dtype=bool)
+            has_parent[dst] = True
+            orphans = np.flatnonzero(~has_parent)
+            orphans = orphans[orphans != r].astype(np.int32)
+            src = np.concatenate([src, np.full(len(orphans), r, dtype=np.int32)])
+            dst = np.concatenate([dst, orphans])
+        is_root = np.zeros(len(self.names), dtype=bool)
+        is_root[list(self.roots)] = True
+        lic = np.array(self.license_ids, dtype=np.int32)
+        return _from_arrays(self.names, lic, src, dst, is_root)
+
+
+def _from_arrays(names: List[str], license_ids: np.ndarray,
+                 src: np.ndarray, dst: np.ndarray, is_root: np.ndarray) -> CompactGraph:
+    """CSR from edge lists; duplicate edges are dropped and successors are sorted."""
+    n = len(names)
+    if len(src):
+        key = np.unique(src.astype(np.int64) * max(n, 1) + dst)
+        src, dst = (key // max(n, 1)).astype(np.int32), (key % max(n, 1)).astype(np.int32)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return CompactGraph(names, license_ids, indptr, np.ascontiguousarray(dst, dtype=np.int32), is_root)
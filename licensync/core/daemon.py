@@ -0,0 +1,538 @@
+# In licensync/core/daemon.py
+
+"""
+`licensync serve`: a long-running local service that keeps the compiled rules,
+the obligations index, the license normaliser, the repo cache and pooled
+GitHub connections warm across calls.
+
+Routes (JSON in, JSON out):
+
+  GET  /health       liveness, pid, uptime, what is warm
+  GET  /metrics      per-route counts, errors and latency percentiles
+  POST /evaluate     {"pairs": [[lic1, lic2(, juris)], ...], "jurisdiction"}
+  POST /obligations  {"licenses": [...], "jurisdiction"}
+  POST /scan         {"repos": ["owner/repo" | {"repo", "local"}], "jurisdiction", "gh_token"}
+
+By default the server listens on a 0600 Unix socket under CACHE_DIR; a
+host:port address can be given instead. Every route but /health needs the
+shared secret from TOKEN_FILE (0600, created by `serve`) as a bearer token;
+POSTs must be application/json and the Host header must be local, so a web
+page cannot reach the daemon. Clients first check that the daemon can prove
+it holds the secret (an HMAC over a nonce sent to /health) before sending the
+secret or a GitHub token.
+
+Requests are handled on their own threads; the Prolog engine is already
+serialised by prolog_interface. DaemonClient is the thin client the CLI
+commands use when a daemon answers at LICENSYNC_DAEMON_ADDR. Only the stdlib
+is imported here, so probing for a daemon costs the CLI nothing.
+"""
+
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import pathlib
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .cache import CACHE_DIR
+
+DEFAULT_ADDR = os.getenv("LICENSYNC_DAEMON_ADDR") or f"unix:{CACHE_DIR / 'daemon.sock'}"
+TOKEN_FILE = pathlib.Path(os.getenv("LICENSYNC_DAEMON_TOKEN_FILE", CACHE_DIR / "daemon.token"))
+# Set to "off" to make the CLI ignore a running daemon
+DAEMON_MODE = os.getenv("LICENSYNC_DAEMON", "auto")
+SCAN_WORKERS = int(os.getenv("LICENSYNC_SCAN_WORKERS", "8"))
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# Latency samples kept per route for the percentiles in /metrics
+LATENCY_WINDOW = 2048
+
+Address = Union[Tuple[str, int], str]
+
+
+def parse_address(addr: str) -> Address:
+    """'host:port' -> (host, port); 'unix:/path' -> '/path'."""
+    if addr.startswith("unix:"):
+        return addr[len("unix:"):]
+    host, _, port = addr.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+class DaemonError(Exception):
+    """The daemon could not be reached or answered with an error."""
+
+
+# --- Shared secret ---
+
+CHALLENGE_HEADER = "X-Licensync-Challenge"
+PROOF_HEADER = "X-Licensync-Proof"
+_LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+def ensure_secret(path: pathlib.Path = TOKEN_FILE) -> str:
+    """The daemon secret, created 0600 on first use."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        os.chmod(path, 0o600)
+    else:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(secrets.token_urlsafe(32))
+    secret = path.read_text().strip()
+    if not secret:
+        raise ValueError(f"empty daemon secret in {path}")
+    return secret
+
+
+def read_secret(path: pathlib.Path = TOKEN_FILE) -> Optional[str]:
+    """The daemon secret, or None if missing or readable/writable by others."""
+    try:
+        st = path.stat()
+        if st.st_mode & 0o077 or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+            return None
+        return path.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def proof(secret: str, nonce: str) -> str:
+    return hmac.new(secret.encode(), f"licensync-daemon:{nonce}".encode(), hashlib.sha256).hexdigest()
+
+
+def _is_local_host(host: Optional[str]) -> bool:
+    if not host:
+        return False
+    host = host.strip()
+    if host.startswith("["):  # [::1]:port
+        host = host[1:].split("]", 1)[0]
+    elif host.count(":") == 1:
+        host = host.split(":", 1)[0]
+    return host.lower() in _LOCAL_HOSTS
+
+
+# --- Work ---
+
+def warm() -> Dict[str, bool]:
+    """Loads everything a request would otherwise load on first use."""
+    from . import prolog_interface, dependency_parser, github_api  # noqa: F401
+    status = {}
+    for name, load in (("matrix", prolog_interface.compatibility_matrix),
+                       ("obligations", prolog_interface.obligations_index),
+                       ("github", github_api.get_client)):
+        try:
+            load()
+            status[name] = True
+        except Exception as e:
+            print(f"Warning: could not warm {name}: {e}")
+            status[name] = False
+    return status
+
+
+def _list_field(body: Dict, key: str) -> List:
+    value = body.get(key) or []
+    if not isinstance(value, list):
+        raise ValueError(f"'{key}' must be a list")
+    return value
+
+
+def evaluate(body: Dict) -> Dict:
+    from .prolog_interface import evaluate_pairs
+    pairs = _list_field(body, "pairs")
+    if not all(isinstance(p, list) and 2 <= len(p) <= 3 for p in pairs):
+        raise ValueError("each pair must be [lic1, lic2] or [lic1, lic2, jurisdiction]")
+    return {"results": evaluate_pairs(pairs, body.get("jurisdiction") or "global")}
+
+
+def obligations(body: Dict) -> Dict:
+    from .prolog_interface import obligations_for_licenses
+    lics = _list_field(body, "licenses")
+    return {"obligations": obligations_for_licenses(lics, body.get("jurisdiction") or "global")}
+
+
+def scan_repo(repo: str, jurisdiction: str, gh_token: Optional[str],
+              local: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Dependencies and repo license for one repo (or local checkout), plus the
+    verdict of the repo license against each distinct dependency license.
+    """
+    from .dependency_parser import load_dependencies, load_repo_license
+    from .license_utils import normalize_license
+    from .prolog_interface import evaluate_pairs
+
+    if local:
+        deps = load_dependencies(pathlib.Path(local), "", gh_token)
+        lic = "unknown"
+    else:
+        deps = load_dependencies(pathlib.Path("."), repo, gh_token)
+        lic = normalize_license(load_repo_license(repo, gh_token) or "unknown")
+    dep_lics = sorted({normalize_license(l) for _, l in deps})
+    verdicts = evaluate_pairs([(lic, l) for l in dep_lics], jurisdiction)
+    return {
+        "repo": repo,
+        "license": lic,
+        "dependencies": [list(d) for d in deps],
+        "verdicts": [dict(v, license=l) for l, v in zip(dep_lics, verdicts)],
+    }
+
+
+def scan(body: Dict, pool: ThreadPoolExecutor) -> Dict:
+    jurisdiction = body.get("jurisdiction") or "global"
+    gh_token = body.get("gh_token") or os.getenv("GITHUB_TOKEN")
+    items = [r if isinstance(r, dict) else {"repo": r} for r in _list_field(body, "repos")]
+
+    def one(item: Dict) -> Dict:
+        repo = item.get("repo") or item.get("local") or ""
+        try:
+            return scan_repo(repo, jurisdiction, gh_token, item.get("local"))
+        except Exception as e:
+            return {"repo": repo, "error": f"{type(e).__name__}: {e}"}
+
+    return {"results": list(pool.map(one, items))}
+
+
+# --- Server ---
+
+class Metrics:
+    """Request counters and latency windows per route."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self.in_flight = 0
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, route: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            r = self._routes.setdefault(route, {"count": 0, "errors": 0, "seconds": 0.0,
+                                                "latency": deque(maxlen=LATENCY_WINDOW)})
+            r["count"] += 1
+            r["errors"] += not ok
+            r["seconds"] += seconds
+            r["latency"].append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {}
+            for name, r in self._routes.items():
+                lat = sorted(r["latency"])
+                pct = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 3) if lat else None
+                routes[name] = {"count": r["count"], "errors": r["errors"],
+                                "total_s": round(r["seconds"], 3),
+                                "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+            return {"uptime_s": round(time.time() - self.started, 1),
+                    "in_flight": self.in_flight, "routes": routes}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "licensync"
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, method: str) -> None:
+        state = self.server.state
+        route = f"{method} {self.path.split('?', 1)[0]}"
+        state.metrics.begin()
+        t0 = time.perf_counter()
+        status, headers = 500, {}
+        try:
+            status, payload = self._check(method, route, state)
+            if status == 200:
+                status, payload = self._dispatch(method, route, state, headers)
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            payload = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            # Unknown paths share one bucket so /metrics stays bounded
+            known = route in state.routes or route in ("GET /health", "GET /metrics")
+            state.metrics.end(route if known else "other", time.perf_counter() - t0, status < 400)
+        if status >= 400:
+            # The body of a rejected request may be unread
+            self.close_connection = True
+            headers["Connection"] = "close"
+        self._reply(status, payload, headers)
+
+    def _check(self, method: str, route: str, state: "ServerState") -> Tuple[int, Dict]:
+        """Rejects requests a browser page or another user could have sent."""
+        if not _is_local_host(self.headers.get("Host")):
+            return 403, {"error": "non-local Host header"}
+        if route == "GET /health":
+            return 200, {}
+        token = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(token.encode(), f"Bearer {state.secret}".encode()):
+            return 401, {"error": f"missing or wrong daemon secret (see {TOKEN_FILE})"}
+        if method == "POST":
+            ctype = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+            if ctype != "application/json":
+                return 415, {"error": "Content-Type must be application/json"}
+        return 200, {}
+
+    def _dispatch(self, method: str, route: str, state: "ServerState",
+                  headers: Dict[str, str]) -> Tuple[int, Dict]:
+        if route == "GET /health":
+            nonce = self.headers.get(CHALLENGE_HEADER)
+            if nonce:
+                headers[PROOF_HEADER] = proof(state.secret, nonce)
+            return 200, {"status": "ok", "pid": os.getpid(), "warm": state.warm,
+                         "uptime_s": round(time.time() - state.metrics.started, 1)}
+        if route == "GET /metrics":
+            return 200, state.metrics.snapshot()
+        handler = state.routes.get(route)
+        if handler is None:
+            return 404, {"error": f"no route {route}"}
+        return 200, handler(self._body())
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"request body over {MAX_BODY_BYTES} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise ValueError("request body must be a JSON object")
+        return body
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def address_string(self) -> str:
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.state.verbose:
+            super().log_message(format, *args)
+
+
+class _TCPHandler(_Handler):
+    # Headers and body go out as separate writes; without this, small replies
+    # on keep-alive connections wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+
+class ServerState:
+    def __init__(self, secret: str, scan_workers: int = SCAN_WORKERS, verbose: bool = False):
+        self.secret = secret
+        self.metrics = Metrics()
+        self.verbose = verbose
+        self.warm: Dict[str, bool] = {}
+        self.pool = ThreadPoolExecutor(max_workers=max(1, scan_workers), thread_name_prefix="scan")
+        self.routes = {
+            "POST /evaluate": evaluate,
+            "POST /obligations": obligations,
+            "POST /scan": lambda body: scan(body, self.pool),
+        }
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _bind_unix(path: str) -> _UnixServer:
+    """Binds a 0600 socket at `path`, replacing a stale one but not a live daemon."""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError(f"a daemon is already listening on {path}")
+        finally:
+            probe.close()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    old_umask = os.umask(0o177)  # no window in which others can connect
+    try:
+        server = _UnixServer(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    os.chmod(path, 0o600)
+    return server
+
+
+def make_server(addr: str = DEFAULT_ADDR, scan_workers: int = SCAN_WORKERS, verbose: bool = False,
+                secret: Optional[str] = None):
+    """A bound, not yet serving, server; serve_forever() on the result runs it."""
+    where = parse_address(addr)
+    if isinstance(where, str):
+        server = _bind_unix(where)
+    else:
+        server = _TCPServer(where, _TCPHandler)
+    server.state = ServerState(secret or ensure_secret(), scan_workers, verbose)
+    return server
+
+
+def serve(addr: str = DEFAULT_ADDR, scan_workers: int = SCAN_WORKERS, verbose: bool = False) -> None:
+    server = make_server(addr, scan_workers, verbose)
+    print("Warming up rules engine and caches...")
+    server.state.warm = warm()
+    print(f"licensync daemon listening on {addr} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.state.pool.shutdown(wait=False)
+        if isinstance(parse_address(addr), str):
+            try:
+                os.unlink(parse_address(addr))
+            except OSError:
+                pass
+
+
+# --- Client ---
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonClient:
+    """
+    Blocking client for a running daemon; one connection, reused across
+    calls. Each new connection first has the daemon prove it knows the
+    secret, so nothing is sent to an impostor bound to the same address.
+    Raises DaemonError when the daemon is gone, fails that check or answers
+    an error.
+    """
+
+    def __init__(self, addr: str = DEFAULT_ADDR, secret: Optional[str] = None, timeout: float = 600.0):
+        self.addr = addr
+        self.secret = secret or read_secret()
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is not None and self._conn.sock is None:
+            self.close()  # dropped; the new connection must be verified again
+        if self._conn is None:
+            if not self.secret:
+                raise DaemonError(f"no usable daemon secret at {TOKEN_FILE}")
+            where = parse_address(self.addr)
+            if isinstance(where, str):
+                conn = _UnixHTTPConnection(where, self.timeout)
+            else:
+                conn = http.client.HTTPConnection(*where, timeout=self.timeout)
+            self._verify(conn)
+            conn.auto_open = 0  # never reconnect behind our back, unverified
+            self._conn = conn
+        return self._conn
+
+    def _verify(self, conn: http.client.HTTPConnection) -> None:
+        nonce = secrets.token_hex(16)
+        try:
+            conn.request("GET", "/health", headers={CHALLENGE_HEADER: nonce})
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise DaemonError(f"daemon at {self.addr} unreachable: {e}") from e
+        got = resp.getheader(PROOF_HEADER) or ""
+        if not hmac.compare_digest(got.encode(), proof(self.secret, nonce).encode()):
+            conn.close()
+            raise DaemonError(f"process at {self.addr} is not the licensync daemon (bad proof)")
+
+    def set_timeout(self, timeout: float) -> None:
+        self.timeout = timeout
+        if self._conn is not None:
+            self._conn.timeout = timeout
+            if self._conn.sock is not None:
+                self._conn.sock.settimeout(timeout)
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Dict:
+        data = json.dumps(body).encode() if body is not None else None
+        try:
+            conn = self._connection()
+            headers = {"Authorization": f"Bearer {self.secret}"}
+            if data is not None:
+                headers["Content-Type"] = "application/json"
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            payload = json.loads(resp.read() or b"{}")
+        except (OSError, http.client.HTTPException, json.JSONDecodeError) as e:
+            self.close()
+            raise DaemonError(f"daemon at {self.addr} unreachable: {e}") from e
+        if resp.status >= 400:
+            raise DaemonError(payload.get("error") or f"HTTP {resp.status}")
+        return payload
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def health(self) -> Dict:
+        return self.request("GET", "/health")
+
+    def metrics(self) -> Dict:
+        return self.request("GET", "/metrics")
+
+    def evaluate(self, pairs: Sequence[Sequence[str]], jurisdiction: str = "global") -> List[Dict[str, str]]:
+        return self.request("POST", "/evaluate", {"pairs": [list(p) for p in pairs],
+                                                  "jurisdiction": jurisdiction})["results"]
+
+    def obligations(self, licenses: Sequence[str], jurisdiction: str = "global") -> Dict[str, List[str]]:
+        return self.request("POST", "/obligations", {"licenses": list(licenses),
+                                                     "jurisdiction": jurisdiction})["obligations"]
+
+    def scan(self, repos: Sequence[Union[str, Dict]], jurisdiction: str = "global",
+             gh_token: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.request("POST", "/scan", {"repos": list(repos), "jurisdiction": jurisdiction,
+                                              "gh_token": gh_token})["results"]
+
+
+def daemon_client(addr: Optional[str] = None, probe_timeout: float = 0.25) -> Optional[DaemonClient]:
+    """
+    A client for the daemon at `addr` if one answers and proves it holds the
+    secret, else None. The verified connection is kept for later calls.
+    """
+    if DAEMON_MODE == "off":
+        return None
+    secret = read_secret()
+    if not secret:
+        return None
+    client = DaemonClient(addr or DEFAULT_ADDR, secret, timeout=probe_timeout)
+    try:
+        client.health()
+    except (DaemonError, ValueError):
+        client.close()
+        return None
+    client.set_timeout(600.0)
+    return client
@@ -1,14 +1,27 @@
 # In licensync/core/dependency_parser.py
 
 import json
+import os
 import pathlib
 import re
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 import traceback # Add traceback for better error logging
 
 # Import the necessary functions from your own project's core files
 from .license_utils import normalize_license
-from .github_api import fetch_github_sbom, fetch_text_from_repo, list_repo_tree
+from .github_api import (
+    fetch_repo_license_spdx, fetch_text_from_repo, fetch_blob_text,
+    fetch_github_sbom_edges, list_repo_tree, resolve_commit_sha,
+)
+from .cache import get_repo_cache
+from .local_deps import load_local_edges
+from .spdx_stream import iter_sbom_edges
+
+MANIFEST_SUFFIXES = ('requirements.txt', 'pyproject.toml', 'package.json')
+
+# Upper bound on manifests fetched at once in the fallback path.
+MANIFEST_WORKERS = int(os.getenv("LICENSYNC_MANIFEST_WORKERS", "8"))
 
 # --- Manifest Parsing Functions ---
 # (These functions parse the text of different dependency files)
@@ -47,93 +60,197 @@ def parse_package_json(text: str) -> List[Tuple[str, str]]:
         pass # Ignore malformed JSON
     return deps
 
-# --- Main Dependency Loading Logic ---
+def parse_manifest(path: str, content: str) -> List[Tuple[str, str]]:
+    """Parses one manifest into (name, ecosystem) pairs."""
+    if path.endswith(('requirements.txt', 'pyproject.toml')):
+        ecosystem = "pypi"
+        parsed_deps = parse_pyproject(content) if 'pyproject' in path else parse_requirements_text(content)
+    elif path.endswith('package.json'):
+        ecosystem = "npm"
+        parsed_deps = parse_package_json(content)
+    else:
+        return []
+    return [(name, ecosystem) for name, _ in parsed_deps]
 
-def load_dependencies(local_path: Optional[pathlib.Path], # Allow None for gh_repo only
-                      gh_repo: str = "",
-                      gh_token: Optional[str] = None) -> List[Tuple[str, str]]:
+def _fetch_and_parse_manifest(gh_repo: str, item: Dict, gh_token: Optional[str],
+                              commit: Optional[str] = None) -> Tuple[List[Tuple[str, str]], bool]:
+    """(dependencies, fetched); `fetched` is False if the file could not be read."""
+    path = item['path']
+    try:
+        # The tree listing already carries each file's blob SHA, so fetch by SHA
+        # instead of resolving the path again through the contents API.
+        sha = item.get('sha')
+        if sha:
+            content = get_repo_cache().get_or_fetch(
+                gh_repo, commit, f"blob:{sha}", lambda: fetch_blob_text(gh_repo, sha, gh_token))
+        else:
+            content = fetch_text_from_repo(gh_repo, path, gh_token)
+        if content is None:
+            print(f"  -> Could not fetch manifest {path}.")
+            return [], False
+        return (parse_manifest(path, content) if content else []), True
+    except Exception:
+        print(f"  -> Error fetching or parsing manifest {path}.")
+        traceback.print_exc(limit=1)
+        return [], False
+
+def fetch_manifest_dependencies(gh_repo: str,
+                                gh_token: Optional[str] = None,
+                                max_workers: Optional[int] = None,
+                                commit: Optional[str] = None) -> Tuple[List[Tuple[str, str]], bool]:
     """
-    Load dependencies for a project, prioritizing GitHub's SBOM API,
-    but falling back to robust manual manifest parsing.
+    Finds every manifest in the repo tree and fetches and parses them on a
+    bounded thread pool. Output order follows the tree listing, whatever
+    order the fetches complete in. Returns (dependencies, complete), where
+    `complete` is False if the tree or any manifest could not be fetched.
     """
-    if not gh_repo:
-        # (Your original local file parsing logic can go here if needed)
-        return []
+    repo_tree = list_repo_tree(gh_repo, gh_token)
+    if repo_tree is None:
+        print(f"  -> Could not list the tree of {gh_repo}.")
+        return [], False
+    manifests = [
+        item for item in repo_tree
+        if item.get('type', 'blob') == 'blob' and item['path'].endswith(MANIFEST_SUFFIXES)
+    ]
+    for item in manifests:
+        print(f"  -> Found manifest: {item['path']}. Fetching and parsing...")
+
+    workers = max(1, min(max_workers or MANIFEST_WORKERS, len(manifests) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parsed = list(pool.map(lambda item: _fetch_and_parse_manifest(gh_repo, item, gh_token, commit), manifests))
+
+    # De-duplicate while keeping first-seen order
+    deps = list(dict.fromkeys(dep for deps, _ in parsed for dep in deps))
+    return deps, all(fetched for _, fetched in parsed)
+
+# --- Cached Repo Loading ---
+# Everything fetched for a repo is cached per resolved commit SHA (see
+# core/cache.py), so re-running on an unchanged repo makes no network calls.
+
+def resolve_commit(gh_repo: str, gh_token: Optional[str] = None, ref: str = "HEAD") -> Optional[str]:
+    """Commit SHA for `ref`, or None if it cannot be resolved (then nothing is cached)."""
+    try:
+        return get_repo_cache().resolve(gh_repo, ref, lambda: resolve_commit_sha(gh_repo, ref, gh_token))
+    except Exception:
+        return None
+
+def load_sbom_edges(gh_repo: str, gh_token: Optional[str] = None,
+                    commit: Optional[str] = None) -> Tuple[List[Dict], bool]:
+    """
+    (flatten_sbom output for the repo's SBOM, complete), cached per commit.
+    The SBOM is streamed from the response straight into edges, so the raw
+    document is never held in memory (raw SBOMs cached by older versions are
+    still used). Only a complete SBOM is cached; one GitHub is still
+    generating comes back as ([], False) and is fetched again next time.
+    """
+    cache = get_repo_cache()
+    edges = cache.get(gh_repo, commit, "edges") if commit else None
+    if edges is not None:
+        return edges, True
+    sbom = cache.get(gh_repo, commit, "sbom") if commit else None
+    if sbom is not None:
+        edges, complete = flatten_sbom(gh_repo, sbom), True
+    else:
+        edges, complete = fetch_github_sbom_edges(gh_repo, gh_token, normalize_license)
+    if commit and complete:
+        cache.put(gh_repo, commit, "edges", edges)
+    return edges, complete
+
+def load_repo_license(gh_repo: str, gh_token: Optional[str] = None) -> Optional[str]:
+    """The repo's SPDX license id at its current commit."""
+    return get_repo_cache().get_or_fetch(
+        gh_repo, resolve_commit(gh_repo, gh_token), "license",
+        lambda: fetch_repo_license_spdx(gh_repo, gh_token))
+
+def _load_remote(gh_repo: str,
+                 gh_token: Optional[str],
+                 max_workers: Optional[int]) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+    """Returns (sbom_edges, manifest_deps); manifests are only read when the SBOM yields nothing."""
+    cache = get_repo_cache()
+    commit = resolve_commit(gh_repo, gh_token)
+    if commit:
+        cached = cache.get(gh_repo, commit, "manifest_deps")
+        if cached is not None:
+            print(f"Using cached manifest dependencies for {gh_repo}@{commit[:7]}.")
+            return [], [tuple(d) for d in cached]
 
     # --- Method 1: Try the GitHub SBOM API First ---
+    # The manifest fallback is only cached when the SBOM really was empty; after
+    # a transient SBOM failure the next run must try the SBOM again.
+    sbom_complete = False
     try:
         print(f"Attempting to fetch SBOM for {gh_repo}...")
-        sbom = fetch_github_sbom(gh_repo, gh_token)
-        edges = flatten_sbom(gh_repo, sbom)
+        edges, sbom_complete = load_sbom_edges(gh_repo, gh_token, commit)
         if edges:
             print(f"  -> Successfully loaded {len(edges)} dependencies from SBOM.")
-            deps = {(item['name'], item['license']) for item in edges}
-            return sorted(list(deps))
-        print("  -> SBOM was valid but empty, proceeding to manual parsing.")
+            return edges, []
+        if sbom_complete:
+            print("  -> SBOM was valid but empty, proceeding to manual parsing.")
+        else:
+            print("  -> SBOM is still being generated, proceeding to manual parsing.")
     except Exception:
         print(f"  -> SBOM for {gh_repo} failed critically. See error below.")
         traceback.print_exc(limit=1)
         print("  -> Falling back to manual parsing.")
 
     # --- Method 2: Fallback to Manual Manifest Parsing ---
-    # Method 2: Fallback to Manual Manifest Parsing
     print(f"Falling back to manually parsing manifests for {gh_repo}...")
-    deps: List[Tuple[str, str]] = [] # Now stores (name, ecosystem)
+    uniq_deps: List[Tuple[str, str]] = [] # Stores (name, ecosystem)
     try:
-        repo_tree = list_repo_tree(gh_repo, gh_token)
-        manifest_paths = [
-            item['path'] for item in repo_tree
-            if item['path'].endswith(('requirements.txt', 'pyproject.toml', 'package.json'))
-        ]
-        
-        for path in manifest_paths:
-            print(f"  -> Found manifest: {path}. Fetching and parsing...")
-            content = fetch_text_from_repo(gh_repo, path, gh_token)
-            if not content: continue
-            
-            
-            if path.endswith(('requirements.txt', 'pyproject.toml')):
-                ecosystem = "pypi"
-                parsed_deps = parse_pyproject(content) if 'pyproject' in path else parse_requirements_text(content)
-            elif path.endswith('package.json'):
-                ecosystem = "npm"
-                parsed_deps = parse_package_json(content)
-            else:
-                continue
-
-            # Add the name and its identified ecosystem to the list
-            for name, _ in parsed_deps:
-                deps.append((name, ecosystem))
-
+        uniq_deps, complete = fetch_manifest_dependencies(gh_repo, gh_token, max_workers, commit)
+        if commit and complete and sbom_complete:
+            cache.put(gh_repo, commit, "manifest_deps", uniq_deps)
     except Exception:
         print("  -> Error during manual manifest parsing.")
         traceback.print_exc(limit=1)
 
-    uniq_deps = list(set(deps))
     print(f"  -> Found {len(uniq_deps)} unique dependencies via manual parsing.")
-    return uniq_deps
-
-
-def flatten_sbom(owner_repo: str, sbom: Dict) -> List[Dict]:
-    id_to_name: Dict[str, str] = {}
-    id_to_license: Dict[str, str] = {}
-    for p in sbom.get("packages", []):
-        sid = p.get("SPDXID")
-        if not sid: continue
-        name = p.get("name") or sid
-        lic = p.get("licenseConcluded") or p.get("licenseDeclared") or "unknown"
-        id_to_name[sid] = name
-        id_to_license[sid] = normalize_license(lic)
-    edges: List[Dict] = []
-    for rel in sbom.get("relationships", []) or []:
-        if rel.get("relationshipType") != "DEPENDS_ON": continue
-        src_id = rel.get("spdxElementId")
-        tgt_id = rel.get("relatedSpdxElementId")
-        tgt_name = id_to_name.get(tgt_id)
-        if not tgt_name: continue
-        edges.append({
-            "name": tgt_name,
-            "license": id_to_license.get(tgt_id, "unknown"),
-            "parent": id_to_name.get(src_id, owner_repo),
-        })
-    return edges
\ No newline at end of file
+    return [], uniq_deps
+
+# --- Main Dependency Loading Logic ---
+
+def load_dependencies(local_path: Optional[pathlib.Path], # Allow None for gh_repo only
+                      gh_repo: str = "",
+                      gh_token: Optional[str] = None,
+                      max_workers: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    Load dependencies for a project, prioritizing GitHub's SBOM API,
+    but falling back to robust manual manifest parsing. Without `gh_repo`,
+    the checkout at `local_path` is parsed offline (see core/local_deps.py).
+    """
+    if not gh_repo:
+        if local_path is None:
+            return []
+        edges = load_local_edges(local_path, max_workers=max_workers)
+        return sorted({(item['name'], item['license']) for item in edges})
+
+    edges, deps = _load_remote(gh_repo, gh_token, max_workers)
+    if edges:
+        return sorted({(item['name'], item['license']) for item in edges})
+    return deps
+
+def load_dependency_edges(gh_repo: str,
+                          gh_token: Optional[str] = None,
+                          max_workers: Optional[int] = None,
+                          local_path: Optional[pathlib.Path] = None) -> List[Dict]:
+    """
+    Like load_dependencies, but keeps the SBOM's parent links. Manifest
+    dependencies become direct children of the repo with an unknown license.
+    With `local_path`, the checkout is parsed offline instead, with lockfile
+    parent links and the repo as the root.
+    """
+    if local_path is not None:
+        return load_local_edges(local_path, root_name=gh_repo or None, max_workers=max_workers)
+    edges, deps = _load_remote(gh_repo, gh_token, max_workers)
+    if edges:
+        return edges
+    return [dict(parent=gh_repo, name=name, license="unknown") for name, _ in deps]
+
+
+def flatten_sbom(owner_repo: str, sbom) -> List[Dict]:
+    """
+    {"name", "license", "parent"} per DEPENDS_ON relationship. `sbom` is a
+    parsed document (bare or GitHub's {"sbom": ...} wrapper) or a stream/path,
+    which is parsed incrementally; see core/spdx_stream.py.
+    """
+    return list(iter_sbom_edges(sbom, owner_repo, normalize_license))
@@ -0,0 +1,185 @@
+# In licensync/core/edge_store.py
+
+"""
+Optional columnar store for data/edges and data/nodes (needs pyarrow).
+
+Each built repo is one Parquet file under a hive partition,
+
+  <root>/edges/repo=<owner%2Frepo>/sha=<sha|HEAD>/part-0.parquet
+  <root>/nodes/repo=<owner%2Frepo>/sha=<sha|HEAD>/part-0.parquet
+
+with package and license columns dictionary-encoded. Appending a repo only
+writes its own partition, and readers memory-map the files and push filters
+such as repo == X or lic_child == "unknown" down to the scan.
+
+  python -m licensync.core.edge_store import data/edges --root data/store
+"""
+
+from __future__ import annotations
+import argparse
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from .edge_stream import EDGE_COLUMNS, EdgeBatch, DEFAULT_BATCH_SIZE, iter_edge_batches
+
+EDGE_FIELDS = ("parent", "child", "lic_parent", "lic_child")
+NODE_FIELDS = ("name", "license", "is_root")
+PARTITION_FIELDS = ("repo", "sha")
+
+Filter = Union[None, Dict[str, Any], "ds.Expression"]
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("The columnar edge store needs pyarrow: pip install pyarrow")
+
+
+def _schema(fields: Sequence[str]):
+    return pa.schema([(f, pa.bool_() if f == "is_root" else pa.dictionary(pa.int32(), pa.string()))
+                      for f in fields])
+
+
+def _column(rows: List[Dict], field: str):
+    if field == "is_root":
+        return pa.array([str(r.get(field)).lower() == "true" for r in rows], type=pa.bool_())
+    return pa.array([str(r.get(field) or "") for r in rows], type=pa.string()).dictionary_encode()
+
+
+def parse_filters(items: Optional[Iterable[str]]) -> Dict[str, str]:
+    """["repo=apache/airflow", "lic_child=unknown"] -> {"repo": ..., "lic_child": ...}"""
+    out: Dict[str, str] = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"filter must look like column=value, got {item!r}")
+        out[key.strip()] = value.strip()
+    return out
+
+
+def _expression(where: Filter):
+    if where is None or not isinstance(where, dict):
+        return where
+    expr = None
+    for col, value in where.items():
+        term = ds.field(col) == value
+        expr = term if expr is None else expr & term
+    return expr
+
+
+class EdgeStore:
+    """Partitioned Parquet dataset of edges and nodes, one partition per (repo, sha)."""
+
+    def __init__(self, root: Union[str, Path]):
+        _require_pyarrow()
+        self.root = Path(root)
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+
+    def _partition(self, kind: str, repo: str, sha: Optional[str]) -> Path:
+        return self.root / kind / f"repo={quote(repo, safe='')}" / f"sha={quote(sha or 'HEAD', safe='')}"
+
+    def has(self, repo: str, sha: Optional[str] = None) -> bool:
+        return (self._partition("edges", repo, sha) / "part-0.parquet").exists()
+
+    def _write(self, kind: str, repo: str, sha: Optional[str], rows: List[Dict], fields: Sequence[str]) -> Path:
+        table = pa.Table.from_pydict({f: _column(rows, f) for f in fields}, schema=_schema(fields))
+        part = self._partition(kind, repo, sha)
+        part.mkdir(parents=True, exist_ok=True)
+        path = part / "part-0.parquet"
+        tmp = part / f".part-0.{os.getpid()}.tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        return path
+
+    def append(self, repo: str, sha: Optional[str],
+               edges: List[Dict], nodes: Optional[List[Dict]] = None) -> Path:
+        """
+        Stores one built repo. Rows use the edges CSV columns (parent, child,
+        lic_parent, lic_child) and the nodes CSV columns (name, license, is_root).
+        Rebuilding the same repo@sha replaces just that partition.
+        """
+        path = self._write("edges", repo, sha, edges, EDGE_FIELDS)
+        if nodes is not None:
+            self._write("nodes", repo, sha, nodes, NODE_FIELDS)
+        return path
+
+    def dataset(self, kind: str = "edges"):
+        partitioning = ds.partitioning(pa.schema([(f, pa.string()) for f in PARTITION_FIELDS]), flavor="hive")
+        return ds.dataset(str(self.root / kind), format="parquet", partitioning=partitioning,
+                          filesystem=self._fs)
+
+    def scan(self, where: Filter = None, columns: Optional[Sequence[str]] = None, kind: str = "edges"):
+        """pyarrow Table of the matching rows; `where` is {column: value} or a pyarrow expression."""
+        return self.dataset(kind).to_table(columns=list(columns) if columns else None,
+                                           filter=_expression(where))
+
+    def iter_batches(self, where: Filter = None,
+                     columns: Sequence[str] = EDGE_COLUMNS,
+                     batch_size: int = DEFAULT_BATCH_SIZE,
+                     kind: str = "edges") -> Iterator[EdgeBatch]:
+        """Same EdgeBatch stream as edge_stream.iter_edge_batches, read from the store."""
+        dataset = self.dataset(kind)
+        present = set(dataset.schema.names)
+        wanted = [c for c in columns if c in present]
+        for rb in dataset.to_batches(columns=wanted, filter=_expression(where), batch_size=batch_size):
+            if not rb.num_rows:
+                continue
+            cols = {}
+            for c in columns:
+                if c == "sha" and c in present:
+                    # Unpinned builds are partitioned as HEAD; CSVs leave sha empty
+                    cols[c] = ["" if v == "HEAD" else v for v in rb.column(c).to_pylist()]
+                elif c in present:
+                    cols[c] = rb.column(c).to_pylist()
+                else:
+                    cols[c] = ["unknown" if c.startswith("lic_") else ""] * rb.num_rows
+            yield EdgeBatch(cols, str(self.root / kind))
+
+
+def import_csvs(store: "EdgeStore", edges_dir: Union[str, Path]) -> int:
+    """Loads data/edges/*.csv (and matching data/nodes/*.csv) into the store; returns repos added."""
+    edges_dir = Path(edges_dir)
+    nodes_dir = edges_dir.parent / "nodes"
+    added = 0
+    for f in sorted(edges_dir.glob("*.csv")):
+        rows = [r for b in iter_edge_batches(f, require=("repo", "parent", "child")) for r in b.rows()]
+        if not rows:
+            continue
+        repo, sha = rows[0]["repo"], rows[0]["sha"] or None
+        nodes = None
+        if (nodes_dir / f.name).exists():
+            nodes = [r for b in iter_edge_batches(nodes_dir / f.name, columns=NODE_FIELDS) for r in b.rows()]
+        store.append(repo, sha, rows, nodes)
+        added += 1
+    return added
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Columnar edge store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="Import per-repo edge/node CSVs")
+    imp.add_argument("edges_dir")
+    imp.add_argument("--root", default="data/store")
+    show = sub.add_parser("count", help="Count edges matching filters")
+    show.add_argument("--root", default="data/store")
+    show.add_argument("--where", nargs="*", help="column=value filters, e.g. lic_child=unknown")
+    args = ap.parse_args(argv)
+
+    store = EdgeStore(args.root)
+    if args.cmd == "import":
+        print(f"[ok] imported {import_csvs(store, args.edges_dir)} repos into {args.root}")
+    else:
+        print(store.dataset().count_rows(filter=_expression(parse_filters(args.where))))
+
+
+if __name__ == "__main__":
+    main()
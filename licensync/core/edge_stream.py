@@ -0,0 +1,192 @@
+# In licensync/core/edge_stream.py
+
+"""
+Streaming reader and evaluation pipeline for edge dumps.
+
+Edges CSVs (data/edges/*.csv), truth CSVs (data/edge_truth*.csv) and the
+tab-separated ALL_EDGES.txt aggregate are read as fixed-size columnar batches,
+so memory stays bounded by the batch size however large the input is. Each
+distinct (lic_parent, lic_child, jurisdiction) is evaluated once per stream.
+
+  python -m licensync.core.edge_stream data/edges --out results/verdicts.csv
+
+With --conflicts, the same sources are also loaded into one CompactGraph and
+every repo's transitive conflicts are written as JSON.
+"""
+
+from __future__ import annotations
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .license_utils import normalize_license
+
+EDGE_COLUMNS = ("repo", "sha", "parent", "child", "lic_parent", "lic_child")
+TRUTH_COLUMNS = EDGE_COLUMNS + ("jurisdiction", "label")
+# Column order of the headerless, tab-separated ALL_EDGES.txt
+ALL_EDGES_COLUMNS = ("repo", "sha", "parent", "child")
+VERDICT_COLUMNS = ("result", "risk")
+
+DEFAULT_BATCH_SIZE = 8192
+
+# Filled in for columns a source does not have
+_DEFAULTS = {"lic_parent": "unknown", "lic_child": "unknown"}
+
+PathLike = Union[str, Path]
+PairEvaluator = Callable[[List[Tuple[str, str, str]]], List[Dict[str, str]]]
+
+
+class EdgeBatch:
+    """Up to batch_size rows, stored column by column as lists of str."""
+
+    def __init__(self, columns: Dict[str, List[str]], source: str = ""):
+        self.columns = columns
+        self.source = source
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+    def __getitem__(self, name: str) -> List[str]:
+        return self.columns[name]
+
+    def rows(self) -> Iterator[Dict[str, str]]:
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+
+def _sources(paths: Union[PathLike, Iterable[PathLike]]) -> List[Path]:
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    files: List[Path] = []
+    for p in map(Path, paths):
+        files.extend(sorted(p.glob("*.csv")) if p.is_dir() else [p])
+    return files
+
+
+def iter_edge_batches(paths: Union[PathLike, Iterable[PathLike]],
+                      columns: Sequence[str] = EDGE_COLUMNS,
+                      batch_size: int = DEFAULT_BATCH_SIZE,
+                      require: Sequence[str] = (),
+                      skip_comments: bool = True) -> Iterator[EdgeBatch]:
+    """
+    Yields EdgeBatch objects with exactly `columns` from each file, or each
+    *.csv in a directory. Missing columns are filled with "" ("unknown" for
+    licenses); files lacking a `require`d column are skipped with a warning.
+    *.txt files are read as headerless TSV in ALL_EDGES_COLUMNS order.
+    """
+    for path in _sources(paths):
+        with open(path, newline="") as fh:
+            lines = (line for line in fh if not line.lstrip().startswith("#")) if skip_comments else fh
+            if path.suffix == ".txt":
+                reader = csv.reader(lines, delimiter="\t")
+                header = list(ALL_EDGES_COLUMNS)
+            else:
+                reader = csv.reader(lines)
+                header = next(reader, None) or []
+            missing = [c for c in require if c not in header]
+            if missing:
+                print(f"[warn] {path} missing columns {missing}; skipping")
+                continue
+
+            pos = {name: i for i, name in enumerate(header)}
+            picks = [(c, pos.get(c), _DEFAULTS.get(c, "")) for c in columns]
+            width = len(header)
+            buf: List[List[str]] = []
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) < width:
+                    row = row + [""] * (width - len(row))
+                buf.append(row)
+                if len(buf) >= batch_size:
+                    yield _columnar(buf, picks, str(path))
+                    buf = []
+            if buf:
+                yield _columnar(buf, picks, str(path))
+
+
+def _columnar(rows: List[List[str]], picks, source: str) -> EdgeBatch:
+    cols: Dict[str, List[str]] = {}
+    for name, i, default in picks:
+        if i is None:
+            cols[name] = [default] * len(rows)
+        else:
+            cols[name] = [r[i] or default for r in rows]
+    return EdgeBatch(cols, source)
+
+
+def evaluate_batches(batches: Iterable[EdgeBatch],
+                     jurisdiction: str = "global",
+                     evaluate: Optional[PairEvaluator] = None,
+                     memo: Optional[Dict[Tuple[str, str, str], Dict[str, str]]] = None,
+                     ) -> Iterator[Tuple[EdgeBatch, List[Dict[str, str]]]]:
+    """
+    Normalizes each batch's licenses, evaluates the pairs not seen earlier in
+    the stream in one call, and yields (batch, verdicts) aligned row by row.
+    A per-row `jurisdiction` column, when non-empty, overrides `jurisdiction`.
+    """
+    if evaluate is None:
+        from .prolog_interface import evaluate_pairs as evaluate
+    memo = {} if memo is None else memo
+    for batch in batches:
+        jurs = batch.columns.get("jurisdiction") or [""] * len(batch)
+        keys = [(normalize_license(lp), normalize_license(lc), normalize_license(j or jurisdiction))
+                for lp, lc, j in zip(batch["lic_parent"], batch["lic_child"], jurs)]
+        todo = list(dict.fromkeys(k for k in keys if k not in memo))
+        if todo:
+            memo.update(zip(todo, evaluate(todo)))
+        yield batch, [memo[k] for k in keys]
+
+
+def write_verdicts(results: Iterable[Tuple[EdgeBatch, List[Dict[str, str]]]],
+                   out: PathLike) -> int:
+    """Streams evaluate_batches output to a CSV (input columns + result, risk); returns row count."""
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(out, "w", newline="") as fh:
+        w = csv.writer(fh)
+        header = None
+        for batch, verdicts in results:
+            if header is None:
+                header = list(batch.columns)
+                w.writerow(header + list(VERDICT_COLUMNS))
+            w.writerows(list(vals) + [v.get("result"), v.get("risk")]
+                        for vals, v in zip(zip(*(batch[c] for c in header)), verdicts))
+            n += len(batch)
+    return n
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Stream edge CSVs/ALL_EDGES.txt through the evaluator")
+    ap.add_argument("sources", nargs="+", help="Edge CSVs, directories of them, or ALL_EDGES.txt")
+    ap.add_argument("--jurisdiction", default="global")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    ap.add_argument("--out", default="results/verdicts.csv")
+    ap.add_argument("--conflicts", default=None,
+                    help="Also write each repo's transitive conflicts to this JSON file")
+    args = ap.parse_args(argv)
+
+    memo: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+    batches = iter_edge_batches(args.sources, batch_size=args.batch_size)
+    n = write_verdicts(evaluate_batches(batches, args.jurisdiction, memo=memo), args.out)
+    print(f"[ok] {n} edges, {len(memo)} distinct pairs -> {args.out}", file=sys.stderr)
+
+    if args.conflicts:
+        from .compact_graph import CompactGraph
+        from .graph_tools_overlap import find_transitive_conflicts
+        G = CompactGraph.from_csv(args.sources)
+        report = find_transitive_conflicts(G, args.jurisdiction, memo=memo)
+        out = Path(args.conflicts)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2))
+        print(f"[ok] {len(report)} repos, {sum(map(len, report.values()))} conflicts -> {out}",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
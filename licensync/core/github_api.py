@@ -1,7 +1,21 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import CACHE_DIR, LRUBudget, atomic_write
 
 API_VER = "2022-11-28"
+API_ROOT = os.getenv("LICENSYNC_GITHUB_API", "https://api.github.com").rstrip("/")
+# ETag store limits: larger bodies are not stored, total size is capped
+ETAG_STORE_MAX_BODY = int(os.getenv("LICENSYNC_ETAG_MAX_BODY_KB", "256")) * 1024
+ETAG_STORE_MAX_BYTES = int(os.getenv("LICENSYNC_ETAG_CACHE_MAX_MB", "64")) * 1024 * 1024
 
 def _headers(token: str | None):
     h = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": API_VER}
@@ -9,23 +23,225 @@ def _headers(token: str | None):
         h["Authorization"] = f"Bearer {token}"
     return h
 
+
+class ResponseStore:
+    """
+    On-disk store of ETag-validated GET responses. GitHub does not charge
+    conditional requests answered with 304 against the rate limit, so a
+    stored body can be replayed for free as long as its ETag still matches.
+
+    Only small responses are kept (repo info, refs, trees, licenses): bodies
+    over `max_body` bytes, such as blobs and SBOMs, are left to RepoCache.
+    Total size is capped at `max_bytes`, least recently used evicted first.
+    """
+
+    def __init__(self, root: Path,
+                 max_bytes: int = ETAG_STORE_MAX_BYTES,
+                 max_body: int = ETAG_STORE_MAX_BODY):
+        self.root = Path(root)
+        self.max_body = max_body
+        self._budget = LRUBudget(self.root, "*/*.json", max_bytes)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+            os.utime(path)  # mark as recently used
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, etag: str, content: str, content_type: str) -> None:
+        if len(content.encode("utf-8")) > self.max_body:
+            return
+        data = json.dumps({"etag": etag, "content": content, "content_type": content_type}).encode()
+        try:
+            atomic_write(self._path(key), data)
+        except OSError:
+            return
+        self._budget.add(len(data))
+
+
+class GitHubClient:
+    """
+    Shared GitHub REST client: one pooled requests.Session, rate-limit-aware
+    retries on 403/429/5xx, and ETag-conditional GETs backed by a ResponseStore.
+    """
+
+    def __init__(self,
+                 api_root: str = API_ROOT,
+                 store: ResponseStore | None = None,
+                 pool_size: int = 16,
+                 max_retries: int = 5,
+                 backoff: float = 1.0,
+                 max_wait: float = 60.0,
+                 timeout: float = 30.0):
+        self.api_root = api_root.rstrip("/")
+        self.store = store
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._rate_lock = threading.Lock()
+        self.rate_remaining: int | None = None
+        self.rate_reset: float | None = None
+        self._sleep = time.sleep
+
+    def url(self, path: str) -> str:
+        return path if path.startswith(("http://", "https://")) else f"{self.api_root}/{path.lstrip('/')}"
+
+    def _store_key(self, url: str, headers: dict) -> str:
+        # Responses differ per token (private repos) and per media type.
+        scope = hashlib.sha256(headers.get("Authorization", "").encode()).hexdigest()[:16]
+        return hashlib.sha256(f"{url}\n{headers.get('Accept', '')}\n{scope}".encode()).hexdigest()
+
+    def _note_rate_limit(self, r: requests.Response) -> None:
+        remaining = r.headers.get("X-RateLimit-Remaining")
+        reset = r.headers.get("X-RateLimit-Reset")
+        with self._rate_lock:
+            if remaining is not None and remaining.isdigit():
+                self.rate_remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                self.rate_reset = float(reset)
+
+    def _wait_for_quota(self) -> None:
+        with self._rate_lock:
+            exhausted = self.rate_remaining == 0 and self.rate_reset is not None
+            delay = (self.rate_reset - time.time()) if exhausted else 0.0
+        if delay > 0:
+            self._sleep(min(delay, self.max_wait))
+
+    def _retry_delay(self, r: requests.Response, attempt: int) -> float | None:
+        """Seconds to wait before retrying `r`, or None if it should not be retried."""
+        retry_after = r.headers.get("Retry-After")
+        rate_limited = r.status_code == 429 or (
+            r.status_code == 403 and (retry_after is not None or r.headers.get("X-RateLimit-Remaining") == "0")
+        )
+        if not rate_limited and r.status_code < 500:
+            return None
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_wait)
+        if r.headers.get("X-RateLimit-Remaining") == "0" and (r.headers.get("X-RateLimit-Reset") or "").isdigit():
+            return min(max(float(r.headers["X-RateLimit-Reset"]) - time.time(), 0.0) + 1.0, self.max_wait)
+        return min(self.backoff * (2 ** attempt), self.max_wait)
+
+    def get(self, path: str, token: str | None = None, accept: str | None = None,
+            conditional: bool = True, **kwargs) -> requests.Response:
+        url = self.url(path)
+        headers = _headers(token)
+        if accept:
+            headers["Accept"] = accept
+        key = stored = None
+        if conditional and self.store is not None and not kwargs.get("stream"):
+            key = self._store_key(url, headers)
+            stored = self.store.get(key)
+            if stored and stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+
+        timeout = kwargs.pop("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_quota()
+            r = self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+            self._note_rate_limit(r)
+            if r.status_code == 304 and stored is not None:
+                return self._replay(r, stored)
+            delay = self._retry_delay(r, attempt)
+            if delay is None or attempt == self.max_retries:
+                break
+            # Release the connection (a streamed body is otherwise left open)
+            r.close()
+            self._sleep(delay)
+
+        if key is not None and r.status_code == 200 and r.headers.get("ETag"):
+            self.store.put(key, r.headers["ETag"], r.text, r.headers.get("Content-Type", ""))
+        return r
+
+    @staticmethod
+    def _replay(not_modified: requests.Response, stored: dict) -> requests.Response:
+        """Turns a 304 into the 200 response it validated."""
+        r = requests.Response()
+        r.status_code = 200
+        r.url = not_modified.url
+        r.request = not_modified.request
+        r.headers.update(not_modified.headers)
+        r.headers["Content-Type"] = stored.get("content_type") or "application/json"
+        r.encoding = "utf-8"
+        r._content = stored["content"].encode("utf-8")
+        r.from_cache = True
+        return r
+
+
+_client: GitHubClient | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> GitHubClient:
+    """The process-wide client shared by every helper below."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient(store=ResponseStore(CACHE_DIR / "github"))
+    return _client
+
 def fetch_github_sbom(owner_repo: str, token: str | None):
-    url = f"https://api.github.com/repos/{owner_repo}/dependency-graph/sbom"
-    r = requests.get(url, headers=_headers(token), timeout=30)
+    r = get_client().get(f"repos/{owner_repo}/dependency-graph/sbom", token)
     r.raise_for_status()
     return r.json()
 
+def fetch_github_sbom_edges(owner_repo: str, token: str | None, normalize=None) -> tuple[list[dict], bool]:
+    """
+    (flatten_sbom-style edges, complete), parsed incrementally from the
+    streamed SBOM response without holding the document in memory. `complete`
+    is False while GitHub is still generating the SBOM (202); other HTTP
+    errors raise.
+    """
+    from .spdx_stream import iter_sbom_edges
+    r = get_client().get(f"repos/{owner_repo}/dependency-graph/sbom", token, stream=True)
+    try:
+        r.raise_for_status()
+        if r.status_code != 200:
+            return [], False
+        r.raw.decode_content = True
+        return list(iter_sbom_edges(r.raw, owner_repo, normalize)), True
+    finally:
+        r.close()
+
 def fetch_repo_license_spdx(owner_repo: str, token: str | None) -> str | None:
-    url = f"https://api.github.com/repos/{owner_repo}"
-    r = requests.get(url, headers=_headers(token), timeout=30)
+    r = get_client().get(f"repos/{owner_repo}", token)
     if r.status_code != 200:
         return None
     lic = (r.json().get("license") or {}).get("spdx_id")
     return lic if lic and lic != "NOASSERTION" else None
 
+def resolve_commit_sha(owner_repo: str, ref: str, token: str | None) -> str | None:
+    """Resolves a branch, tag or HEAD to its commit SHA (a cheap, ETag-validated call)."""
+    r = get_client().get(f"repos/{owner_repo}/commits/{ref}", token, accept="application/vnd.github.sha")
+    if r.status_code != 200:
+        return None
+    return r.text.strip() or None
+
 def fetch_text_from_repo(owner_repo: str, path: str, token: str | None) -> str | None:
-    url = f"https://api.github.com/repos/{owner_repo}/contents/{path}"
-    r = requests.get(url, headers=_headers(token), timeout=30)
+    r = get_client().get(f"repos/{owner_repo}/contents/{path}", token)
+    if r.status_code != 200:
+        return None
+    data = r.json()
+    content = data.get("content")
+    if not content:
+        return None
+    if data.get("encoding") == "base64":
+        return base64.b64decode(content).decode("utf-8", errors="ignore")
+    return content
+
+def fetch_blob_text(owner_repo: str, sha: str, token: str | None) -> str | None:
+    """Fetches a file by its git blob SHA (as listed by list_repo_tree); blobs never change."""
+    r = get_client().get(f"repos/{owner_repo}/git/blobs/{sha}", token)
     if r.status_code != 200:
         return None
     data = r.json()
@@ -33,22 +249,24 @@ def fetch_text_from_repo(owner_repo: str, path: str, token: str | None) -> str |
     if not content:
         return None
     if data.get("encoding") == "base64":
-        import base64
         return base64.b64decode(content).decode("utf-8", errors="ignore")
     return content
 
-def list_repo_tree(owner_repo: str, token: str | None) -> list[dict]:
+def list_repo_tree(owner_repo: str, token: str | None) -> list[dict] | None:
+    """Every entry of the default branch's tree, or None if it could not be listed."""
+    client = get_client()
     # Try HEAD shortcut
-    url = f"https://api.github.com/repos/{owner_repo}/git/trees/HEAD?recursive=1"
-    r = requests.get(url, headers=_headers(token), timeout=30)
+    r = client.get(f"repos/{owner_repo}/git/trees/HEAD?recursive=1", token)
     if r.status_code == 200:
         return r.json().get("tree", []) or []
     # Fallback: resolve default branch then tree
-    meta = requests.get(f"https://api.github.com/repos/{owner_repo}", headers=_headers(token), timeout=30).json()
+    meta = client.get(f"repos/{owner_repo}", token).json()
     default = meta.get("default_branch", "main")
-    ref = requests.get(f"https://api.github.com/repos/{owner_repo}/git/refs/heads/{default}", headers=_headers(token), timeout=30).json()
+    ref = client.get(f"repos/{owner_repo}/git/refs/heads/{default}", token).json()
     sha = (ref.get("object") or {}).get("sha")
     if not sha:
-        return []
-    tree = requests.get(f"https://api.github.com/repos/{owner_repo}/git/trees/{sha}?recursive=1", headers=_headers(token), timeout=30).json()
-    return tree.get("tree", []) or []
+        return None
+    r = client.get(f"repos/{owner_repo}/git/trees/{sha}?recursive=1", token)
+    if r.status_code != 200:
+        return None
+    return r.json().get("tree", []) or []
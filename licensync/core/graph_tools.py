@@ -1,15 +1,37 @@
 # In licensync/core/graph_tools.py
 
-import matplotlib
-matplotlib.use('Agg') # Set the backend BEFORE importing pyplot
-import matplotlib.pyplot as plt
+import heapq
 import networkx as nx
 import os
+from collections import Counter, deque
+from typing import Dict, Iterable, Optional
+
+from .license_utils import normalize_license
+from .prolog_interface import license_classes
+
+# Graphs larger than this are collapsed before layout (see reduce_graph)
+LOD_MAX_NODES = 150
+
+LICENSE_CLASS_COLORS = {
+    "permissive": "#cfe8ff",
+    "weak-copyleft": "#fff2b3",
+    "strong-copyleft": "#ffc9a8",
+    "network-copyleft": "#ff9c9c",
+    "source-available": "#d9c2f0",
+    "unknown": "#e0e0e0",
+}
+
+def _pyplot():
+    """matplotlib with the Agg backend, imported only when something is drawn."""
+    import matplotlib
+    matplotlib.use('Agg') # Set the backend BEFORE importing pyplot
+    import matplotlib.pyplot as plt
+    return plt
 
 def build_graph_recursive(root: str, root_license: str, edges: list[dict]) -> nx.DiGraph:
     # (This function remains the same)
-    G = nx.DiGraph()
-    G.add_node(root, license=root_license or "unknown")
+    G = nx.DiGraph(roots=[root])
+    G.add_node(root, license=root_license or "unknown", is_root=True)
     for e in edges:
         name = e.get("name")
         lic = e.get("license", "unknown")
@@ -24,33 +46,162 @@ def build_graph_recursive(root: str, root_license: str, edges: list[dict]) -> nx
             G.add_edge(root, n)
     return G
 
-def show_graph(G: nx.DiGraph, title: str, outfile: str | None = None):
+def license_class(lic: Optional[str], classes: Optional[Dict[str, str]] = None) -> str:
+    """
+    Coarse family of a license (SPDX id or rules atom), for grouping and
+    colouring nodes, as the rules classify it; "unknown" if they don't.
+    """
+    if classes is None:
+        classes = license_classes()
+    if lic in classes:
+        return classes[lic]
+    return classes.get(normalize_license(lic), "unknown")
+
+def _roots(G: nx.DiGraph) -> list:
+    roots = [n for n in G.nodes if G.in_degree(n) == 0]
+    return roots or list(G.nodes)[:1]
+
+def _depths(G: nx.DiGraph) -> Dict:
+    """Shortest distance from any root, by BFS."""
+    depth = {r: 0 for r in _roots(G)}
+    queue = deque(depth)
+    while queue:
+        u = queue.popleft()
+        for v in G.successors(u):
+            if v not in depth:
+                depth[v] = depth[u] + 1
+                queue.append(v)
+    return depth
+
+def reduce_graph(G: nx.DiGraph, max_nodes: int = LOD_MAX_NODES,
+                 keep: Optional[Iterable] = None, group_by: str = "license") -> nx.DiGraph:
+    """
+    Level-of-detail summary of G. Up to `max_nodes` nodes stay as they are:
+    first the `keep` nodes (e.g. everything on a conflict path), then roots,
+    then the highest in-degree nodes, the busiest first within each tier.
+    Every other node is merged into one group node per license class
+    (group_by="license") or per depth from the roots (group_by="depth");
+    roots that do not fit share one "[roots]" group. Group nodes carry
+    `collapsed` (how many nodes they stand for); edges carry `weight` (how
+    many original edges they stand for). Runs in O(N + E) plus sorting, and
+    the result has at most max_nodes plus a handful of group nodes.
+    """
+    degree = lambda n: G.in_degree(n) + G.out_degree(n)
+    keep = {n for n in (keep or ()) if n in G}
+    kept = set(heapq.nlargest(max_nodes, keep, key=degree))
+    roots = set(_roots(G))
+    kept.update(heapq.nlargest(max(0, max_nodes - len(kept)), roots - kept, key=G.out_degree))
+    room = max(0, max_nodes - len(kept))
+    kept.update(heapq.nlargest(room, (n for n in G.nodes if n not in kept), key=G.in_degree))
+
+    depth = _depths(G) if group_by == "depth" else {}
+    classes = license_classes() if group_by == "license" else {}
+    rep, sizes = {}, Counter()
+    for n, data in G.nodes(data=True):
+        if n in kept:
+            rep[n] = n
+            continue
+        if n in roots:
+            key = "[roots]"
+        elif group_by == "depth":
+            d = depth.get(n)
+            key = f"[depth {d}]" if d is not None else "[unreached]"
+        else:
+            key = f"[{license_class(data.get('license'), classes)}]"
+        rep[n] = key
+        sizes[key] += 1
+
+    H = nx.DiGraph()
+    for n in kept:
+        H.add_node(n, license=G.nodes[n].get("license", "unknown"), collapsed=0)
+    for key, count in sizes.items():
+        lic = key.strip("[]") if group_by == "license" and key != "[roots]" else "unknown"
+        H.add_node(key, license=lic, collapsed=count)
+    weights = Counter((rep[u], rep[v]) for u, v in G.edges if rep[u] != rep[v])
+    for (u, v), w in weights.items():
+        H.add_edge(u, v, weight=w)
+    return H
+
+def conflict_nodes(G: nx.DiGraph, jurisdiction: str = "global", evaluate=None) -> set:
+    """Every node on a path to a transitive license conflict, for show_graph's `keep`."""
+    from .graph_tools_overlap import find_transitive_conflicts
+    report = find_transitive_conflicts(G, jurisdiction, evaluate)
+    return {n for hits in report.values() for h in hits for n in h["path"]}
+
+def hierarchical_layout(G: nx.DiGraph, row_width: Optional[int] = None) -> Dict:
+    """
+    Layered layout: roots on the top row, each node one layer below its nearest
+    root. Layers wider than `row_width` wrap onto extra rows, and each row is
+    ordered by the mean x of the node's already placed predecessors to cut
+    down on crossings. Linear in graph size (plus a sort per layer).
+    """
+    depth = _depths(G)
+    bottom = max(depth.values(), default=0) + 1
+    layers: Dict[int, list] = {}
+    for n in G.nodes:
+        layers.setdefault(depth.get(n, bottom), []).append(n)
+    row_width = row_width or max(8, int(G.number_of_nodes() ** 0.5 * 2))
+
+    pos, y = {}, 0.0
+    for d in sorted(layers):
+        def barycenter(n):
+            xs = [pos[p][0] for p in G.predecessors(n) if p in pos]
+            return sum(xs) / len(xs) if xs else 0.5
+        nodes = sorted(layers[d], key=lambda n: (barycenter(n), str(n)))
+        for start in range(0, len(nodes), row_width):
+            row = nodes[start:start + row_width]
+            for i, n in enumerate(row):
+                pos[n] = ((i + 0.5) / len(row), y)
+            y -= 1.0
+        y -= 0.5  # extra gap between layers
+    return pos
+
+def _draw_reduced(G: nx.DiGraph, max_nodes: int, keep, group_by: str):
+    H = reduce_graph(G, max_nodes=max_nodes, keep=keep, group_by=group_by)
+    print(f"     -> Collapsed {G.number_of_nodes()} nodes into {H.number_of_nodes()} "
+          f"({sum(1 for _, c in H.nodes(data='collapsed') if c)} groups).")
+    pos = hierarchical_layout(H)
+
+    keep = set(keep or ())
+    classes = license_classes()
+    colors = [LICENSE_CLASS_COLORS.get(license_class(d.get("license"), classes), "#e0e0e0")
+              if not d.get("collapsed") else LICENSE_CLASS_COLORS.get(d["license"], "#e0e0e0")
+              for _, d in H.nodes(data=True)]
+    sizes = [300 + 120 * d["collapsed"] ** 0.5 if d.get("collapsed") else 500 for _, d in H.nodes(data=True)]
+    edgecolors = ["#d62728" if n in keep else "#555" for n in H.nodes]
+    widths = [min(6.0, 0.5 + 0.5 * d.get("weight", 1) ** 0.5) for _, _, d in H.edges(data=True)]
+
+    nx.draw_networkx_nodes(H, pos, node_color=colors, node_size=sizes, edgecolors=edgecolors, linewidths=1.0)
+    nx.draw_networkx_edges(H, pos, edge_color="#999", alpha=0.6, width=widths, arrows=False)
+    labels = {n: (f"{n} ×{d['collapsed']}" if d.get("collapsed") else n) for n, d in H.nodes(data=True)}
+    nx.draw_networkx_labels(H, pos, labels=labels, font_size=6)
+
+def show_graph(G: nx.DiGraph, title: str, outfile: str | None = None,
+               max_nodes: int = LOD_MAX_NODES, keep: Optional[Iterable] = None,
+               group_by: str = "license"):
     """
     Builds and saves a dependency graph, now optimized for large graphs.
+    Graphs with more than `max_nodes` nodes are drawn as a reduce_graph
+    summary (`keep` nodes, e.g. conflict paths, are always shown and outlined).
     """
+    plt = _pyplot()
     try:
         print(f"  -> Attempting to generate graph for '{title}' with {G.number_of_nodes()} nodes...")
         plt.figure(figsize=(16, 16)) # Use a larger figure for larger graphs
-        
-        # --- OPTIMIZATION ---
-        # Reduce layout iterations for large graphs to save memory and time.
-        iterations = 50
-        if G.number_of_nodes() > 100:
-            print("     -> Large graph detected, using fewer layout iterations.")
-            iterations = 25
-            
-        print("     -> Calculating graph layout (this can be slow for large graphs)...")
-        pos = nx.spring_layout(G, seed=42, iterations=iterations)
-        print("     -> Layout calculation complete.")
-        
-        # Adjust node and font size for readability on large graphs
-        node_size = 1200 if G.number_of_nodes() < 100 else 800
-        font_size = 8 if G.number_of_nodes() < 100 else 6
 
-        print("     -> Drawing nodes, edges, and labels...")
-        nx.draw_networkx_nodes(G, pos, node_color="#cfe8ff", node_size=node_size)
-        nx.draw_networkx_edges(G, pos, edge_color="#999", alpha=0.6)
-        nx.draw_networkx_labels(G, pos, font_size=font_size)
+        if max_nodes and G.number_of_nodes() > max_nodes:
+            print("     -> Large graph detected, drawing a level-of-detail summary.")
+            _draw_reduced(G, max_nodes, keep, group_by)
+        else:
+            print("     -> Calculating graph layout...")
+            from .layout_cache import cached_spring_layout
+            pos = cached_spring_layout(G, seed=42, iterations=50)
+            print("     -> Layout calculation complete.")
+
+            print("     -> Drawing nodes, edges, and labels...")
+            nx.draw_networkx_nodes(G, pos, node_color="#cfe8ff", node_size=1200)
+            nx.draw_networkx_edges(G, pos, edge_color="#999", alpha=0.6)
+            nx.draw_networkx_labels(G, pos, font_size=8)
 
         plt.title(title, fontsize=20)
         plt.axis("off")
@@ -68,4 +219,4 @@ def show_graph(G: nx.DiGraph, title: str, outfile: str | None = None):
 
     except Exception as e:
         print(f"\\n❌ ERROR: Failed to generate or save the graph.")
-        print(f"   Error details: {e}")
\ No newline at end of file
+        print(f"   Error details: {e}")
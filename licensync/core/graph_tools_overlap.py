@@ -1,6 +1,14 @@
 from __future__ import annotations
+from collections import deque
 import networkx as nx
-from typing import Dict, Iterable, List, Tuple, Callable, Optional
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Set, Tuple, Callable, Optional, Union
+
+from .license_utils import license_atom, normalize_license
+
+if TYPE_CHECKING:
+    from .compact_graph import CompactGraph
+
+PairEvaluator = Callable[[List[Tuple[str, str, str]]], List[Dict[str, str]]]
 
 def build_overlap_graph(
     roots: List[Tuple[str, str]],
@@ -13,18 +21,20 @@ def build_overlap_graph(
 
     Node attrs:
       - license: SPDX id or "unknown"
-      - present_in: set of root names that can reach this node (incl. itself for roots)
+      - present_mask: int bitmask over G.graph["roots"] of the roots that can
+        reach this node (incl. itself for roots); see present_in()
       - is_root: bool
 
-    Edge attrs:
-      - source_roots: set of root names for which this edge lies on a path
+    An edge (u, v) lies on a path from every root that reaches u, so edges
+    carry no attrs of their own; see source_roots().
     """
     G = nx.DiGraph()
 
     # Add roots first
-    root_names = [r for r, _ in roots]
+    root_names = list(dict.fromkeys(r for r, _ in roots))
+    G.graph["roots"] = root_names
     for r_name, r_lic in roots:
-        G.add_node(r_name, license=r_lic or "unknown", present_in={r_name}, is_root=True)
+        G.add_node(r_name, license=r_lic or "unknown", present_mask=0, is_root=True)
 
     # Add edges and child nodes
     for e in edges:
@@ -35,10 +45,10 @@ def build_overlap_graph(
             continue
 
         if not G.has_node(parent):
-            G.add_node(parent, license="unknown", present_in=set(), is_root=False)
+            G.add_node(parent, license="unknown", present_mask=0, is_root=False)
 
         if not G.has_node(child):
-            G.add_node(child, license=lic, present_in=set(), is_root=False)
+            G.add_node(child, license=lic, present_mask=0, is_root=False)
         else:
             if (G.nodes[child].get("license") in (None, "", "unknown")) and lic not in (None, "", "unknown"):
                 G.nodes[child]["license"] = lic
@@ -46,42 +56,96 @@ def build_overlap_graph(
         if not G.has_edge(parent, child):
             G.add_edge(parent, child)
 
-    # Reachability from each root → fill present_in + tag edge source_roots
-    for r_name, _ in roots:
-        if not G.has_node(r_name):
-            continue
-        for n in (nx.descendants(G, r_name) | {r_name}):
-            G.nodes[n].setdefault("present_in", set()).add(r_name)
-        for u, v in nx.bfs_edges(G, r_name):
-            G.edges[u, v].setdefault("source_roots", set()).add(r_name)
+    # Reachability for all roots in one sweep → fill present_mask
+    for n, mask in _reachability_masks(G, root_names).items():
+        G.nodes[n]["present_mask"] = mask
 
     return G
 
 
+def _reachability_masks(G: nx.DiGraph, root_names: List[str]) -> Dict[str, int]:
+    """
+    Bit i of a node's mask is set iff root_names[i] reaches it. Masks are
+    OR-ed down the graph in topological order, over the SCC condensation when
+    there are cycles, so all roots cost one O(V+E) pass instead of one each.
+    """
+    seeds = {r: 1 << i for i, r in enumerate(root_names) if G.has_node(r)}
+    if nx.is_directed_acyclic_graph(G):
+        mask = dict.fromkeys(G, 0)
+        mask.update(seeds)
+        for u in nx.topological_sort(G):
+            m = mask[u]
+            if m:
+                for v in G.successors(u):
+                    mask[v] |= m
+        return mask
+
+    C = nx.condensation(G)
+    member_of = C.graph["mapping"]
+    scc_mask = dict.fromkeys(C, 0)
+    for r, bit in seeds.items():
+        scc_mask[member_of[r]] |= bit
+    for c in nx.topological_sort(C):
+        m = scc_mask[c]
+        if m:
+            for d in C.successors(c):
+                scc_mask[d] |= m
+    return {n: scc_mask[c] for n, c in member_of.items()}
+
+
+def roots_in_mask(G: nx.DiGraph, mask: int) -> Set[str]:
+    roots = G.graph.get("roots", [])
+    return {roots[i] for i in range(mask.bit_length()) if mask >> i & 1}
+
+
+def present_in(G: nx.DiGraph, n: str) -> Set[str]:
+    """Set of root names that can reach `n` (incl. itself for roots)."""
+    return roots_in_mask(G, G.nodes[n].get("present_mask", 0))
+
+
+def source_roots(G: nx.DiGraph, u: str, v: str) -> Set[str]:
+    """Set of root names for which edge (u, v) lies on a path."""
+    if not G.has_edge(u, v):
+        return set()
+    return present_in(G, u)
+
+
 def draw_overlap_graph(
     G: nx.DiGraph,
     title: str = "Dependency overlap",
     outfile: Optional[str] = None,
 ) -> None:
-    import matplotlib.pyplot as plt
-    pos = nx.spring_layout(G, seed=42, k=0.8 / (1 + max(1, G.number_of_nodes())), iterations=300)
+    from .layout_cache import cached_spring_layout
+    pos = cached_spring_layout(G, seed=42, k=0.8 / (1 + max(1, G.number_of_nodes())), iterations=300,
+                               kind="overlap")
 
     roots = [n for n, d in G.nodes(data=True) if d.get("is_root")]
     all_roots = set(roots)
 
+    # Graphs not built by build_overlap_graph (loaded from disk, or built by
+    # hand with is_root/present_in) may lack G.graph["roots"]; then fall back
+    # to each node's present_in set.
+    graph_roots = G.graph.get("roots") or []
+
+    def _present(d: Dict) -> Set[str]:
+        mask = d.get("present_mask")
+        if mask is not None and graph_roots and mask.bit_length() <= len(graph_roots):
+            return roots_in_mask(G, mask)
+        return set(d.get("present_in") or ())
+
     node_colors, node_sizes, labels = [], [], {}
     for n, d in G.nodes(data=True):
         lic = d.get("license", "") or ""
         labels[n] = f"{n}\n({lic})" if lic else n
-        present_in = set(d.get("present_in", set()))
         if d.get("is_root"):
             node_sizes.append(1200); node_colors.append(0.75)  # gray-ish roots
         else:
             node_sizes.append(500)
+            present = _present(d)
             if len(all_roots) <= 2:
-                node_colors.append(0.25 if len(present_in) >= 2 else (0.9 if roots and next(iter(present_in), None) == roots[0] else 0.6))
+                node_colors.append(0.25 if len(present) >= 2 else (0.9 if roots and present == {roots[0]} else 0.6))
             else:
-                node_colors.append(0.6 if len(present_in) == 1 else 0.25)
+                node_colors.append(0.6 if len(present) == 1 else 0.25)
 
     import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 8))
@@ -113,3 +177,158 @@ def mark_incompatibilities(
         except Exception:
             ok = True
         G.edges[u, v][set_edge_attr] = ok
+
+
+def find_transitive_conflicts(
+    G: Union[nx.DiGraph, "CompactGraph"],
+    jurisdiction: str = "global",
+    evaluate: Optional[PairEvaluator] = None,
+    memo: Optional[Dict[Tuple[str, str, str], Dict[str, str]]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    For every root of an overlap graph, the reachable dependencies whose
+    license is incompatible with the root's or with any ancestor's on a path
+    from that root.
+
+    Each node carries the set of license atoms above it, with a bitmask of the
+    roots each atom arrives from. The sets are merged down the graph in one
+    topological sweep for all roots, so a subtree shared by several parents or
+    repos is visited once. Every distinct (ancestor, dependency) license pair
+    is then evaluated once through `evaluate` (evaluate_pairs by default), with
+    results kept in `memo` across calls.
+
+    `G` may also be a compact_graph.CompactGraph, e.g. from
+    CompactGraph.from_csv over many repos' edge dumps; the sweep then runs on
+    its integer node ids and names are only looked up for the report.
+
+    Returns {root: [{"node", "license", "ancestor_license", "result", "risk",
+    "path"}, ...]}, where `path` runs from the root through the conflicting
+    ancestor to the node.
+    """
+    if evaluate is None:
+        from .prolog_interface import evaluate_pairs as evaluate
+    memo = {} if memo is None else memo
+    juris = normalize_license(jurisdiction)
+    root_names, roots, lic, order, succ, name = _adjacency(G)
+
+    anc = _ancestor_licenses(roots, lic, order, succ)
+
+    # One batch for every (ancestor, dependency) pair not seen before
+    todo = sorted({(a, lic[v], juris) for v, atoms in anc.items() for a in atoms
+                   if lic[v] != "unknown"} - memo.keys())
+    if todo:
+        memo.update(zip(todo, evaluate(todo)))
+
+    hits: Dict[Tuple[int, str], List[str]] = {}
+    for v, atoms in anc.items():
+        for a, mask in atoms.items():
+            if memo.get((a, lic[v], juris), {}).get("result") != "incompatible":
+                continue
+            for i in range(mask.bit_length()):
+                if mask >> i & 1:
+                    hits.setdefault((i, a), []).append(v)
+
+    report: Dict[str, List[Dict[str, Any]]] = {r: [] for r in root_names}
+    for (i, a), targets in sorted(hits.items()):
+        paths = _paths_through_license(succ, roots[i], a, set(targets), lic)
+        for v in targets:
+            verdict = memo[(a, lic[v], juris)]
+            report[name(roots[i])].append({
+                "node": name(v),
+                "license": lic[v],
+                "ancestor_license": a,
+                "result": verdict.get("result"),
+                "risk": verdict.get("risk"),
+                "path": [name(n) for n in paths.get(v, [])],
+            })
+    return report
+
+
+def _adjacency(G):
+    """
+    (root names, root node keys, key -> license atom, keys in topological
+    order when acyclic, successors(key), key -> name) for a networkx graph,
+    keyed by node name, or a CompactGraph, keyed by node id.
+    """
+    from .compact_graph import CompactGraph
+    if isinstance(G, CompactGraph):
+        roots = [i for i, r in enumerate(G.is_root.tolist()) if r]
+        lic = [license_atom(i) for i in G.license_ids.tolist()]
+        topo = G.topological_order()
+        order = list(range(len(G))) if topo is None else topo.tolist()
+        names = G.names
+        return ([names[r] for r in roots], roots, lic, order,
+                lambda u: G.successors(u).tolist(), names.__getitem__)
+    root_names = G.graph.get("roots") or [n for n, d in G.nodes(data=True) if d.get("is_root")]
+    lic = {n: normalize_license(d.get("license")) for n, d in G.nodes(data=True)}
+    order = list(nx.topological_sort(G)) if nx.is_directed_acyclic_graph(G) else list(G)
+    return (root_names, [r for r in root_names if G.has_node(r)], lic, order,
+            G.successors, lambda n: n)
+
+
+def _ancestor_licenses(roots: List[Hashable], lic, order: List[Hashable],
+                       succ: Callable[[Hashable], Iterable[Hashable]]) -> Dict[Hashable, Dict[str, int]]:
+    """node -> {license atom on some path above it: bitmask of roots whose paths carry it}."""
+    anc: Dict[Hashable, Dict[str, int]] = {n: {} for n in order}
+    reach = dict.fromkeys(order, 0)
+    for i, r in enumerate(roots):
+        reach[r] |= 1 << i
+    # In topological order every node is final when popped, so each edge is
+    # relaxed once. With cycles, nodes whose state grows are queued again
+    # until nothing changes (states only grow, so this terminates).
+    queue = deque(order)
+    queued = set(order)
+    while queue:
+        u = queue.popleft()
+        queued.discard(u)
+        mask_u = reach[u]
+        if not mask_u:
+            continue
+        out = dict(anc[u])
+        if lic[u] != "unknown":
+            out[lic[u]] = out.get(lic[u], 0) | mask_u
+        for v in succ(u):
+            changed = reach[v] | mask_u != reach[v]
+            reach[v] |= mask_u
+            atoms = anc[v]
+            for a, m in out.items():
+                old = atoms.get(a, 0)
+                if old | m != old:
+                    atoms[a] = old | m
+                    changed = True
+            if changed and v not in queued:
+                queue.append(v)
+                queued.add(v)
+    return anc
+
+
+def _paths_through_license(succ: Callable[[Hashable], Iterable[Hashable]], root: Hashable, atom: str,
+                           targets: Set[Hashable], lic) -> Dict[Hashable, List[Hashable]]:
+    """
+    Shortest path from `root` to each target that passes a strict ancestor
+    licensed `atom`. BFS over (node, seen_atom) states, so one search serves
+    every target of the same root and ancestor license.
+    """
+    start = (root, lic[root] == atom)
+    parent: Dict[Tuple[Hashable, bool], Optional[Tuple[Hashable, bool]]] = {start: None}
+    paths: Dict[Hashable, List[Hashable]] = {}
+
+    def unwind(state: Tuple[Hashable, bool]) -> List[Hashable]:
+        out = []
+        while state is not None:
+            out.append(state[0])
+            state = parent[state]
+        return out[::-1]
+
+    queue = deque([start])
+    while queue and len(paths) < len(targets):
+        state = queue.popleft()
+        u, seen = state
+        for v in succ(u):
+            if seen and v in targets and v not in paths:
+                paths[v] = unwind(state) + [v]
+            nxt = (v, seen or lic[v] == atom)
+            if nxt not in parent:
+                parent[nxt] = state
+                queue.append(nxt)
+    return paths
@@ -0,0 +1,129 @@
+# In licensync/core/layout_cache.py
+
+"""
+On-disk cache of node positions for the figure code.
+
+Positions are stored under a hash of the layout parameters plus the sorted
+node and edge lists, so drawing the same graph again skips the layout. When
+there is no exact entry, the most similar recent layout (Jaccard overlap of the
+node sets) seeds spring_layout, and only a few refinement iterations are run.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from .cache import CACHE_DIR, atomic_write
+
+LAYOUT_CACHE_DIR = Path(os.getenv("LICENSYNC_LAYOUT_CACHE_DIR", CACHE_DIR / "layouts"))
+# How many recent layouts are considered as seeds for a changed graph
+LAYOUT_RECENT = 32
+# Minimum node-set Jaccard similarity for a layout to be reused as a seed
+LAYOUT_MIN_SIMILARITY = 0.6
+REFINE_ITERATIONS = 30
+
+_lock = threading.Lock()
+
+
+def graph_key(G: nx.Graph, params: Dict) -> str:
+    """sha256 over the layout parameters and the canonical node and edge lists."""
+    h = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode())
+    for n in sorted(map(str, G.nodes)):
+        h.update(b"n\0" + n.encode() + b"\n")
+    for u, v in sorted((str(u), str(v)) for u, v in G.edges):
+        h.update(b"e\0" + u.encode() + b"\0" + v.encode() + b"\n")
+    return h.hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return LAYOUT_CACHE_DIR / f"{key}.json"
+
+
+def _read_json(path: Path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _recent(kind: str) -> List[str]:
+    return (_read_json(LAYOUT_CACHE_DIR / "recent.json") or {}).get(kind, [])
+
+
+def _store(kind: str, key: str, pos: Dict) -> None:
+    payload = {"pos": {str(n): [float(x), float(y)] for n, (x, y) in pos.items()}}
+    atomic_write(_entry_path(key), json.dumps(payload).encode())
+    with _lock:
+        index = _read_json(LAYOUT_CACHE_DIR / "recent.json") or {}
+        keys = [key] + [k for k in index.get(kind, []) if k != key]
+        for old in keys[LAYOUT_RECENT:]:
+            try:
+                _entry_path(old).unlink()
+            except OSError:
+                pass
+        index[kind] = keys[:LAYOUT_RECENT]
+        atomic_write(LAYOUT_CACHE_DIR / "recent.json", json.dumps(index).encode())
+
+
+def _nearest(kind: str, names: set) -> Tuple[float, Optional[Dict[str, List[float]]]]:
+    best, best_pos = 0.0, None
+    for key in _recent(kind):
+        entry = _read_json(_entry_path(key))
+        if not entry:
+            continue
+        old = entry["pos"]
+        inter = sum(1 for n in old if n in names)
+        sim = inter / (len(names) + len(old) - inter) if names or old else 0.0
+        if sim > best:
+            best, best_pos = sim, old
+    return best, best_pos
+
+
+def _seed_positions(G: nx.Graph, old: Dict[str, List[float]], seed: int) -> Dict:
+    """Old positions for known nodes; new nodes start next to their placed neighbours."""
+    rng = random.Random(seed)
+    pos = {n: np.array(old[str(n)]) for n in G.nodes if str(n) in old}
+    for n in G.nodes:
+        if n in pos:
+            continue
+        near = [pos[m] for m in nx.all_neighbors(G, n) if m in pos] if G.is_directed() else \
+               [pos[m] for m in G.neighbors(n) if m in pos]
+        base = np.mean(near, axis=0) if near else np.zeros(2)
+        pos[n] = base + np.array([rng.uniform(-0.05, 0.05), rng.uniform(-0.05, 0.05)])
+    return pos
+
+
+def cached_spring_layout(G: nx.Graph, seed: int = 42, k: Optional[float] = None,
+                         iterations: int = 50, refine_iterations: int = REFINE_ITERATIONS,
+                         kind: str = "spring") -> Dict:
+    """
+    nx.spring_layout(G, seed=seed, k=k, iterations=iterations), cached.
+
+    An unchanged graph returns the stored positions. A graph whose node set
+    overlaps a recent layout by at least LAYOUT_MIN_SIMILARITY starts from
+    those positions and runs `refine_iterations` instead of `iterations`.
+    """
+    params = {"kind": kind, "seed": seed, "k": k, "iterations": iterations}
+    key = graph_key(G, params)
+    entry = _read_json(_entry_path(key))
+    if entry and all(str(n) in entry["pos"] for n in G.nodes):
+        return {n: np.array(entry["pos"][str(n)]) for n in G.nodes}
+
+    sim, old = _nearest(kind, {str(n) for n in G.nodes})
+    if old is not None and sim >= LAYOUT_MIN_SIMILARITY:
+        pos = nx.spring_layout(G, pos=_seed_positions(G, old, seed), seed=seed, k=k,
+                               iterations=min(iterations, refine_iterations))
+    else:
+        pos = nx.spring_layout(G, seed=seed, k=k, iterations=iterations)
+    try:
+        _store(kind, key, pos)
+    except OSError:
+        pass
+    return pos
@@ -0,0 +1,376 @@
+# In licensync/core/license_matrix.py
+
+"""
+Dense compatibility table compiled from rules.pl.
+
+The license vocabulary in rules.pl is closed: every atom the rules know about
+appears in one of the fact families below, and evaluate_pair/5 maps any
+jurisdiction it does not recognise to `global`. Every answer can therefore be
+enumerated once and stored as two small integer arrays indexed by
+(jurisdiction, license, license). Atoms the rules have never heard of all
+behave the same way, so they share a single "other" slot.
+
+The matrix also records each license's class (permissive, weak-copyleft, ...)
+from the same fact families, for grouping and colouring graph nodes.
+
+obligation/3 is enumerated the same way into an ObligationIndex. Both are
+cached on disk, keyed by a hash of rules.pl, so Prolog is only consulted
+again when the rules change.
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import CACHE_DIR
+
+# Fact families whose members make up the closed license vocabulary.
+LICENSE_FACTS = (
+    "is_permissive",
+    "is_weak_copyleft",
+    "is_strong_copyleft",
+    "is_network_copyleft",
+    "is_non_commercial",
+    "is_source_available",
+    "is_public_domain_equivalent",
+    "is_creative_commons",
+    "has_explicit_patent_grant",
+    "has_patent_retaliation",
+    "has_strong_as_is_disclaimer",
+    "requires_source_modification_disclosure",
+    "is_gpl2_only",
+    "allows_sublicensing",
+    "requires_notice_and_copyright",
+)
+
+# Fact families that give a license its class, most restrictive first; a
+# license in several takes the first. Licenses in none are "unknown".
+LICENSE_CLASSES = (
+    ("is_network_copyleft", "network-copyleft"),
+    ("is_strong_copyleft", "strong-copyleft"),
+    ("is_non_commercial", "source-available"),
+    ("is_source_available", "source-available"),
+    ("is_weak_copyleft", "weak-copyleft"),
+    ("is_permissive", "permissive"),
+    ("is_public_domain_equivalent", "permissive"),
+)
+
+UNKNOWN = "unknown"
+OTHER = "<other>"
+DEFAULT_JURISDICTION = "global"
+
+# Stand-ins for atoms that appear in no fact. Two are needed because the
+# rules treat a license paired with itself differently from two distinct ones.
+_OTHER_A = "$licensync_other_a"
+_OTHER_B = "$licensync_other_b"
+# obligation/3 has clauses for specific jurisdictions and a default for every
+# other atom, which is not necessarily what `global` gets; probe it separately.
+_OTHER_J = "$licensync_other_j"
+
+QueryFn = Callable[[str], List[Dict]]
+
+
+def _quote(atom: str) -> str:
+    return "'" + atom.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _plist(atoms: List[str]) -> str:
+    return "[" + ",".join(_quote(a) for a in atoms) + "]"
+
+
+def rules_digest(rules_file: Path) -> str:
+    """sha256 of the rules file; any edit to the rules invalidates the cache."""
+    return hashlib.sha256(Path(rules_file).read_bytes()).hexdigest()
+
+
+class CompatibilityMatrix:
+    """O(1) lookup of evaluate_pair/5 answers for normalized license atoms."""
+
+    def __init__(self,
+                 licenses: List[str],
+                 jurisdictions: List[str],
+                 results: List[str],
+                 risks: List[str],
+                 result_codes: np.ndarray,
+                 risk_codes: np.ndarray,
+                 same_other: np.ndarray,
+                 digest: str = "",
+                 classes: Optional[List[str]] = None):
+        self.licenses = list(licenses)
+        self.jurisdictions = list(jurisdictions)
+        self.results = list(results)
+        self.risks = list(risks)
+        self.result_codes = result_codes
+        self.risk_codes = risk_codes
+        self.same_other = same_other
+        self.digest = digest
+        # None only for a cache written before classes were recorded
+        self.classes = list(classes) if classes is not None else None
+        self._lic_index = {lic: i for i, lic in enumerate(self.licenses)}
+        self._jur_index = {j: i for i, j in enumerate(self.jurisdictions)}
+        self._other = self._lic_index[OTHER]
+        self._default_j = self._jur_index[DEFAULT_JURISDICTION]
+
+    def license_index(self, atom: str) -> int:
+        return self._lic_index.get(atom, self._other)
+
+    def jurisdiction_index(self, atom: str) -> int:
+        return self._jur_index.get(atom, self._default_j)
+
+    def lookup(self, lic1: str, lic2: str, juris: str) -> Dict[str, str]:
+        """Answer for already-normalized atoms, same shape as evaluate_license_pair."""
+        j = self.jurisdiction_index(juris)
+        a = self.license_index(lic1)
+        b = self.license_index(lic2)
+        if a == self._other and b == self._other and lic1 == lic2:
+            res, risk = self.same_other[j]
+        else:
+            res, risk = self.result_codes[j, a, b], self.risk_codes[j, a, b]
+        return {"result": self.results[res], "risk": self.risks[risk]}
+
+    def license_classes(self) -> Dict[str, str]:
+        """Normalized atom -> class, for every license the rules classify."""
+        return {lic: c for lic, c in zip(self.licenses, self.classes or ()) if c != UNKNOWN}
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez_compressed(
+                fh,
+                licenses=np.array(self.licenses),
+                jurisdictions=np.array(self.jurisdictions),
+                results=np.array(self.results),
+                risks=np.array(self.risks),
+                result_codes=self.result_codes,
+                risk_codes=self.risk_codes,
+                same_other=self.same_other,
+                digest=np.array(self.digest),
+                classes=np.array(self.classes or [UNKNOWN] * len(self.licenses)),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "CompatibilityMatrix":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                licenses=data["licenses"].tolist(),
+                jurisdictions=data["jurisdictions"].tolist(),
+                results=data["results"].tolist(),
+                risks=data["risks"].tolist(),
+                result_codes=data["result_codes"],
+                risk_codes=data["risk_codes"],
+                same_other=data["same_other"],
+                digest=str(data["digest"]),
+                classes=data["classes"].tolist() if "classes" in data.files else None,
+            )
+
+
+def _license_atoms(query: QueryFn) -> List[str]:
+    atoms = set()
+    for fact in LICENSE_FACTS:
+        for row in query(f"{fact}(L)"):
+            atoms.add(str(row["L"]))
+    atoms.discard(UNKNOWN)
+    return sorted(atoms)
+
+
+def license_classes(query: QueryFn) -> Dict[str, str]:
+    """Atom -> class from the LICENSE_CLASSES fact families."""
+    classes: Dict[str, str] = {}
+    for fact, cls in LICENSE_CLASSES:
+        for row in query(f"{fact}(L)"):
+            classes.setdefault(str(row["L"]), cls)
+    return classes
+
+
+def compile_matrix(query: QueryFn, digest: str = "") -> CompatibilityMatrix:
+    """Enumerates evaluate_pair/5 over the whole vocabulary in one query."""
+    licenses = _license_atoms(query) + [UNKNOWN, OTHER]
+    jurisdictions = sorted(str(row["J"]) for row in query("is_jurisdiction(J)"))
+    if DEFAULT_JURISDICTION not in jurisdictions:
+        jurisdictions.append(DEFAULT_JURISDICTION)
+
+    # OTHER is queried as a fresh atom; OTHER x OTHER uses two distinct ones.
+    left = [_OTHER_A if lic == OTHER else lic for lic in licenses]
+    right = [_OTHER_B if lic == OTHER else lic for lic in licenses]
+    lic_index = {**{a: i for i, a in enumerate(left)}, **{a: i for i, a in enumerate(right)}}
+    jur_index = {j: i for i, j in enumerate(jurisdictions)}
+
+    n_j, n_l = len(jurisdictions), len(licenses)
+    result_codes = np.zeros((n_j, n_l, n_l), dtype=np.uint8)
+    risk_codes = np.zeros((n_j, n_l, n_l), dtype=np.uint8)
+    results: Dict[str, int] = {}
+    risks: Dict[str, int] = {}
+    seen = np.zeros((n_j, n_l, n_l), dtype=bool)
+
+    goal = (f"member(L1,{_plist(left)}), member(L2,{_plist(right)}), "
+            f"member(J,{_plist(jurisdictions)}), evaluate_pair(L1,L2,J,R,K)")
+    for row in query(goal):
+        j = jur_index[str(row["J"])]
+        a, b = lic_index[str(row["L1"])], lic_index[str(row["L2"])]
+        if seen[j, a, b]:
+            continue
+        seen[j, a, b] = True
+        result_codes[j, a, b] = results.setdefault(str(row["R"]), len(results))
+        risk_codes[j, a, b] = risks.setdefault(str(row["K"]), len(risks))
+
+    if not seen.all():
+        raise RuntimeError(f"evaluate_pair/5 left {int((~seen).sum())} license combinations unanswered")
+
+    same_other = np.zeros((n_j, 2), dtype=np.uint8)
+    for row in query(f"member(J,{_plist(jurisdictions)}), "
+                     f"evaluate_pair({_quote(_OTHER_A)},{_quote(_OTHER_A)},J,R,K)"):
+        j = jur_index[str(row["J"])]
+        same_other[j] = (results.setdefault(str(row["R"]), len(results)),
+                         risks.setdefault(str(row["K"]), len(risks)))
+
+    classes = license_classes(query)
+    return CompatibilityMatrix(
+        licenses=licenses,
+        jurisdictions=jurisdictions,
+        results=sorted(results, key=results.get),
+        risks=sorted(risks, key=risks.get),
+        result_codes=result_codes,
+        risk_codes=risk_codes,
+        same_other=same_other,
+        digest=digest,
+        classes=[classes.get(lic, UNKNOWN) for lic in licenses],
+    )
+
+
+class ObligationIndex(Mapping):
+    """
+    obligation/3 for every (license, jurisdiction) pair, as a read-only mapping
+    from normalized atoms to sorted obligation tuples. Atoms outside the
+    vocabulary resolve to the OTHER slots, like CompatibilityMatrix.
+    """
+
+    def __init__(self, licenses: List[str], jurisdictions: List[str],
+                 table: Dict[Tuple[str, str], Tuple[str, ...]], digest: str = ""):
+        self.licenses = list(licenses)
+        self.jurisdictions = list(jurisdictions)
+        self.table = table
+        self.digest = digest
+        self._lic = set(self.licenses)
+        self._jur = set(self.jurisdictions)
+
+    def _key(self, lic: str, juris: str) -> Tuple[str, str]:
+        return (lic if lic in self._lic else OTHER, juris if juris in self._jur else OTHER)
+
+    def __getitem__(self, key: Tuple[str, str]) -> Tuple[str, ...]:
+        return self.table.get(self._key(*key), ())
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.table)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def lookup(self, lic: str, juris: str) -> List[str]:
+        """Obligations for already-normalized atoms, same shape as obligations_for_license."""
+        return list(self[lic, juris])
+
+    def bulk(self, licenses: Iterable[str], juris: str) -> Dict[str, List[str]]:
+        return {lic: self.lookup(lic, juris) for lic in licenses}
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "digest": self.digest,
+            "licenses": self.licenses,
+            "jurisdictions": self.jurisdictions,
+            "table": [[l, j, list(obs)] for (l, j), obs in sorted(self.table.items())],
+        }))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ObligationIndex":
+        data = json.loads(Path(path).read_text())
+        return cls(data["licenses"], data["jurisdictions"],
+                   {(l, j): tuple(obs) for l, j, obs in data["table"]}, data["digest"])
+
+
+def compile_obligations(query: QueryFn, digest: str = "") -> ObligationIndex:
+    """Enumerates obligation/3 over the whole vocabulary in one query."""
+    licenses = _license_atoms(query) + [UNKNOWN, OTHER]
+    jurisdictions = sorted(str(row["J"]) for row in query("is_jurisdiction(J)"))
+    if DEFAULT_JURISDICTION not in jurisdictions:
+        jurisdictions.append(DEFAULT_JURISDICTION)
+    jurisdictions.append(OTHER)
+
+    lic_atoms = [_OTHER_A if lic == OTHER else lic for lic in licenses]
+    jur_atoms = [_OTHER_J if j == OTHER else j for j in jurisdictions]
+    lic_of = dict(zip(lic_atoms, licenses))
+    jur_of = dict(zip(jur_atoms, jurisdictions))
+
+    found: Dict[Tuple[str, str], set] = {}
+    for row in query(f"member(L,{_plist(lic_atoms)}), member(J,{_plist(jur_atoms)}), obligation(L,J,O)"):
+        key = (lic_of[str(row["L"])], jur_of[str(row["J"])])
+        found.setdefault(key, set()).add(str(row["O"]))
+    table = {key: tuple(sorted(obs)) for key, obs in found.items()}
+    return ObligationIndex(licenses, jurisdictions, table, digest)
+
+
+def matrix_path(digest: str, cache_dir: Optional[Path] = None) -> Path:
+    return (cache_dir or CACHE_DIR) / f"matrix-{digest[:16]}.npz"
+
+
+def load_matrix(rules_file: Path, query: QueryFn, cache_dir: Optional[Path] = None) -> CompatibilityMatrix:
+    """Returns the cached table for this version of rules.pl, compiling it on a miss."""
+    digest = rules_digest(rules_file)
+    path = matrix_path(digest, cache_dir)
+    if path.exists():
+        try:
+            matrix = CompatibilityMatrix.load(path)
+            if matrix.digest == digest and matrix.classes is not None:
+                return matrix
+        except Exception as e:
+            print(f"Warning: ignoring unreadable matrix cache {path}: {e}")
+
+    matrix = compile_matrix(query, digest)
+    try:
+        matrix.save(path)
+    except OSError as e:
+        print(f"Warning: could not write matrix cache {path}: {e}")
+    return matrix
+
+
+def obligations_path(digest: str, cache_dir: Optional[Path] = None) -> Path:
+    return (cache_dir or CACHE_DIR) / f"obligations-{digest[:16]}.json"
+
+
+def load_obligations(rules_file: Path, query: QueryFn, cache_dir: Optional[Path] = None) -> ObligationIndex:
+    """Returns the cached obligations index for this version of rules.pl, compiling it on a miss."""
+    digest = rules_digest(rules_file)
+    path = obligations_path(digest, cache_dir)
+    if path.exists():
+        try:
+            index = ObligationIndex.load(path)
+            if index.digest == digest:
+                return index
+        except Exception as e:
+            print(f"Warning: ignoring unreadable obligations cache {path}: {e}")
+
+    index = compile_obligations(query, digest)
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"Warning: could not write obligations cache {path}: {e}")
+    return index
+
+
+if __name__ == "__main__":
+    from licensync.core.prolog_interface import PROLOG_FILE, compatibility_matrix, obligations_index
+    m = compatibility_matrix()
+    print(f"Compiled {len(m.licenses)} licenses x {len(m.jurisdictions)} jurisdictions "
+          f"from {PROLOG_FILE} -> {matrix_path(m.digest)}")
+    o = obligations_index()
+    print(f"Compiled {len(o)} obligation entries -> {obligations_path(o.digest)}")
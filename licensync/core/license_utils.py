@@ -1,6 +1,9 @@
 # In licensync/core/license_utils.py
 
 import re
+import threading
+from functools import lru_cache
+from typing import Dict, List
 
 # This dictionary maps various SPDX string formats to the simple atoms used in rules.pl
 SPDX_TO_PROLOG = {
@@ -33,25 +36,61 @@ SPDX_TO_PROLOG = {
     "unknown": "unknown",
 }
 
-def normalize_license(license_str: str) -> str:
-    """
-    Cleans and normalizes a license string to its corresponding Prolog atom.
-    """
-    if not license_str:
-        return "unknown"
-    
+# Raw SPDX strings are high-cardinality but heavily repeated across SBOMs and
+# edge CSVs, so normalisation results are memoised up to this many entries.
+NORMALIZE_CACHE_SIZE = 4096
+
+_PAREN_SUFFIX_RE = re.compile(r'\\s*\\(.*\\)\\s*$')
+_SEPARATOR_RE = re.compile(r'[\\s_]+')
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize(s: str) -> str:
     # Convert to lowercase and strip whitespace
-    s = str(license_str).strip().lower()
-    
+    s = s.strip().lower()
+
     # Remove trailing text in parentheses, e.g., "bsd-3-clause (new or revised)"
-    s = re.sub(r'\\s*\\(.*\\)\\s*$', '', s)
-    
+    s = _PAREN_SUFFIX_RE.sub('', s)
+
     # Use the dictionary for direct lookups
     if s in SPDX_TO_PROLOG:
         return SPDX_TO_PROLOG[s]
-    
+
     # Fallback for other minor variations, like replacing spaces/underscores with a dash
-    s = re.sub(r'[\\s_]+', '-', s)
-    
+    s = _SEPARATOR_RE.sub('-', s)
+
     # Check the dictionary again after cleanup
-    return SPDX_TO_PROLOG.get(s, s)
\ No newline at end of file
+    return SPDX_TO_PROLOG.get(s, s)
+
+def normalize_license(license_str: str) -> str:
+    """
+    Cleans and normalizes a license string to its corresponding Prolog atom.
+    """
+    if not license_str:
+        return "unknown"
+    return _normalize(str(license_str))
+
+# --- Interned license IDs ---
+# Canonical atoms from SPDX_TO_PROLOG get fixed IDs ("unknown" is always 0, the
+# rest in sorted order); any other atom is interned on first sight, so graph
+# and matrix code can store small ints instead of repeated strings.
+UNKNOWN_ID = 0
+_ID_TO_ATOM: List[str] = ["unknown"] + sorted(set(SPDX_TO_PROLOG.values()) - {"unknown"})
+_ATOM_TO_ID: Dict[str, int] = {atom: i for i, atom in enumerate(_ID_TO_ATOM)}
+_intern_lock = threading.Lock()
+
+def license_id(license_str: str) -> int:
+    """Returns the stable integer ID of a license's normalized atom."""
+    atom = normalize_license(license_str)
+    lid = _ATOM_TO_ID.get(atom)
+    if lid is None:
+        with _intern_lock:
+            lid = _ATOM_TO_ID.get(atom)
+            if lid is None:
+                lid = len(_ID_TO_ATOM)
+                _ID_TO_ATOM.append(atom)
+                _ATOM_TO_ID[atom] = lid
+    return lid
+
+def license_atom(lid: int) -> str:
+    """Inverse of license_id."""
+    return _ID_TO_ATOM[lid]
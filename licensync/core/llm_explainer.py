@@ -1,15 +1,26 @@
 # In licensync/core/llm_explainer.py
 
+import asyncio
+import hashlib
+import json
 import os
+import threading
 import time
 import textwrap
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Sequence
+
+from .cache import CACHE_DIR, atomic_write
 
 # --- Configuration (remains the same) ---
 MODEL        = os.getenv("LICENSYN_LLM_MODEL",  "gpt-4o") # Using a more advanced model is recommended
 MAX_TOKENS   = int(os.getenv("LICENSYNC_LLM_TOKENS",  "200"))
 TEMPERATURE  = float(os.getenv("LICENSYNC_LLM_TEMP",   "0.2"))
 OPENAI_KEY   = os.getenv("OPENAI_API_KEY")
+# Any OpenAI-compatible endpoint, e.g. a local mock server for tests
+BASE_URL     = os.getenv("LICENSYNC_LLM_BASE_URL") or None
+CONCURRENCY  = int(os.getenv("LICENSYNC_LLM_CONCURRENCY", "8"))
+EXPLAIN_CACHE_DIR = Path(os.getenv("LICENSYNC_LLM_CACHE_DIR", CACHE_DIR / "explanations"))
 
 # --- Helper function (remains the same) ---
 def _fmt_obligations(obligations: List[str]) -> str:
@@ -17,17 +28,59 @@ def _fmt_obligations(obligations: List[str]) -> str:
         return "  • No specific obligations found."
     return "\\n".join(f"  • {o.capitalize().replace('_', ' ')}" for o in obligations)
 
+# --- Shared client and explanation cache ---
+_client = None
+_client_lock = threading.Lock()
+
+def _get_client():
+    """One OpenAI client per process (it pools connections); None if openai is missing."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                try:
+                    from openai import OpenAI
+                except ImportError:
+                    return None
+                _client = OpenAI(api_key=OPENAI_KEY, base_url=BASE_URL)
+    return _client
+
+def _cache_key(messages: List[Dict[str, Any]]) -> str:
+    """An explanation is a pure function of the prompt and the model settings."""
+    payload = {"model": MODEL, "temperature": TEMPERATURE, "max_tokens": MAX_TOKENS,
+               "base_url": BASE_URL, "messages": messages}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _cache_path(key: str) -> Path:
+    return EXPLAIN_CACHE_DIR / key[:2] / f"{key}.json"
+
+def _cache_get(key: str) -> Optional[str]:
+    try:
+        return json.loads(_cache_path(key).read_text())["content"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _cache_put(key: str, content: str) -> None:
+    try:
+        atomic_write(_cache_path(key), json.dumps({"model": MODEL, "content": content}).encode("utf-8"))
+    except OSError:
+        pass
+
 def _chat(messages: List[Dict[str, Any]]) -> str:
     """
     Connects to the OpenAI API using the modern (v1.0.0+) library syntax.
+    Successful answers are cached on disk, keyed by prompt and model settings.
     """
+    key = _cache_key(messages)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
     if not OPENAI_KEY:
         return "[LLM explanation unavailable: OPENAI_API_KEY not set]"
-    
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=OPENAI_KEY)
-    except ImportError:
+
+    client = _get_client()
+    if client is None:
         return "[LLM explanation unavailable: The 'openai' library is not installed or is too old.]"
 
     for attempt in range(3):
@@ -39,7 +92,9 @@ def _chat(messages: List[Dict[str, Any]]) -> str:
                 temperature=TEMPERATURE,
                 max_tokens=MAX_TOKENS,
             )
-            return response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
+            _cache_put(key, content)
+            return content
         except Exception as e:
             if attempt == 2:
                 return f"[LLM explanation unavailable after 3 attempts. Error: {e}]"
@@ -48,13 +103,12 @@ def _chat(messages: List[Dict[str, Any]]) -> str:
 
 
 # --- Prompt Generation function (remains the same) ---
-def generate_explanation(lic1: str,
-                         lic2: str,
-                         jurisdiction: str,
-                         verdict: str,
-                         obligations1: List[str],
-                         obligations2: List[str]) -> str:
-    # This function is correct and does not need changes
+def _messages(lic1: str,
+              lic2: str,
+              jurisdiction: str,
+              verdict: str,
+              obligations1: List[str],
+              obligations2: List[str]) -> List[Dict[str, Any]]:
     prompt = textwrap.dedent(f"""
     **Case Details:**
     - **License A:** {lic1.upper()}
@@ -74,7 +128,44 @@ def generate_explanation(lic1: str,
     Explain how the specific obligations of the two licenses conflict or align to produce the given verdict.
     """)
     system_message = "You are a precise and knowledgeable open-source compliance lawyer. Your task is to provide clear, evidence-based rationales for license compatibility verdicts."
-    return _chat([
+    return [
         {"role": "system", "content": system_message},
         {"role": "user", "content": prompt},
-    ])
\ No newline at end of file
+    ]
+
+def generate_explanation(lic1: str,
+                         lic2: str,
+                         jurisdiction: str,
+                         verdict: str,
+                         obligations1: List[str],
+                         obligations2: List[str]) -> str:
+    return _chat(_messages(lic1, lic2, jurisdiction, verdict, obligations1, obligations2))
+
+
+# --- Batch API ---
+async def agenerate_explanations(cases: Iterable[Sequence[Any]],
+                                 concurrency: int = CONCURRENCY) -> List[str]:
+    """
+    generate_explanation for many cases, each a tuple of its six arguments.
+    Identical prompts are sent once, at most `concurrency` requests are in
+    flight, and results come back aligned with `cases`.
+    """
+    prompts = [_messages(*case) for case in cases]
+    unique: Dict[str, List[Dict[str, Any]]] = {}
+    keys = []
+    for messages in prompts:
+        key = _cache_key(messages)
+        unique.setdefault(key, messages)
+        keys.append(key)
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+    async def one(messages):
+        async with sem:
+            return await asyncio.to_thread(_chat, messages)
+
+    answers = dict(zip(unique, await asyncio.gather(*(one(m) for m in unique.values()))))
+    return [answers[k] for k in keys]
+
+def generate_explanations(cases: Iterable[Sequence[Any]], concurrency: int = CONCURRENCY) -> List[str]:
+    """Blocking wrapper around agenerate_explanations."""
+    return asyncio.run(agenerate_explanations(cases, concurrency))
\ No newline at end of file
@@ -0,0 +1,317 @@
+# In licensync/core/local_deps.py
+
+"""
+Offline dependency loading from a checkout on disk.
+
+Walks the tree (skipping .git, node_modules, virtualenvs and vendored code),
+parses every manifest and lockfile it finds on a thread pool, and returns the
+same {"name", "license", "parent"} edge dicts as flatten_sbom. Lockfiles give
+the full transitive tree; a directory's manifest is only used for its direct
+dependencies. Nothing here touches the network.
+"""
+
+import json
+import os
+import pathlib
+import re
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None  # pyproject.toml and poetry.lock are then skipped
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from .license_utils import normalize_license
+
+PRUNE_DIRS = {
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "jspm_packages",
+    ".venv", "venv", ".tox", ".nox", "__pycache__", ".mypy_cache", ".pytest_cache",
+    "site-packages", "vendor", "vendored", "third_party", "third-party",
+    "dist", "build", ".next", ".yarn",
+}
+
+LOCKFILES = ("package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "poetry.lock")
+MANIFESTS = ("package.json", "pyproject.toml")
+_REQUIREMENTS_RE = re.compile(r"^requirements[\w.-]*\.txt$")
+
+LOCAL_WORKERS = int(os.getenv("LICENSYNC_LOCAL_WORKERS", "8"))
+
+Edge = Dict[str, str]
+
+
+def _wanted(filename: str) -> bool:
+    return filename in LOCKFILES or filename in MANIFESTS or bool(_REQUIREMENTS_RE.match(filename))
+
+
+def find_manifest_dirs(root: pathlib.Path) -> Dict[pathlib.Path, List[str]]:
+    """{directory: [manifest/lockfile names]} under root, pruning PRUNE_DIRS."""
+    found: Dict[pathlib.Path, List[str]] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in PRUNE_DIRS and not d.startswith(".")]
+        names = sorted(f for f in filenames if _wanted(f))
+        if names:
+            found[pathlib.Path(dirpath)] = names
+    return found
+
+
+# --- Python ---
+
+def _pep503(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(spec: str) -> Optional[str]:
+    """'requests[socks]>=2; python_version<"3.8"' -> 'requests'; None for options and URLs."""
+    spec = spec.split("#", 1)[0].strip()
+    if not spec or spec.startswith(("-", "git+", "http:", "https:", "file:", ".", "/")):
+        return None
+    m = re.match(r"[A-Za-z0-9][A-Za-z0-9._-]*", spec)
+    return m.group(0) if m else None
+
+
+def parse_requirements_file(text: str) -> List[str]:
+    return [n for n in (requirement_name(line) for line in text.splitlines()) if n]
+
+
+def parse_pyproject_file(text: str) -> List[str]:
+    """Direct dependencies from PEP 621 and Poetry tables."""
+    if tomllib is None:
+        return []
+    try:
+        data = tomllib.loads(text)
+    except tomllib.TOMLDecodeError:
+        return []
+    names: List[str] = []
+    project = data.get("project", {})
+    specs = list(project.get("dependencies", []))
+    for extra in project.get("optional-dependencies", {}).values():
+        specs.extend(extra)
+    names.extend(n for n in map(requirement_name, specs) if n)
+    poetry = data.get("tool", {}).get("poetry", {})
+    tables = [poetry.get("dependencies", {}), poetry.get("dev-dependencies", {})]
+    tables.extend(g.get("dependencies", {}) for g in poetry.get("group", {}).values())
+    for table in tables:
+        names.extend(n for n in table if n.lower() != "python")
+    return list(dict.fromkeys(names))
+
+
+def parse_poetry_lock(text: str, root: str, direct: Optional[List[str]] = None) -> List[Edge]:
+    if tomllib is None:
+        return []
+    try:
+        packages = tomllib.loads(text).get("package", [])
+    except tomllib.TOMLDecodeError:
+        return []
+    by_key = {_pep503(p["name"]): p["name"] for p in packages if p.get("name")}
+    edges: List[Edge] = []
+    required: Set[str] = set()
+    for p in packages:
+        for dep in p.get("dependencies", {}):
+            child = by_key.get(_pep503(dep))
+            if child:
+                required.add(child)
+                edges.append({"name": child, "license": "unknown", "parent": p["name"]})
+    tops = [by_key.get(_pep503(n)) for n in direct] if direct else \
+           [n for n in by_key.values() if n not in required]
+    edges[:0] = [{"name": n, "license": "unknown", "parent": root} for n in tops if n]
+    return edges
+
+
+# --- npm ---
+
+def parse_package_json_file(text: str) -> List[str]:
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    names: List[str] = []
+    for key in ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies"):
+        if isinstance(data.get(key), dict):
+            names.extend(data[key])
+    return list(dict.fromkeys(names))
+
+
+def _npm_license(entry: Dict) -> str:
+    lic = entry.get("license") or "unknown"
+    if isinstance(lic, dict):  # old {"type": "MIT", "url": ...} form
+        lic = lic.get("type") or "unknown"
+    return normalize_license(lic)
+
+
+def _lock_v2(packages: Dict[str, Dict], root: str) -> List[Edge]:
+    """npm lockfile v2/v3: flat "packages" map keyed by install path."""
+    def name_of(path: str) -> str:
+        return packages[path].get("name") or path.rsplit("node_modules/", 1)[-1]
+
+    def resolve(path: str, dep: str) -> Optional[str]:
+        # Node resolution: nearest node_modules/<dep> walking up from `path`
+        base = path
+        while True:
+            cand = f"{base}/node_modules/{dep}" if base else f"node_modules/{dep}"
+            if cand in packages:
+                return cand
+            if not base:
+                return None
+            idx = base.rfind("/node_modules/")
+            base = base[:idx] if idx >= 0 else ""
+
+    edges: List[Edge] = []
+    for path, entry in packages.items():
+        if entry.get("link"):
+            continue
+        parent = root if path == "" else name_of(path)
+        deps = dict(entry.get("dependencies", {}))
+        deps.update(entry.get("optionalDependencies", {}))
+        if path == "":
+            deps.update(entry.get("devDependencies", {}))
+        for dep in deps:
+            child = resolve(path, dep)
+            if child is None:
+                continue
+            edges.append({"name": name_of(child), "license": _npm_license(packages[child]), "parent": parent})
+    return edges
+
+
+def _lock_v1(deps: Dict[str, Dict], root: str, direct: Optional[List[str]]) -> List[Edge]:
+    """npm lockfile v1: nested "dependencies" with "requires" ranges."""
+    edges: List[Edge] = []
+    required: Set[str] = set()
+
+    def walk(scope: Dict[str, Dict], chain: List[Dict[str, Dict]]):
+        for name, entry in scope.items():
+            nested = entry.get("dependencies", {})
+            lookup = [nested] + chain
+            for dep in entry.get("requires", {}):
+                if any(dep in s for s in lookup):
+                    required.add(dep)
+                    edges.append({"name": dep, "license": "unknown", "parent": name})
+            if nested:
+                walk(nested, lookup)
+
+    walk(deps, [deps])
+    tops = [n for n in direct if n in deps] if direct else [n for n in deps if n not in required]
+    edges[:0] = [{"name": n, "license": "unknown", "parent": root} for n in tops]
+    return edges
+
+
+def parse_package_lock(text: str, root: str, direct: Optional[List[str]] = None) -> List[Edge]:
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    if isinstance(data.get("packages"), dict) and data["packages"]:
+        return _lock_v2(data["packages"], root)
+    return _lock_v1(data.get("dependencies", {}) or {}, root, direct)
+
+
+_YARN_KEY_RE = re.compile(r'^("?)(@?[^@"\s]+)@')
+
+
+def _yarn_name(spec: str) -> Optional[str]:
+    m = _YARN_KEY_RE.match(spec.strip())
+    return m.group(2) if m else None
+
+
+def parse_yarn_lock(text: str, root: str, direct: Optional[List[str]] = None) -> List[Edge]:
+    """yarn.lock v1 and berry: entry headers at column 0, dependencies indented below."""
+    entries: List[Tuple[str, List[str]]] = []
+    name, deps, in_deps = None, [], False
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent == 0:
+            if name:
+                entries.append((name, deps))
+            name, deps, in_deps = None, [], False
+            if line.startswith("__metadata"):
+                continue
+            name = _yarn_name(line.rstrip(":").split(",")[0])
+        elif indent == 2:
+            in_deps = line.strip().rstrip(":") in ("dependencies", "optionalDependencies")
+        elif in_deps and indent >= 4:
+            dep = line.strip().split(" ", 1)[0].rstrip(":").strip('"')
+            if dep:
+                deps.append(dep)
+    if name:
+        entries.append((name, deps))
+
+    known = {n for n, _ in entries}
+    edges: List[Edge] = []
+    required: Set[str] = set()
+    seen: Set[Tuple[str, str]] = set()
+    for parent, children in entries:
+        for child in children:
+            if child in known and (parent, child) not in seen:
+                seen.add((parent, child))
+                required.add(child)
+                edges.append({"name": child, "license": "unknown", "parent": parent})
+    tops = [n for n in direct if n in known] if direct else \
+           [n for n in dict.fromkeys(n for n, _ in entries) if n not in required]
+    edges[:0] = [{"name": n, "license": "unknown", "parent": root} for n in tops]
+    return edges
+
+
+# --- Per-directory assembly ---
+
+def _read(path: pathlib.Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return ""
+
+
+def parse_directory(directory: pathlib.Path, names: List[str], root: str) -> List[Edge]:
+    """
+    Edges for one directory. A lockfile supersedes its manifest, which then
+    only supplies the direct dependencies.
+    """
+    files = set(names)
+    edges: List[Edge] = []
+
+    npm_direct = parse_package_json_file(_read(directory / "package.json")) if "package.json" in files else None
+    npm_lock = next((f for f in ("package-lock.json", "npm-shrinkwrap.json") if f in files), None)
+    if npm_lock:
+        edges += parse_package_lock(_read(directory / npm_lock), root, npm_direct)
+    elif "yarn.lock" in files:
+        edges += parse_yarn_lock(_read(directory / "yarn.lock"), root, npm_direct)
+    elif npm_direct:
+        edges += [{"name": n, "license": "unknown", "parent": root} for n in npm_direct]
+
+    py_direct = parse_pyproject_file(_read(directory / "pyproject.toml")) if "pyproject.toml" in files else []
+    if "poetry.lock" in files:
+        edges += parse_poetry_lock(_read(directory / "poetry.lock"), root, py_direct or None)
+    else:
+        for f in names:
+            if _REQUIREMENTS_RE.match(f):
+                py_direct += parse_requirements_file(_read(directory / f))
+        edges += [{"name": n, "license": "unknown", "parent": root} for n in dict.fromkeys(py_direct)]
+    return edges
+
+
+def load_local_edges(local_path: pathlib.Path,
+                     root_name: Optional[str] = None,
+                     max_workers: Optional[int] = None) -> List[Edge]:
+    """
+    flatten_sbom-style edges for a checkout on disk. Direct dependencies hang
+    off `root_name` (default: the directory name). Edges are de-duplicated and
+    keep a stable order (directory walk order, then file order).
+    """
+    local_path = pathlib.Path(local_path).resolve()
+    root = root_name or local_path.name
+    dirs = find_manifest_dirs(local_path)
+    workers = max(1, min(max_workers or LOCAL_WORKERS, len(dirs) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parsed = list(pool.map(lambda item: parse_directory(item[0], item[1], root), dirs.items()))
+
+    out: Dict[Tuple[str, str], Edge] = {}
+    for edges in parsed:
+        for e in edges:
+            key = (e["parent"], e["name"])
+            prev = out.get(key)
+            if prev is None or (prev["license"] == "unknown" and e["license"] != "unknown"):
+                out[key] = e
+    return list(out.values())
@@ -0,0 +1,117 @@
+# In licensync/core/metrics.py
+
+"""
+Evaluation statistics shared by scripts/eval_edges.py and scripts/advanced_eval.py:
+precision/recall/F1 from counts, a vectorised bootstrap CI for F1, and an
+exact McNemar test.
+"""
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Upper bound on resampled cells held at once by the index-matrix bootstrap
+BOOTSTRAP_MAX_CELLS = 1 << 24
+
+
+def f1_from_counts(tp, fp, fn):
+    """(precision, recall, f1); works on scalars or on numpy arrays of counts."""
+    tp, fp, fn = (np.asarray(x, dtype=float) for x in (tp, fp, fn))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        rec = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(prec + rec > 0, 2 * prec * rec / (prec + rec), 0.0)
+    if f1.ndim == 0:
+        return float(prec), float(rec), float(f1)
+    return prec, rec, f1
+
+
+def _labels(y_true: Sequence, y_pred: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Boolean arrays of the pairs that have a prediction (None = abstained)."""
+    pairs = [(bool(t), bool(p)) for t, p in zip(y_true, y_pred) if p is not None]
+    if not pairs:
+        return np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+    a = np.asarray(pairs, dtype=bool)
+    return a[:, 0], a[:, 1]
+
+
+def _percentiles(scores: np.ndarray) -> Tuple[float, float, float]:
+    # Same order statistics the scripts always reported
+    scores = np.sort(scores)
+    n = len(scores)
+    return float(scores[int(0.5 * n)]), float(scores[int(0.025 * n)]), float(scores[int(0.975 * n)])
+
+
+def bootstrap_f1(y_true: Sequence, y_pred: Sequence, n_boot: int = 1000, seed: int = 42,
+                 method: str = "multinomial",
+                 max_cells: int = BOOTSTRAP_MAX_CELLS) -> Tuple[float, float, float]:
+    """
+    (median, 2.5%, 97.5%) of F1 over `n_boot` bootstrap replicates; pairs whose
+    prediction is None are left out.
+
+    F1 only depends on how many resampled rows land in each TP/FP/FN/TN cell,
+    so by default each replicate draws those four counts from a multinomial
+    (the same distribution as resampling rows, at O(n_boot) cost).
+    method="indices" resamples rows explicitly as an (n_boot, n) index matrix,
+    processed in chunks of at most `max_cells` entries.
+    """
+    yt, yp = _labels(y_true, y_pred)
+    n = len(yt)
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    rng = np.random.default_rng(seed)
+
+    if method == "multinomial":
+        cells = np.array([np.sum(yt & yp), np.sum(~yt & yp), np.sum(yt & ~yp), np.sum(~yt & ~yp)])
+        counts = rng.multinomial(n, cells / n, size=n_boot)
+        tp, fp, fn = counts[:, 0], counts[:, 1], counts[:, 2]
+    elif method == "indices":
+        rows = max(1, max_cells // n)
+        tp, fp, fn = (np.empty(n_boot, dtype=np.int64) for _ in range(3))
+        for start in range(0, n_boot, rows):
+            stop = min(n_boot, start + rows)
+            idx = rng.integers(0, n, size=(stop - start, n))
+            t, p = yt[idx], yp[idx]
+            tp[start:stop] = np.count_nonzero(t & p, axis=1)
+            fp[start:stop] = np.count_nonzero(~t & p, axis=1)
+            fn[start:stop] = np.count_nonzero(t & ~p, axis=1)
+    else:
+        raise ValueError(f"unknown bootstrap method {method!r}")
+
+    _, _, f1 = f1_from_counts(tp, fp, fn)
+    return _percentiles(f1)
+
+
+def binom_cdf_half(k: int, n: int) -> float:
+    """P[X <= k] for X ~ Binomial(n, 1/2), summed in log space."""
+    if k < 0:
+        return 0.0
+    if k >= n:
+        return 1.0
+    i = np.arange(1, k + 1, dtype=float)
+    # log C(n, j) for j = 0..k, built up as a running sum of log((n-j+1)/j)
+    log_comb = np.concatenate(([0.0], np.cumsum(np.log(n - i + 1) - np.log(i))))
+    log_terms = log_comb - n * np.log(2.0)
+    top = log_terms.max()
+    return float(min(1.0, np.exp(top) * np.exp(log_terms - top).sum()))
+
+
+def mcnemar_exact(b: int, c: int) -> float:
+    """Two-sided exact McNemar p-value from the discordant counts b and c."""
+    n = b + c
+    if n == 0:
+        return 1.0
+    return min(1.0, 2.0 * binom_cdf_half(min(b, c), n))
+
+
+def discordant_counts(y_pred1: Sequence, y_pred2: Sequence, y_true: Sequence) -> Tuple[int, int]:
+    """
+    (b, c): b = model 1 wrong and model 2 right, c = model 1 right and model 2
+    wrong, over the rows where both models made a prediction.
+    """
+    rows = [(p1, p2, t) for p1, p2, t in zip(y_pred1, y_pred2, y_true) if p1 is not None and p2 is not None]
+    if not rows:
+        return 0, 0
+    a = np.asarray(rows, dtype=bool)
+    err1, err2 = a[:, 0] != a[:, 2], a[:, 1] != a[:, 2]
+    return int(np.sum(err1 & ~err2)), int(np.sum(~err1 & err2))
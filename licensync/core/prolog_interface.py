@@ -1,23 +1,56 @@
 # In licensync/core/prolog_interface.py
 
 from __future__ import annotations
-import subprocess
 import re
+import threading
 from pathlib import Path
-from typing import List, Dict
-from pyswip import Prolog
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from .license_utils import normalize_license
 
+if TYPE_CHECKING:
+    from .license_matrix import CompatibilityMatrix, ObligationIndex
+
 PROLOG_FILE: Path = (
     Path(__file__).resolve().parent.parent / "prolog_rules" / "rules.pl"
 ).resolve()
 
-prolog = Prolog()
-try:
-    prolog.consult(str(PROLOG_FILE))
-except Exception as e:
-    print(f"FATAL: Could not consult Prolog rules file at {PROLOG_FILE}. Error: {e}")
+# The SWI-Prolog engine is started and rules.pl consulted on the first query,
+# not at import. With a cached compatibility matrix most runs never start it.
+prolog = None
+
+# pyswip drives a single SWI-Prolog engine; queries from concurrent callers
+# must not interleave, so every query goes through this lock.
+_prolog_lock = threading.Lock()
+
+_engine_error: Optional[Exception] = None
+
+def _engine():
+    """
+    The shared engine, started on first use. Call with _prolog_lock held.
+    If pyswip or SWI-Prolog is missing, that error is re-raised from then on.
+    """
+    global prolog, _engine_error
+    if prolog is None:
+        if _engine_error is not None:
+            raise _engine_error
+        try:
+            from pyswip import Prolog
+            engine = Prolog()
+        except Exception as e:
+            _engine_error = e
+            raise
+        try:
+            engine.consult(str(PROLOG_FILE))
+        except Exception as e:
+            print(f"FATAL: Could not consult Prolog rules file at {PROLOG_FILE}. Error: {e}")
+        prolog = engine
+    return prolog
+
+def _query(goal: str, maxresult: int = -1) -> List[Dict]:
+    """Runs a goal on the shared, consulted engine and returns its solutions."""
+    with _prolog_lock:
+        return list(_engine().query(goal, maxresult=maxresult))
 
 def _atom(s: str) -> str:
     """Returns a string formatted as a valid Prolog atom."""
@@ -26,43 +59,184 @@ def _atom(s: str) -> str:
     else:
         return f"'{s}'"
 
+_matrix: Optional["CompatibilityMatrix"] = None
+# A failed load or compile is remembered, so later calls go straight to the
+# Prolog fallback instead of re-hashing rules.pl and retrying each time.
+_matrix_error: Optional[Exception] = None
+_matrix_lock = threading.Lock()
+
+def compatibility_matrix() -> "CompatibilityMatrix":
+    """
+    The compiled verdict table for the current rules.pl, loaded or built once
+    per process. Raises the original error, on this and every later call, if
+    it could not be built.
+    """
+    global _matrix, _matrix_error
+    if _matrix is None:
+        with _matrix_lock:
+            if _matrix is None and _matrix_error is None:
+                try:
+                    from .license_matrix import load_matrix
+                    _matrix = load_matrix(PROLOG_FILE, _query)
+                except Exception as e:
+                    print(f"Warning: compatibility matrix unavailable, querying Prolog directly. Error: {e}")
+                    _matrix_error = e
+            if _matrix is None:
+                raise _matrix_error
+    return _matrix
+
+def _prolog_evaluate(l1: str, l2: str, j: str) -> Dict[str, str]:
+    """Asks the in-process Prolog engine directly; used when no matrix is available."""
+    query = f"evaluate_pair({_atom(l1)},{_atom(l2)},{_atom(j)},Result,Risk)"
+    try:
+        rows = _query(query, maxresult=1)
+    except Exception as e:
+        return {"result": f"Error: {e}", "risk": "undefined"}
+    if not rows:
+        return {"result": "unknown_license", "risk": "undefined"}
+    return {"result": str(rows[0]["Result"]), "risk": str(rows[0]["Risk"])}
+
 def evaluate_license_pair(lic1: str, lic2: str, juris: str) -> Dict[str, str]:
-    """Calls SWI-Prolog to evaluate a pair of licenses."""
+    """Evaluates a pair of licenses from the compiled matrix, falling back to Prolog."""
     norm_lic1 = normalize_license(lic1)
     norm_lic2 = normalize_license(lic2)
     norm_juris = normalize_license(juris)
-    l1 = _atom(norm_lic1)
-    l2 = _atom(norm_lic2)
-    j  = _atom(norm_juris)
-    
-    query = f"evaluate_pair({l1},{l2},{j},Result,Risk), format('~w,~w', [Result, Risk]), halt."
-    command = ["swipl", "-q", "-s", str(PROLOG_FILE), "-g", query]
     try:
-        proc = subprocess.run(command, capture_output=True, text=True, timeout=10)
-        if proc.returncode != 0:
-            return {"result": f"Error: {proc.stderr.strip()}", "risk": "undefined"}
-        output = proc.stdout.strip().split(',')
-        return {"result": output[0], "risk": output[1]} if len(output) == 2 else {"result": "unknown_license", "risk": "undefined"}
+        matrix = compatibility_matrix()
+    except Exception:
+        return _prolog_evaluate(norm_lic1, norm_lic2, norm_juris)
+    return matrix.lookup(norm_lic1, norm_lic2, norm_juris)
+
+def _evaluate_unique(triples: Sequence[Tuple[str, str, str]]) -> List[Dict[str, str]]:
+    """Evaluates distinct normalized (lic1, lic2, juris) triples."""
+    try:
+        matrix = compatibility_matrix()
+    except Exception:
+        pass
+    else:
+        return [matrix.lookup(l1, l2, j) for l1, l2, j in triples]
+
+    # No matrix: answer every triple in a single Prolog round trip.
+    results = [{"result": "unknown_license", "risk": "undefined"} for _ in triples]
+    if not triples:
+        return results
+    items = ",".join(f"{i}-{_atom(l1)}-{_atom(l2)}-{_atom(j)}" for i, (l1, l2, j) in enumerate(triples))
+    try:
+        rows = _query(f"member(I-L1-L2-J, [{items}]), evaluate_pair(L1,L2,J,Result,Risk)")
     except Exception as e:
-        return {"result": f"Error: {e}", "risk": "undefined"}
+        return [{"result": f"Error: {e}", "risk": "undefined"} for _ in triples]
+    for row in rows:
+        results[int(row["I"])] = {"result": str(row["Result"]), "risk": str(row["Risk"])}
+    return results
 
-def obligations_for_license(lic: str, jur: str) -> List[str]:
-    """Queries Prolog for the obligations of a given license."""
-    norm_lic = normalize_license(lic)
-    norm_jur = normalize_license(jur)  # Also normalize the jurisdiction
+def evaluate_pairs(pairs: Iterable[Sequence[Any]], jurisdiction: str = "global") -> List[Dict[str, str]]:
+    """
+    Evaluates many license pairs at once.
 
-    q = f"obligation({_atom(norm_lic)}, {_atom(norm_jur)}, Obligation)."
+    `pairs` is an iterable of (lic1, lic2) or (lic1, lic2, jurisdiction) tuples,
+    or a DataFrame with `lic_parent`/`lic_child` (and optionally `jurisdiction`)
+    columns. Pairs are normalized and deduplicated, each distinct pair is
+    evaluated once, and the results come back aligned with the input.
+    """
+    if hasattr(pairs, "columns"):
+        cols = ["lic_parent", "lic_child"] + (["jurisdiction"] if "jurisdiction" in pairs.columns else [])
+        pairs = pairs[cols].itertuples(index=False, name=None)
+
+    index: Dict[Tuple[str, str, str], int] = {}
+    slots: List[int] = []
+    for item in pairs:
+        juris = item[2] if len(item) > 2 and item[2] else jurisdiction
+        key = (normalize_license(item[0]), normalize_license(item[1]), normalize_license(juris))
+        slot = index.get(key)
+        if slot is None:
+            slot = index[key] = len(index)
+        slots.append(slot)
+
+    unique = _evaluate_unique(list(index))
+    return [dict(unique[i]) for i in slots]
+
+_obligations: Optional["ObligationIndex"] = None
+_obligations_error: Optional[Exception] = None
+_obligations_lock = threading.Lock()
 
+def obligations_index() -> "ObligationIndex":
+    """
+    obligation/3 for every license x jurisdiction, loaded or built once per
+    process. Like compatibility_matrix, a failure is remembered and re-raised.
+    """
+    global _obligations, _obligations_error
+    if _obligations is None:
+        with _obligations_lock:
+            if _obligations is None and _obligations_error is None:
+                try:
+                    from .license_matrix import load_obligations
+                    _obligations = load_obligations(PROLOG_FILE, _query)
+                except Exception as e:
+                    print(f"Warning: obligations index unavailable, querying Prolog directly. Error: {e}")
+                    _obligations_error = e
+            if _obligations is None:
+                raise _obligations_error
+    return _obligations
+
+_classes: Optional[Dict[str, str]] = None
+
+def license_classes() -> Dict[str, str]:
+    """
+    Normalized atom -> class (permissive, weak-copyleft, strong-copyleft,
+    network-copyleft, source-available) from the rules' fact families. Taken
+    from the compiled matrix, else asked of Prolog once; empty if neither works.
+    """
+    global _classes
+    if _classes is None:
+        try:
+            return compatibility_matrix().license_classes()
+        except Exception:
+            pass
+        from .license_matrix import license_classes as query_classes
+        try:
+            _classes = query_classes(_query)
+        except Exception:
+            return {}
+    return _classes
+
+def _prolog_obligations(norm_lic: str, norm_jur: str) -> List[str]:
+    """Asks the engine directly; used when no obligations index is available."""
+    q = f"obligation({_atom(norm_lic)}, {_atom(norm_jur)}, Obligation)."
     try:
-        rows = list(prolog.query(q))
-        return sorted([str(row["Obligation"]) for row in rows]) if rows else []
+        rows = _query(q)
+        return sorted({str(row["Obligation"]) for row in rows}) if rows else []
     except Exception:
         return []
 
+def obligations_for_licenses(lics: Iterable[str], jur: str) -> Dict[str, List[str]]:
+    """Obligations for many licenses in one jurisdiction, keyed by the input strings."""
+    norm_jur = normalize_license(jur)  # Also normalize the jurisdiction
+    lics = list(dict.fromkeys(lics))
+    norm = {lic: normalize_license(lic) for lic in lics}
+    try:
+        index = obligations_index()
+    except Exception:
+        per_atom = {a: _prolog_obligations(a, norm_jur) for a in set(norm.values())}
+    else:
+        per_atom = index.bulk(set(norm.values()), norm_jur)
+    return {lic: list(per_atom[norm[lic]]) for lic in lics}
+
+def obligations_for_license(lic: str, jur: str) -> List[str]:
+    """Obligations of a given license in a jurisdiction."""
+    return obligations_for_licenses([lic], jur)[lic]
+
+def evaluate_with_obligations(lic1: str, lic2: str, jur: str) -> Dict[str, Any]:
+    """Verdict, risk and both licenses' obligations in one call."""
+    response = evaluate_license_pair(lic1, lic2, jur)
+    obligs = obligations_for_licenses([lic1, lic2], jur)
+    return {
+        "result": response.get("result", "unknown_license"),
+        "risk": response.get("risk", "undefined"),
+        "obligations1": obligs[lic1],
+        "obligations2": obligs[lic2],
+    }
+
 def verdict_and_obligs(lic1: str, lic2: str, jur: str):
     """Utility to get the verdict and obligations for two licenses."""
-    response = evaluate_license_pair(lic1, lic2, jur)
-    verdict = response.get("result", "unknown_license")
-    ob1 = obligations_for_license(lic1, jur)
-    ob2 = obligations_for_license(lic2, jur)
-    return verdict, ob1, ob2
\ No newline at end of file
+    res = evaluate_with_obligations(lic1, lic2, jur)
+    return res["result"], res["obligations1"], res["obligations2"]
\ No newline at end of file
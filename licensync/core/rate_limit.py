@@ -0,0 +1,54 @@
+# In licensync/core/rate_limit.py
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `burst` saved
+    up. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n: float) -> float:
+        """Takes n tokens (possibly going negative) and returns how long to wait for them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= n
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, n: float = 1.0) -> None:
+        wait = self._reserve(n)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, so a slow registry never throttles the others."""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: float = 4.0):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = TokenBucket(self.rates.get(host, self.default_rate))
+            return b
+
+    def acquire(self, url: str) -> None:
+        self.bucket(urlsplit(url).hostname or "").acquire()
@@ -0,0 +1,302 @@
+# In licensync/core/spdx_stream.py
+
+"""
+Incremental reader for SPDX JSON documents.
+
+Only `packages` and `relationships` are decoded, one array element at a time;
+everything else (`files`, `snippets`, annotations, ...) is skipped by a
+bracket scanner without being parsed. Package ids, names and licenses are
+interned, so the only thing kept per package is one (name, license) tuple.
+Both the bare document and GitHub's {"sbom": {...}} wrapper are accepted, as
+is the non-standard `relatedSpdxElementId` key next to `relatedSpdxElement`.
+
+  for edge in iter_sbom_edges("big.spdx.json", "owner/repo"):
+      ...
+"""
+
+import codecs
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, Tuple, Union
+
+CHUNK_SIZE = 1 << 16
+# Consumed text is dropped from the buffer once this much has piled up
+_TRIM_AT = 1 << 20
+
+Source = Union[str, Path, bytes, IO, Dict]
+
+_WS = " \t\r\n"
+_STRUCT_RE = re.compile(r'["\[\]{}]')
+_STRING_TAIL_RE = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR_END_RE = re.compile(r"[,\]}\s]")
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Pull-based tokenizer over a text or binary stream."""
+
+    def __init__(self, fh: IO):
+        self.fh = fh
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._utf8 = None
+
+    def _fill(self, at_least: int = CHUNK_SIZE) -> bool:
+        if self.eof:
+            return False
+        if self.pos > _TRIM_AT:
+            self.buf, self.pos = self.buf[self.pos:], 0
+        # Grow geometrically so re-decoding a large element stays linear overall
+        data = self.fh.read(max(CHUNK_SIZE, at_least, len(self.buf) - self.pos))
+        if not data:
+            self.eof = True
+            if self._utf8 is not None:
+                self.buf += self._utf8.decode(b"", final=True)
+            return False
+        if isinstance(data, bytes):
+            if self._utf8 is None:
+                self._utf8 = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+            data = self._utf8.decode(data)
+        self.buf += data
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input), without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"malformed SPDX JSON: expected {ch!r}, got {got!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodes one complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number may have been cut off at the buffer edge
+            if end == len(self.buf) and not self.eof and isinstance(val, (int, float)):
+                self._fill()
+                continue
+            self.pos = end
+            return val
+
+    def skip(self) -> None:
+        """Steps over one JSON value without decoding it."""
+        ch = self.peek()
+        if ch not in "[{":
+            if ch == '"':
+                self.pos += 1
+                self._skip_string()
+                return
+            while True:
+                m = _SCALAR_END_RE.search(self.buf, self.pos)
+                if m:
+                    self.pos = m.start()
+                    return
+                self.pos = len(self.buf)
+                if not self._fill():
+                    return
+        depth = 0
+        while True:
+            m = _STRUCT_RE.search(self.buf, self.pos)
+            if not m:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("malformed SPDX JSON: unexpected end of input")
+                continue
+            c = m.group()
+            self.pos = m.end()
+            if c == '"':
+                self._skip_string()
+            elif c in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _skip_string(self) -> None:
+        # pos is just past the opening quote
+        start = self.pos
+        while True:
+            m = _STRING_TAIL_RE.match(self.buf, start)
+            if m:
+                self.pos = m.end()
+                return
+            if not self._fill():
+                raise ValueError("malformed SPDX JSON: unterminated string")
+            start = self.pos  # _fill may have trimmed the buffer
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object starting here; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == "}":
+                return
+            if ch != ",":
+                raise ValueError(f"malformed SPDX JSON: expected ',' or '}}', got {ch!r}")
+
+    def elements(self) -> Iterator[Any]:
+        """Decoded elements of the array starting here."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            ch = self.peek()
+            self.pos += 1
+            if ch == "]":
+                return
+            if ch != ",":
+                raise ValueError(f"malformed SPDX JSON: expected ',' or ']', got {ch!r}")
+
+
+def _walk(r: _Reader) -> Iterator[Tuple[str, Dict]]:
+    for key in r.members():
+        if key in ("packages", "relationships") and r.peek() == "[":
+            kind = "package" if key == "packages" else "relationship"
+            for item in r.elements():
+                if isinstance(item, dict):
+                    yield kind, item
+            if kind == "package":
+                yield "packages_end", {}
+        elif key == "sbom" and r.peek() == "{":
+            yield from _walk(r)
+        else:
+            r.skip()
+
+
+def _events_from_reader(r: _Reader) -> Iterator[Tuple[str, Dict]]:
+    yield from _walk(r)
+    yield "end", {}
+
+
+def _events_from_dict(doc: Dict) -> Iterator[Tuple[str, Dict]]:
+    if isinstance(doc.get("sbom"), dict):
+        doc = doc["sbom"]
+    for p in doc.get("packages") or []:
+        yield "package", p
+    yield "packages_end", {}
+    for rel in doc.get("relationships") or []:
+        yield "relationship", rel
+    yield "end", {}
+
+
+def iter_spdx(source: Source) -> Iterator[Tuple[str, Dict]]:
+    """
+    ("package", dict) and ("relationship", dict) events in document order,
+    ("packages_end", {}) after the packages array, then one ("end", {}).
+    `source` is a path, bytes, an open text or binary stream (e.g. a urllib3
+    response), or an already parsed document.
+    """
+    if isinstance(source, dict):
+        yield from _events_from_dict(source)
+    elif isinstance(source, (str, Path)):
+        with open(source, "rb") as fh:
+            yield from _events_from_reader(_Reader(fh))
+    elif isinstance(source, (bytes, bytearray)):
+        import io
+        yield from _events_from_reader(_Reader(io.BytesIO(source)))
+    else:
+        yield from _events_from_reader(_Reader(source))
+
+
+def _license_of(p: Dict) -> str:
+    return (p.get("licenseConcluded") or p.get("concludedLicense")
+            or p.get("licenseDeclared") or p.get("declaredLicense") or "")
+
+
+def iter_sbom_packages(source: Source) -> Iterator[Tuple[str, str, str]]:
+    """(SPDXID, name, license) per package; license is "" when none is given."""
+    for kind, p in iter_spdx(source):
+        if kind == "package":
+            yield (sys.intern(p.get("SPDXID") or ""),
+                   sys.intern(p.get("name") or p.get("PackageName") or ""),
+                   sys.intern(_license_of(p)))
+
+
+def iter_sbom_edges(source: Source,
+                    owner_repo: Optional[str] = None,
+                    normalize: Optional[Callable[[str], str]] = None) -> Iterator[Dict[str, str]]:
+    """
+    {"name", "license", "parent"} for every DEPENDS_ON relationship whose
+    target is a known package. A source id that is not a package becomes
+    `owner_repo`, or the edge is dropped when owner_repo is None. Licenses go
+    through `normalize` when given, with "unknown" for missing ones.
+
+    Once the packages array has been read, edges stream out in document
+    order. Only relationships that come before it are held as id pairs, since
+    their source may still turn out to be a package.
+    """
+    pkgs: Dict[str, Tuple[str, str]] = {}
+    pending: List[Tuple[str, str]] = []
+    packages_done = False
+    lic_cache: Dict[str, str] = {}
+
+    def lic(raw: str) -> str:
+        raw = raw or "unknown"
+        out = lic_cache.get(raw)
+        if out is None:
+            out = lic_cache[raw] = sys.intern(normalize(raw) if normalize else raw)
+        return out
+
+    def edge(src: str, tgt: str) -> Optional[Dict[str, str]]:
+        child = pkgs.get(tgt)
+        if child is None:
+            return None
+        parent = pkgs[src][0] if src in pkgs else owner_repo
+        if not parent:
+            return None
+        return {"name": child[0], "license": child[1], "parent": parent}
+
+    for kind, item in iter_spdx(source):
+        if kind == "package":
+            sid = item.get("SPDXID")
+            if sid:
+                pkgs[sys.intern(sid)] = (sys.intern(item.get("name") or sid), lic(_license_of(item)))
+        elif kind == "relationship":
+            if item.get("relationshipType") != "DEPENDS_ON":
+                continue
+            src = item.get("spdxElementId")
+            tgt = item.get("relatedSpdxElement") or item.get("relatedSpdxElementId")
+            if not tgt:
+                continue
+            if packages_done or (tgt in pkgs and src in pkgs):
+                e = edge(src, tgt)
+                if e:
+                    yield e
+            else:
+                pending.append((sys.intern(src or ""), sys.intern(tgt)))
+        elif kind == "packages_end":
+            packages_done = True
+        else:
+            for src, tgt in pending:
+                e = edge(src, tgt)
+                if e:
+                    yield e
+            pending.clear()
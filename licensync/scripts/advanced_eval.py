@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 import argparse
 import json
-import random
 import pandas as pd
 from pathlib import Path
-from licensync.core.prolog_interface import evaluate_license_pair, get_risk_level
+from licensync.core.prolog_interface import evaluate_pairs
+from licensync.core.metrics import bootstrap_f1, discordant_counts, mcnemar_exact
 
 # --- Core Metric Calculation Functions ---
 
@@ -36,49 +36,24 @@ def calculate_metrics(y_true: list, y_pred: list) -> dict:
 
 def bootstrap_f1_ci(y_true: list, y_pred: list, n_boot: int = 1000, seed: int = 42) -> tuple:
     """Performs bootstrap resampling to get a 95% confidence interval for F1 score."""
-    rng = random.Random(seed)
-    scores = []
-    
-    # Filter out None predictions for bootstrapping samples
-    samples = [(t, p) for t, p in zip(y_true, y_pred) if p is not None]
-    if not samples:
-        return 0.0, 0.0, 0.0
-
-    for _ in range(n_boot):
-        boot_samples = [rng.choice(samples) for _ in range(len(samples))]
-        boot_true = [s[0] for s in boot_samples]
-        boot_pred = [s[1] for s in boot_samples]
-        metrics = calculate_metrics(boot_true, boot_pred)
-        scores.append(metrics["f1"])
-
-    scores.sort()
-    low = scores[int(0.025 * len(scores))]
-    high = scores[int(0.975 * len(scores))]
-    median = scores[int(0.5 * len(scores))]
-    return median, low, high
+    # None predictions are left out of the resampled samples
+    return bootstrap_f1(y_true, y_pred, n_boot=n_boot, seed=seed)
 
 def mcnemar_test(y_pred1: list, y_pred2: list, y_true: list) -> dict:
     """Performs McNemar's test to compare two models."""
-    from statsmodels.stats.contingency_tables import mcnemar
-    
     # b = Model 1 is wrong, Model 2 is right
     # c = Model 1 is right, Model 2 is wrong
-    b = c = 0
-    for p1, p2, true in zip(y_pred1, y_pred2, y_true):
-        if p1 is None or p2 is None: continue # Only compare where both have predictions
-        err1 = (p1 != true)
-        err2 = (p2 != true)
-        if err1 and not err2:
-            b += 1
-        elif not err1 and err2:
-            c += 1
-            
-    # Create the 2x2 contingency table for McNemar's test
-    # [[a, b], [c, d]] where a=both correct, d=both incorrect
-    table = [[0, b], [c, 0]] # We only need b and c
-    result = mcnemar(table, exact=True)
-
-    return {"statistic": result.statistic, "p_value": result.pvalue, "b_misclassified_by_1_only": b, "c_misclassified_by_2_only": c}
+    # Only rows where both have predictions are compared
+    b, c = discordant_counts(y_pred1, y_pred2, y_true)
+    # Exact test: the statistic is the smaller discordant count
+    return {"statistic": min(b, c), "p_value": mcnemar_exact(b, c), "b_misclassified_by_1_only": b, "c_misclassified_by_2_only": c}
+
+def split_license_expression(lic: str) -> list:
+    """Component licenses of an SPDX expression: the first OR alternative, split on AND."""
+    if ' OR ' in lic: lic = lic.split(' OR ')[0].strip('()')
+    parts = [p.strip() for p in lic.split(' AND ')]
+    # For complex LicenseRef strings, we simplify by checking if 'MIT' is present
+    return ['MIT' if 'LicenseRef' in p else p for p in parts]  # Heuristic simplification
 
 # --- Main Evaluation Logic ---
 
@@ -105,42 +80,30 @@ def main():
     
     # LicenSync predictions
     licensync_preds = []
-    # In advanced_eval.py, inside the main LicenSync prediction loop
-
-    for _, row in truth_df.iterrows():
-        juris = row.get("jurisdiction", "global")
-        lic_p_str = str(row["lic_parent"])
-        lic_c_str = str(row["lic_child"])
-        
-        # --- Logic to handle compound licenses ---
-        if ' OR ' in lic_p_str: lic_p_str = lic_p_str.split(' OR ')[0].strip('()')
-        if ' OR ' in lic_c_str: lic_c_str = lic_c_str.split(' OR ')[0].strip('()')
 
-        p_licenses = [p.strip() for p in lic_p_str.split(' AND ')]
-        c_licenses = [c.strip() for c in lic_c_str.split(' AND ')]
-        
-        final_res = "ok" # Assume compatible until an incompatibility is found
-        for p_lic in p_licenses:
-            for c_lic in c_licenses:
-                # For complex LicenseRef strings, we simplify by checking if 'MIT' is present
-                if 'LicenseRef' in p_lic: p_lic = 'MIT' # Heuristic simplification
-                if 'LicenseRef' in c_lic: c_lic = 'MIT' # Heuristic simplification
-
-                res = evaluate_license_pair(p_lic, c_lic, juris)
-                if "incompatible" in res:
-                    final_res = "incompatible"
-                    break
-            if final_res == "incompatible":
-                break
-        
-        # --- End of compound license logic ---
-
-    if "incompatible" in final_res:
-        licensync_preds.append(False)
-    elif final_res == "ok":
-        licensync_preds.append(True)
-    else:
-        licensync_preds.append(None)
+    # Expand compound licenses into component pairs and evaluate them in one
+    # batch; the evaluator dedupes, so repeated pairs cost nothing extra.
+    juris_col = truth_df["jurisdiction"] if "jurisdiction" in truth_df.columns else ["global"] * len(truth_df)
+    component_pairs = []
+    spans = []
+    for lic_p_str, lic_c_str, juris in zip(truth_df["lic_parent"].astype(str), truth_df["lic_child"].astype(str), juris_col):
+        start = len(component_pairs)
+        for p_lic in split_license_expression(lic_p_str):
+            for c_lic in split_license_expression(lic_c_str):
+                component_pairs.append((p_lic, c_lic, juris))
+        spans.append((start, len(component_pairs)))
+    component_results = evaluate_pairs(component_pairs)
+
+    for start, end in spans:
+        results = component_results[start:end]
+        # Assume compatible until an incompatibility is found
+        incompatible = [r for r in results if r["result"] == "incompatible"]
+        if incompatible:
+            licensync_preds.append(False)
+            risk_levels.append(incompatible[0]["risk"].capitalize())
+        else:
+            licensync_preds.append(True)
+            risk_levels.append(results[0]["risk"].capitalize() if results else "Undefined")
 
     predictions["LicenSync"] = licensync_preds
 
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
-import json, argparse, csv, os
+import argparse, csv, sys
 from pathlib import Path
 
+_PKG_PARENT = str(Path(__file__).resolve().parents[3])
+if _PKG_PARENT not in sys.path:
+    sys.path.insert(0, _PKG_PARENT)
+from licensync.core.spdx_stream import iter_sbom_packages
+
 def extract_packages(spdx_json):
-    pkgs = []
-    for p in spdx_json.get("packages", []):
-        name = p.get("name") or p.get("PackageName") or ""
-        # prefer concluded then declared
-        lic = p.get("licenseConcluded") or p.get("concludedLicense") or p.get("licenseDeclared") or p.get("declaredLicense") or ""
-        pkgs.append((name, lic))
-    return pkgs
+    """(name, license) per package, concluded license preferred over declared.
+    `spdx_json` is a parsed document or a path/stream, read incrementally."""
+    for _, name, lic in iter_sbom_packages(spdx_json):
+        yield name, lic
 
 def main():
     ap = argparse.ArgumentParser(description="Extract (package, license) from SPDX JSON files")
@@ -17,19 +19,18 @@ def main():
     ap.add_argument("--out", default="baselines/node_licenses_spdx.csv")
     args = ap.parse_args()
 
-    rows = []
-    for f in sorted(Path(args.in_dir).glob("*.spdx.json")):
-        data = json.loads(Path(f).read_text())
-        repo = f.stem
-        for name, lic in extract_packages(data):
-            if not name: continue
-            rows.append({"source": Path(args.in_dir).name, "repo": repo, "package": name, "license": lic})
-
     Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    n = 0
     with open(args.out, "w", newline="") as out:
         w = csv.DictWriter(out, fieldnames=["source","repo","package","license"])
-        w.writeheader(); w.writerows(rows)
-    print(f"[ok] wrote {len(rows)} rows to {args.out}")
+        w.writeheader()
+        for f in sorted(Path(args.in_dir).glob("*.spdx.json")):
+            repo = f.stem
+            for name, lic in extract_packages(f):
+                if not name: continue
+                w.writerow({"source": Path(args.in_dir).name, "repo": repo, "package": name, "license": lic})
+                n += 1
+    print(f"[ok] wrote {n} rows to {args.out}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# In licensync/scripts/bench_normalize.py
+"""
+Microbenchmark for license_utils.normalize_license on the lic_child column of
+data/edges/*.csv: the uncached normaliser vs the memoised one, plus license_id.
+
+  python -m licensync.scripts.bench_normalize --edges-dir licensync/data/edges
+"""
+
+import argparse, csv, time
+from pathlib import Path
+
+from licensync.core import license_utils
+from licensync.core.license_utils import normalize_license, license_id
+
+def load_lic_child(edges_dir: Path) -> list:
+    values = []
+    for f in sorted(edges_dir.glob("*.csv")):
+        with f.open() as fh:
+            for row in csv.DictReader(fh):
+                values.append(row.get("lic_child") or "")
+    return values
+
+def best_of(fn, values, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for v in values:
+            fn(v)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark cached vs uncached normalize_license")
+    ap.add_argument("--edges-dir", default="data/edges")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    values = load_lic_child(Path(args.edges_dir))
+    if not values:
+        raise SystemExit(f"[fatal] no lic_child values under {args.edges_dir}")
+
+    uncached = license_utils._normalize.__wrapped__
+    def normalize_uncached(v):
+        return uncached(str(v)) if v else "unknown"
+
+    license_utils._normalize.cache_clear()
+    t_plain = best_of(normalize_uncached, values, args.repeat)
+    t_cached = best_of(normalize_license, values, args.repeat)
+    t_ids = best_of(license_id, values, args.repeat)
+    info = license_utils._normalize.cache_info()
+
+    n = len(values)
+    print(f"values: {n} ({len(set(values))} distinct)")
+    print(f"uncached normalize: {t_plain*1e3:8.2f} ms  ({n/t_plain:,.0f}/s)")
+    print(f"cached normalize:   {t_cached*1e3:8.2f} ms  ({n/t_cached:,.0f}/s)  speedup x{t_plain/t_cached:.1f}")
+    print(f"license_id:         {t_ids*1e3:8.2f} ms  ({n/t_ids:,.0f}/s)")
+    print(f"cache: {info}")
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,280 @@
 #!/usr/bin/env python3
-import argparse, time, csv
+"""
+Benchmark harness for the LicenSync core.
+
+Stages (all over the real licensync.core functions):
+  cold_import        fresh interpreter: import prolog_interface (the engine and
+                     rules load lazily, on first use)
+  first_call         fresh interpreter: first evaluate_license_pair after import
+  evaluate_pair      steady-state evaluate_license_pair, one call per sample
+  evaluate_pairs     batch evaluate_pairs over every edge (stream)
+  obligations        steady-state obligations_for_license
+  graph_build        build_graph_recursive for each edges CSV
+  overlap            build_overlap_graph over all edges CSVs + transitive conflicts
+  overlap_compact    the same over CompactGraph.from_csv (array-backed, no networkx)
+
+Every stage reports p50/p95/p99 latency and ops/sec. Sampling is seeded, so
+two runs on the same data draw the same pairs. Stages that evaluate pairs must
+get real verdicts (ok, incompatible, unknown_license); a stage that gets errors
+instead is marked failed and left out of the baseline and the comparison.
+Compare against a stored baseline with --baseline; stages that got slower than
+--tolerance, or that failed, fail the run.
+
+  python scripts/benchmark_runtime.py --edges-dir data/edges --out results/perf.json \\
+      --baseline results/perf_baseline.json
+"""
+import argparse, time, json, os, platform, random, subprocess, sys
 from pathlib import Path
-from typing import List, Tuple
-import pandas as pd
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Make `licensync.*` importable when run as a plain script
+PKG_PARENT = str(Path(__file__).resolve().parents[2])
+if PKG_PARENT not in sys.path:
+    sys.path.insert(0, PKG_PARENT)
+
+from licensync.core.edge_stream import iter_edge_batches, evaluate_batches
+
+VERDICTS = {"ok", "incompatible", "unknown_license"}
+
+def check_verdicts(results) -> None:
+    """Raises unless every evaluate result carries a real verdict."""
+    for res in results:
+        if res.get("result") not in VERDICTS:
+            raise RuntimeError(f"not a verdict: {res.get('result')!r}")
 
 def _import_licensync():
-    try:
-        from licensync.prolog_interface import evaluate_license_pair  # type: ignore
-        return evaluate_license_pair
-    except Exception:
-        def stub(a,b,c): return True
-        return stub
+    from licensync.core.prolog_interface import evaluate_pairs
+    return evaluate_pairs
+
+def summarize(samples_s: List[float], ops_per_sample: int = 1) -> Dict:
+    a = np.asarray(samples_s, dtype=float)
+    total = float(a.sum())
+    return {
+        "n": int(a.size),
+        "p50_ms": float(np.percentile(a, 50) * 1e3),
+        "p95_ms": float(np.percentile(a, 95) * 1e3),
+        "p99_ms": float(np.percentile(a, 99) * 1e3),
+        "mean_ms": float(a.mean() * 1e3),
+        "ops_per_sec": (a.size * ops_per_sample / total) if total > 0 else None,
+    }
+
+def time_calls(fn: Callable, args_list: List[tuple], warmup: int = 50) -> List[float]:
+    for args in args_list[:warmup]:
+        fn(*args)
+    out = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        out.append(time.perf_counter() - t0)
+    return out
+
+def time_subprocess(code: str, runs: int) -> List[float]:
+    """Runs `code` in fresh interpreters; it must print the elapsed seconds it measured."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PKG_PARENT, os.getenv("PYTHONPATH")])))
+    out = []
+    for _ in range(runs):
+        r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+        if r.returncode != 0:
+            raise RuntimeError(r.stderr.strip().splitlines()[-1] if r.stderr.strip() else "subprocess failed")
+        out.append(float(r.stdout.strip().splitlines()[-1]))
+    return out
+
+COLD_IMPORT = """
+import time; t = time.perf_counter()
+import licensync.core.prolog_interface
+print(time.perf_counter() - t)
+"""
+
+FIRST_CALL = """
+import licensync.core.prolog_interface as pi, sys, time
+t = time.perf_counter()
+res = pi.evaluate_license_pair("MIT", "GPL-3.0-only", "global")
+elapsed = time.perf_counter() - t
+if res.get("result") not in %r:
+    sys.exit("not a verdict: %%r" %% res.get("result"))
+print(elapsed)
+""" % sorted(VERDICTS)
+
+def load_edges(files: List[Path]):
+    """(license pairs, {repo: flatten_sbom-style edges}) from the edges CSVs."""
+    pairs, by_repo = [], {}
+    for batch in iter_edge_batches(files, require=("parent", "child")):
+        for repo, p, c, lc in zip(batch["repo"], batch["parent"], batch["child"], batch["lic_child"]):
+            by_repo.setdefault(repo, []).append({"parent": p, "name": c, "license": lc})
+        pairs.extend(zip(batch["lic_parent"], batch["lic_child"]))
+    return pairs, by_repo
+
+def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    files = sorted(Path(args.edges_dir).glob("*.csv"))
+    pairs, by_repo = load_edges(files)
+    if not pairs:
+        raise SystemExit(f"[fatal] no edges under {args.edges_dir}")
+    stages: Dict[str, Dict] = {}
+
+    def stage(name: str, fn: Callable[[], Dict]):
+        try:
+            stages[name] = fn()
+            s = stages[name]
+            print(f"{name:15s} p50 {s['p50_ms']:9.3f} ms  p95 {s['p95_ms']:9.3f} ms  "
+                  f"p99 {s['p99_ms']:9.3f} ms  {s['ops_per_sec'] or 0:12,.0f} ops/s")
+        except Exception as e:
+            stages[name] = {"error": str(e)}
+            print(f"{name:15s} [error] {e}")
+
+    if args.cold_runs > 0:
+        stage("cold_import", lambda: summarize(time_subprocess(COLD_IMPORT, args.cold_runs)))
+        stage("first_call", lambda: summarize(time_subprocess(FIRST_CALL, args.cold_runs)))
+
+    from licensync.core import prolog_interface as pi
+    sample = [tuple(rng.choice(pairs)) + (args.jurisdiction,) for _ in range(args.calls)]
+    def evaluate_pair():
+        check_verdicts([pi.evaluate_license_pair(*sample[0])])
+        return summarize(time_calls(pi.evaluate_license_pair, sample))
+    stage("evaluate_pair", evaluate_pair)
+
+    total_edges = len(pairs)
+    memo: Dict = {}
+    def batch_eval():
+        memo.clear()
+        t0 = time.perf_counter()
+        for _ in evaluate_batches(iter_edge_batches(files, require=("lic_parent", "lic_child")),
+                                  args.jurisdiction, _import_licensync(), memo=memo):
+            pass
+        elapsed = time.perf_counter() - t0
+        check_verdicts(memo.values())
+        return summarize([elapsed], ops_per_sample=total_edges)
+    stage("evaluate_pairs", batch_eval)
+
+    licenses = sorted({lic for pair in pairs for lic in pair})
+    obl_sample = [(rng.choice(licenses), args.jurisdiction) for _ in range(args.calls)]
+    def obligations():
+        # Obligations come from the same engine; without one they are silently empty
+        check_verdicts([pi.evaluate_license_pair("MIT", "GPL-3.0-only", args.jurisdiction)])
+        return summarize(time_calls(pi.obligations_for_license, obl_sample))
+    stage("obligations", obligations)
+
+    from licensync.core.graph_tools import build_graph_recursive
+    from licensync.core.graph_tools_overlap import build_overlap_graph, find_transitive_conflicts
+    def graph_build():
+        out = []
+        for _ in range(args.repeat):
+            for repo, edges in by_repo.items():
+                t0 = time.perf_counter()
+                build_graph_recursive(repo, "unknown", edges)
+                out.append(time.perf_counter() - t0)
+        return summarize(out)
+    stage("graph_build", graph_build)
+
+    # Each repo's top-level packages (never a child) hang off the repo root
+    roots = [(repo, "unknown") for repo in by_repo]
+    all_edges = []
+    for repo, edges in by_repo.items():
+        children = {e["name"] for e in edges}
+        tops = dict.fromkeys(e["parent"] for e in edges if e["parent"] not in children)
+        all_edges.extend({"parent": repo, "name": t, "license": "unknown"} for t in tops)
+        all_edges.extend(edges)
+    def overlap():
+        out = []
+        for _ in range(args.repeat):
+            verdicts: Dict = {}
+            t0 = time.perf_counter()
+            G = build_overlap_graph(roots, all_edges)
+            find_transitive_conflicts(G, args.jurisdiction, memo=verdicts)
+            out.append(time.perf_counter() - t0)
+            check_verdicts(verdicts.values())
+        return summarize(out)
+    stage("overlap", overlap)
+
+    from licensync.core.compact_graph import CompactGraph
+    def overlap_compact():
+        out = []
+        for _ in range(args.repeat):
+            verdicts: Dict = {}
+            t0 = time.perf_counter()
+            G = CompactGraph.from_csv(files)
+            find_transitive_conflicts(G, args.jurisdiction, memo=verdicts)
+            out.append(time.perf_counter() - t0)
+            check_verdicts(verdicts.values())
+        return summarize(out)
+    stage("overlap_compact", overlap_compact)
+
+    seconds = stages.get("evaluate_pairs", {}).get("mean_ms", 0.0) / 1e3
+    return {
+        "meta": {
+            "seed": args.seed, "calls": args.calls, "repeat": args.repeat, "jurisdiction": args.jurisdiction,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "files": len(files),
+        "edges": total_edges,
+        "unique_pairs": len(memo),
+        "seconds": seconds,
+        "edges_per_sec": (total_edges / seconds if seconds > 0 else None),
+        "stages": stages,
+    }
+
+def failed_stages(res: Dict) -> List[str]:
+    return [name for name, s in res["stages"].items() if "error" in s]
+
+def as_baseline(res: Dict) -> Dict:
+    """`res` without its failed stages, so they never become the reference."""
+    return dict(res, stages={n: s for n, s in res["stages"].items() if "error" not in s})
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Stages whose p50 grew, or ops/sec fell, by more than `tolerance` vs the baseline."""
+    regressions = []
+    for name, base in baseline.get("stages", {}).items():
+        cur = current["stages"].get(name)
+        if not cur or "error" in cur or "error" in base:
+            continue
+        if base.get("p50_ms") and cur["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {base['p50_ms']:.3f} -> {cur['p50_ms']:.3f} ms")
+        elif base.get("ops_per_sec") and cur["ops_per_sec"] and cur["ops_per_sec"] < base["ops_per_sec"] / (1 + tolerance):
+            regressions.append(f"{name}: {base['ops_per_sec']:,.0f} -> {cur['ops_per_sec']:,.0f} ops/s")
+    return regressions
 
 def main():
     ap = argparse.ArgumentParser(description="Benchmark LicenSync evaluator over edges CSVs")
     ap.add_argument("--edges-dir", default="data/edges")
     ap.add_argument("--jurisdiction", default="US")
     ap.add_argument("--out", default="results/perf.json")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--calls", type=int, default=2000, help="Timed calls per steady-state stage")
+    ap.add_argument("--repeat", type=int, default=5, help="Repetitions of the graph stages")
+    ap.add_argument("--cold-runs", type=int, default=5, help="Fresh interpreters for cold stages (0 to skip)")
+    ap.add_argument("--baseline", default=None, help="Earlier perf.json to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    ap.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
     args = ap.parse_args()
 
-    eval_fn = _import_licensync()
-    files = sorted(Path(args.edges_dir).glob("*.csv"))
-    total_edges = 0
-    t0 = time.time()
-    for f in files:
-        df = pd.read_csv(f)
-        for _, row in df.iterrows():
-            p = str(row.get("lic_parent","unknown"))
-            c = str(row.get("lic_child","unknown"))
-            _ = eval_fn(p, c, args.jurisdiction)
-            total_edges += 1
-    dt = time.time() - t0
-    res = {"files": len(files), "edges": total_edges, "seconds": dt, "edges_per_sec": (total_edges/dt if dt>0 else None)}
-    print(res)
-    Path(args.out).write_text(json.dumps(res, indent=2))
+    res = run(args)
+    out = Path(args.out); out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(res, indent=2))
+    print(f"[ok] wrote {out}")
+
+    if args.baseline:
+        base_path = Path(args.baseline)
+        failed = failed_stages(res)
+        if args.save_baseline:
+            base_path.parent.mkdir(parents=True, exist_ok=True)
+            base_path.write_text(json.dumps(as_baseline(res), indent=2))
+            print(f"[ok] saved baseline {base_path}")
+            for name in failed:
+                print(f"[warn] {name} failed; left out of the baseline")
+        elif base_path.exists():
+            regressions = compare(res, json.loads(base_path.read_text()), args.tolerance)
+            for r in regressions:
+                print(f"[regression] {r}")
+            for name in failed:
+                print(f"[failed] {name}: {res['stages'][name]['error']}")
+            if regressions or failed:
+                sys.exit(1)
+            print(f"[ok] no regressions vs {base_path} (tolerance {args.tolerance:.0%})")
+        else:
+            print(f"[warn] baseline {base_path} not found; run with --save-baseline to create it")
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,32 @@
 #!/usr/bin/env python3
-import os, time, csv, json, argparse, sys
+import os, time, csv, json, argparse, sys, heapq, tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import IO, Dict, List, Tuple, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
 import networkx as nx
 
+# Make `licensync.*` importable when run as a plain script
+_PKG_PARENT = str(Path(__file__).resolve().parents[2])
+if _PKG_PARENT not in sys.path:
+    sys.path.insert(0, _PKG_PARENT)
+from licensync.core.spdx_stream import iter_sbom_edges
+
 API_VER = "2022-11-28"
 
+# GitHub answers 202 while it generates an SBOM; poll this many times, backing
+# off 1.5s, 3s, 4.5s, ... between attempts.
+SBOM_ATTEMPTS = 6
+SBOM_BACKOFF = 1.5
+# SBOM bodies are spooled to disk past this size instead of held in memory
+SBOM_SPOOL_BYTES = 8 * 1024 * 1024
+# (connect, read) seconds; a hung connection raises instead of holding a worker
+HTTP_TIMEOUT = (10, 60)
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
 def _headers(token: Optional[str] = None, accept: Optional[str] = None) -> Dict[str, str]:
     h = {
         "Accept": accept or "application/vnd.github+json",
@@ -17,49 +37,50 @@ def _headers(token: Optional[str] = None, accept: Optional[str] = None) -> Dict[
         h["Authorization"] = f"Bearer {token}"
     return h
 
-def fetch_sbom(owner_repo: str, token: Optional[str] = None, ref: Optional[str] = None) -> Optional[Dict]:
+def fetch_sbom_once(owner_repo: str, token: Optional[str] = None, ref: Optional[str] = None) -> Tuple[str, Optional[IO]]:
+    """
+    One SBOM request: ("ready", body), ("pending", None) on 202, or
+    ("missing", None). The body is streamed into a spooled temp file (on disk
+    past SBOM_SPOOL_BYTES) for flatten_sbom to parse incrementally; the
+    caller closes it.
+    """
     url = f"https://api.github.com/repos/{owner_repo}/dependency-graph/sbom"
     if ref:
         url += f"?ref={ref}"
-    # Retry a few times in case of 202 (SBOM being generated)
-    for i in range(6):
-        r = requests.get(url, headers=_headers(token))
+    with _session.get(url, headers=_headers(token), stream=True, timeout=HTTP_TIMEOUT) as r:
         if r.status_code == 200:
-            return r.json()
+            body = tempfile.SpooledTemporaryFile(max_size=SBOM_SPOOL_BYTES)
+            for chunk in r.iter_content(chunk_size=1 << 16):
+                body.write(chunk)
+            body.seek(0)
+            return "ready", body
         if r.status_code == 202:
-            time.sleep(1.5 * (i+1))
-            continue
-        # 404 or others -> give up
-        return None
-    return None
+            return "pending", None
+    # 404 or others -> give up
+    return "missing", None
 
-def flatten_sbom(owner_repo: str, sbom: Dict) -> List[Dict]:
-    id_to_name: Dict[str, str] = {}
-    id_to_license: Dict[str, str] = {}
-    for p in sbom.get("sbom", {}).get("packages", []):
-        sid = p.get("SPDXID")
-        if not sid: 
+def fetch_sbom(owner_repo: str, token: Optional[str] = None, ref: Optional[str] = None) -> Optional[IO]:
+    # Retry a few times in case of 202 (SBOM being generated)
+    for i in range(SBOM_ATTEMPTS):
+        status, sbom = fetch_sbom_once(owner_repo, token, ref)
+        if status == "pending":
+            time.sleep(SBOM_BACKOFF * (i+1))
             continue
-        # prefer concluded, then declared
-        lic = p.get("licenseConcluded") or p.get("licenseDeclared") or "unknown"
-        name = p.get("name") or sid
-        id_to_name[sid] = name
-        id_to_license[sid] = lic
+        return sbom
+    return None
 
-    edges: List[Dict] = []
-    for rel in sbom.get("sbom", {}).get("relationships", []):
-        if rel.get("relationshipType") != "DEPENDS_ON":
-            continue
-        s = rel.get("spdxElementId"); o = rel.get("relatedSpdxElement")
-        parent = id_to_name.get(s); child = id_to_name.get(o)
-        if not parent or not child:
-            continue
-        edges.append({"parent": parent, "name": child, "license": id_to_license.get(o, "unknown")})
-    return edges
+def flatten_sbom(owner_repo: str, sbom: Union[Dict, IO, str, Path]) -> List[Dict]:
+    """
+    DEPENDS_ON edges between known packages, licenses as written (concluded,
+    then declared). `sbom` is a parsed document or a stream/path, which is
+    parsed incrementally (see licensync.core.spdx_stream).
+    """
+    return [{"parent": e["parent"], "name": e["name"], "license": e["license"]}
+            for e in iter_sbom_edges(sbom)]
 
 def fetch_text(owner_repo: str, path: str, token: Optional[str]) -> Optional[str]:
     url = f"https://api.github.com/repos/{owner_repo}/contents/{path}"
-    r = requests.get(url, headers=_headers(token))
+    r = _session.get(url, headers=_headers(token), timeout=HTTP_TIMEOUT)
     if r.status_code == 200:
         j = r.json()
         if isinstance(j, dict) and j.get("encoding") == "base64":
@@ -93,15 +114,21 @@ def parse_package_json(text: str) -> List[Tuple[str, str]]:
     return deps
 
 def build_graph_for_repo(owner_repo: str, sha: Optional[str], token: Optional[str]) -> nx.DiGraph:
+    return build_graph_from_sbom(owner_repo, fetch_sbom(owner_repo, token, ref=sha), token)
+
+def build_graph_from_sbom(owner_repo: str, sbom: Optional[IO], token: Optional[str]) -> nx.DiGraph:
     G = nx.DiGraph()
     root = owner_repo
     G.add_node(root, license="unknown", is_root=True)
 
     # 1) SBOM
-    sbom = fetch_sbom(owner_repo, token, ref=sha)
     edges: List[Dict] = []
-    if sbom:
-        edges = flatten_sbom(owner_repo, sbom)
+    if sbom is not None:
+        try:
+            edges = flatten_sbom(owner_repo, sbom)
+        finally:
+            if hasattr(sbom, "close"):
+                sbom.close()
 
     # 2) Fallback manifests at repo root
     if not edges:
@@ -131,7 +158,7 @@ def build_graph_for_repo(owner_repo: str, sha: Optional[str], token: Optional[st
 
     return G
 
-def write_edges(owner_repo: str, sha: Optional[str], G: nx.DiGraph, outdir: Path):
+def write_edges(owner_repo: str, sha: Optional[str], G: nx.DiGraph, outdir: Path, store=None):
     edges = []
     for u, v in G.edges():
         edges.append({
@@ -148,18 +175,101 @@ def write_edges(owner_repo: str, sha: Optional[str], G: nx.DiGraph, outdir: Path
         nodes.append({"repo": owner_repo, "sha": sha or "", "name": n, "license": d.get("license","unknown"), "is_root": bool(d.get("is_root"))})
 
     outdir.mkdir(parents=True, exist_ok=True)
-    efile = outdir / f"{owner_repo.replace('/','_')}_{(sha or 'HEAD')}.csv"
+    efile = edges_path(owner_repo, sha, outdir)
     import pandas as pd
     pd.DataFrame(edges).to_csv(efile, index=False)
-    nfile = outdir.parent / "nodes" / f"{owner_repo.replace('/','_')}_{(sha or 'HEAD')}.csv"
+    nfile = outdir.parent / "nodes" / efile.name
+    nfile.parent.mkdir(parents=True, exist_ok=True)
     pd.DataFrame(nodes).to_csv(nfile, index=False)
+    if store is not None:
+        store.append(owner_repo, sha, edges, nodes)
     return efile, nfile
 
+def open_store(root: Optional[str]):
+    """licensync.core.edge_store.EdgeStore at `root` (None if not requested)."""
+    if not root:
+        return None
+    from licensync.core.edge_store import EdgeStore
+    return EdgeStore(root)
+
+def edges_path(owner_repo: str, sha: Optional[str], outdir: Path) -> Path:
+    return outdir / f"{owner_repo.replace('/','_')}_{(sha or 'HEAD')}.csv"
+
+def read_edge_pairs(efile: Path) -> List[List[str]]:
+    """(repo, sha, parent, child) rows of an already-built edges CSV, for the aggregate."""
+    with open(efile) as f:
+        return [[r["repo"], r.get("sha") or "", r["parent"], r["child"]]
+                for r in csv.DictReader(f) if r.get("parent") and r.get("child")]
+
+def build_all(rows: List[Dict], token: Optional[str], outdir: Path,
+              workers: int = 4, resume: bool = False, store=None) -> List[List[str]]:
+    """
+    Builds every repo on a worker pool. A repo whose SBOM is still being
+    generated (202) is rescheduled with backoff instead of holding a worker,
+    so one slow SBOM never stalls the batch. Each repo's CSVs are written as
+    soon as it finishes, and appended to the columnar `store` if given. With
+    `resume`, repos whose edges CSV already exists for the same SHA are skipped.
+    Rows without a SHA are matched against `<repo>_HEAD.csv` and skipped too,
+    even if HEAD has moved since; pin a SHA (or delete the file) to rebuild.
+    """
+    all_edges: List[List[str]] = []
+    delayed: List[Tuple[float, int, int, Dict]] = []  # (ready_at, seq, attempt, row)
+    seq = 0
+    for row in rows:
+        owner_repo = row["repo"].strip()
+        sha = (row.get("sha") or "").strip() or None
+        efile = edges_path(owner_repo, sha, outdir)
+        if resume and efile.exists():
+            print(f"[skip] {owner_repo} @ {sha or 'default'} (found {efile})")
+            all_edges.extend(read_edge_pairs(efile))
+            continue
+        heapq.heappush(delayed, (0.0, seq, 0, row)); seq += 1
+
+    def poll(row: Dict, attempt: int):
+        owner_repo = row["repo"].strip()
+        sha = (row.get("sha") or "").strip() or None
+        if attempt == 0:
+            print(f"[build] {owner_repo} @ {sha or 'default'}")
+        status, sbom = fetch_sbom_once(owner_repo, token, ref=sha)
+        if status == "pending" and attempt + 1 < SBOM_ATTEMPTS:
+            return "pending", row, attempt
+        G = build_graph_from_sbom(owner_repo, sbom, token)
+        efile, nfile = write_edges(owner_repo, sha, G, outdir, store)
+        print(f"  -> edges: {efile}\n  -> nodes: {nfile}")
+        return "done", row, [[owner_repo, sha or "", u, v] for u, v in G.edges()]
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while delayed or running:
+            now = time.time()
+            while delayed and delayed[0][0] <= now:
+                _, _, attempt, row = heapq.heappop(delayed)
+                running[pool.submit(poll, row, attempt)] = row
+            timeout = max(0.0, delayed[0][0] - now) if delayed else None
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                row = running.pop(fut)
+                try:
+                    status, row, payload = fut.result()
+                except Exception as e:
+                    print(f"[error] {row['repo'].strip()}: {e}")
+                    continue
+                if status == "pending":
+                    attempt = payload + 1
+                    heapq.heappush(delayed, (time.time() + SBOM_BACKOFF * attempt, seq, attempt, row)); seq += 1
+                else:
+                    all_edges.extend(payload)
+    return all_edges
+
 def main():
     ap = argparse.ArgumentParser(description="Build dependency graphs (edges) for repos in data/repos.csv")
     ap.add_argument("--repos-file", default="data/repos.csv")
     ap.add_argument("--token", default=os.getenv("GITHUB_TOKEN"))
     ap.add_argument("--outdir", default="data/edges")
+    ap.add_argument("--workers", type=int, default=4, help="Repos built concurrently")
+    ap.add_argument("--resume", action="store_true", help="Skip repos whose edges CSV already exists for the same SHA "
+                         "(rows without a SHA reuse <repo>_HEAD.csv even if HEAD has moved)")
+    ap.add_argument("--parquet-dir", default=None, help="Also append each repo to a columnar edge store here (needs pyarrow)")
     args = ap.parse_args()
 
     rows = []
@@ -171,20 +281,8 @@ def main():
                 continue
             rows.append(row)
 
-    all_edges = []
-    for row in rows:
-        owner_repo = row["repo"].strip()
-        sha = (row.get("sha") or "").strip() or None
-        print(f"[build] {owner_repo} @ {sha or 'default'}")
-        try:
-            G = build_graph_for_repo(owner_repo, sha, args.token)
-            efile, nfile = write_edges(owner_repo, sha, G, Path(args.outdir))
-            print(f"  -> edges: {efile}")
-            print(f"  -> nodes: {nfile}")
-            for u, v in G.edges():
-                all_edges.append([owner_repo, sha or "", u, v])
-        except Exception as e:
-            print(f"[error] {owner_repo}: {e}")
+    all_edges = build_all(rows, args.token, Path(args.outdir), workers=args.workers, resume=args.resume,
+                          store=open_store(args.parquet_dir))
 
     # aggregate (for quick sanity)
     if all_edges:
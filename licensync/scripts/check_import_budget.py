@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# In licensync/scripts/check_import_budget.py
+"""
+Startup budget check for the CLI. Fails (exit 1) if a cold
+`python -m licensync.cli.main --help` takes longer than the budget (median of
+--runs fresh interpreters), or if importing the CLI pulls in a heavy module
+that only some commands need.
+
+  python scripts/check_import_budget.py --budget-ms 600
+"""
+
+import argparse, os, statistics, subprocess, sys, time
+from pathlib import Path
+
+PKG_PARENT = str(Path(__file__).resolve().parents[2])
+
+# Modules that must only load inside the commands that use them
+LAZY_MODULES = ("pyswip", "matplotlib", "networkx", "requests", "numpy", "pandas", "openai")
+
+def _env():
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PKG_PARENT, os.getenv("PYTHONPATH")])))
+
+def time_help(runs: int) -> list:
+    out = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        r = subprocess.run([sys.executable, "-m", "licensync.cli.main", "--help"],
+                           capture_output=True, text=True, env=_env())
+        out.append(time.perf_counter() - t0)
+        if r.returncode != 0:
+            raise SystemExit(f"[fatal] --help failed:\n{r.stderr}")
+    return out
+
+def eager_modules() -> list:
+    code = ("import sys, licensync.cli.main; "
+            f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    r = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env())
+    if r.returncode != 0:
+        raise SystemExit(f"[fatal] importing licensync.cli.main failed:\n{r.stderr}")
+    return r.stdout.split()
+
+def main():
+    ap = argparse.ArgumentParser(description="Check cold CLI startup against a time budget")
+    ap.add_argument("--budget-ms", type=float, default=float(os.getenv("LICENSYNC_IMPORT_BUDGET_MS", "600")))
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    failed = False
+    eager = eager_modules()
+    if eager:
+        print(f"[fail] importing licensync.cli.main loads: {', '.join(eager)}")
+        failed = True
+
+    median_ms = statistics.median(time_help(args.runs)) * 1e3
+    if median_ms > args.budget_ms:
+        print(f"[fail] cold --help median {median_ms:.0f} ms > budget {args.budget_ms:.0f} ms")
+        failed = True
+    else:
+        print(f"[ok] cold --help median {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
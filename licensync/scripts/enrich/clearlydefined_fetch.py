@@ -16,16 +16,22 @@ We try to infer ClearlyDefined "coordinates" from names:
 Tips:
 - Provide versions where possible (from SBOMs or edges). If absent, we query without version and
   accept declared/concluded license at the component level (less precise).
-- Results are cached under cache/clearlydefined/*.json to avoid re-fetching.
+- Coordinates are deduped and POSTed to /definitions in chunks (--batch-size), several
+  chunks in flight at once (--workers), retried with backoff on 429/5xx.
+- Results are cached in a single SQLite file (cache/clearlydefined.sqlite). Entries
+  from the older per-coordinate cache/clearlydefined/*.json files are imported on
+  first use; --migrate-cache imports them all up front.
 
 Usage examples:
   python3 scripts/enrich/clearlydefined_fetch.py --from-spdx-csv baselines/node_licenses_syft.csv --out baselines/clearlydefined_licenses.csv
   python3 scripts/enrich/clearlydefined_fetch.py --from-edges licensync/data/edges --out baselines/clearlydefined_licenses.csv
+  python3 scripts/enrich/clearlydefined_fetch.py --migrate-cache
 """
 
-import argparse, csv, os, re, sys, time, json
+import argparse, csv, os, re, sys, time, json, sqlite3, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Tuple, Optional, Iterable
+from typing import Dict, List, Tuple, Optional, Iterable
 try:
     # Python 3.11+
     import urllib.request as ul
@@ -34,12 +40,18 @@ except Exception:
     import urllib as ul
     ue = ul
 
-CACHE_DIR = Path("cache/clearlydefined")
+# Make `licensync.*` importable when run as a plain script
+_PKG_PARENT = str(Path(__file__).resolve().parents[3])
+if _PKG_PARENT not in sys.path:
+    sys.path.insert(0, _PKG_PARENT)
+from licensync.core.edge_stream import iter_edge_batches
 
-CD_BASE = "https://api.clearlydefined.io/definitions"
+CACHE_DIR = Path("cache/clearlydefined")          # legacy: one JSON file per coordinate
+CACHE_DB = Path("cache/clearlydefined.sqlite")
 
-def ensure_cache():
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+CD_BASE = os.getenv("CLEARLYDEFINED_API", "https://api.clearlydefined.io/definitions")
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
 
 def cd_url(coord: str) -> str:
     return f"{CD_BASE}/{coord}"
@@ -51,25 +63,149 @@ def http_get(url: str, timeout=20) -> Optional[dict]:
     except Exception as e:
         return None
 
+def http_post_definitions(coords: List[str], timeout=60, attempts=5, backoff=2.0) -> Dict[str, dict]:
+    """POSTs a coordinate array to /definitions; returns {coord: definition}. Retries 429/5xx."""
+    body = json.dumps(coords).encode("utf-8")
+    for attempt in range(1, attempts + 1):
+        req = ul.Request(CD_BASE, data=body, method="POST",
+                         headers={"Content-Type": "application/json", "Accept": "application/json"})
+        try:
+            with ul.urlopen(req, timeout=timeout) as resp:
+                return json.loads(resp.read().decode("utf-8")) or {}
+        except ue.HTTPError as e:
+            if e.code not in RETRY_STATUS or attempt == attempts:
+                raise
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else backoff * attempt
+        except (ue.URLError, TimeoutError, ConnectionError):
+            if attempt == attempts:
+                raise
+            delay = backoff * attempt
+        time.sleep(delay)
+    return {}
+
 def cache_path(coord: str) -> Path:
     safe = coord.replace("/", "_")
     return CACHE_DIR / f"{safe}.json"
 
-def load_cached(coord: str) -> Optional[dict]:
-    p = cache_path(coord)
-    if p.exists():
-        try:
-            return json.loads(p.read_text())
-        except Exception:
+def _doc_coord(doc: dict) -> Optional[str]:
+    """Coordinate string from a definition's own `coordinates` block."""
+    c = doc.get("coordinates") if isinstance(doc, dict) else None
+    if not isinstance(c, dict) or not c.get("name"):
+        return None
+    parts = [c.get("type"), c.get("provider"), c.get("namespace") or "-", c.get("name")]
+    if c.get("revision"):
+        parts.append(c["revision"])
+    return "/".join(str(p) for p in parts)
+
+class DefinitionCache:
+    """coord -> ClearlyDefined definition, kept in one SQLite file."""
+
+    def __init__(self, path: Path = CACHE_DB, legacy_dir: Optional[Path] = CACHE_DIR):
+        self.path = Path(path)
+        self.legacy_dir = Path(legacy_dir) if legacy_dir else None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS definitions "
+                         "(coord TEXT PRIMARY KEY, doc TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        self._db.commit()
+
+    def _legacy(self, coord: str) -> Optional[dict]:
+        if self.legacy_dir is None:
             return None
-    return None
+        p = self.legacy_dir / f"{coord.replace('/', '_')}.json"
+        if p.exists():
+            try:
+                return json.loads(p.read_text())
+            except Exception:
+                return None
+        return None
 
-def save_cached(coord: str, data: dict):
-    p = cache_path(coord)
-    try:
-        p.write_text(json.dumps(data))
-    except Exception:
-        pass
+    def get_many(self, coords: Iterable[str]) -> Dict[str, dict]:
+        coords = list(dict.fromkeys(coords))
+        out: Dict[str, dict] = {}
+        with self._lock:
+            for i in range(0, len(coords), 500):
+                chunk = coords[i:i + 500]
+                q = f"SELECT coord, doc FROM definitions WHERE coord IN ({','.join('?' * len(chunk))})"
+                for coord, doc in self._db.execute(q, chunk):
+                    out[coord] = json.loads(doc)
+        # Fall back to the old per-file cache, moving hits into SQLite
+        migrated = {}
+        for coord in coords:
+            if coord not in out:
+                doc = self._legacy(coord)
+                if doc is not None:
+                    out[coord] = migrated[coord] = doc
+        if migrated:
+            self.put_many(migrated)
+        return out
+
+    def put_many(self, docs: Dict[str, dict]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO definitions VALUES (?, ?, ?)",
+                                 [(c, json.dumps(d), now) for c, d in docs.items()])
+            self._db.commit()
+
+    def migrate(self) -> int:
+        """Imports every legacy cache/clearlydefined/*.json; returns the number imported."""
+        if self.legacy_dir is None or not self.legacy_dir.is_dir():
+            return 0
+        docs = {}
+        for p in self.legacy_dir.glob("*.json"):
+            try:
+                doc = json.loads(p.read_text())
+            except Exception:
+                continue
+            coord = _doc_coord(doc)
+            if coord and cache_path(coord).name == p.name:
+                docs[coord] = doc
+        for i in range(0, len(docs), 1000):
+            self.put_many(dict(list(docs.items())[i:i + 1000]))
+        return len(docs)
+
+def fetch_definitions(coords: List[str], cache: DefinitionCache,
+                      batch_size: int = 100, workers: int = 4) -> Dict[str, dict]:
+    """Cached definitions for `coords`, POSTing the misses in concurrent chunks."""
+    found = cache.get_many(coords)
+    missing = [c for c in dict.fromkeys(coords) if c not in found]
+    print(f"[info] {len(found)} coordinates cached, {len(missing)} to fetch")
+    chunks = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(http_post_definitions, chunk): chunk for chunk in chunks}
+        for fut in as_completed(futures):
+            chunk = futures[fut]
+            try:
+                resp = fut.result()
+            except Exception as e:
+                print(f"[warn] batch of {len(chunk)} failed: {e}", file=sys.stderr)
+                continue
+            # The service may normalise coordinate case in its keys
+            by_lower = {k.lower(): v for k, v in resp.items()}
+            docs = {}
+            for c in chunk:
+                doc = resp.get(c) or by_lower.get(c.lower())
+                if doc:
+                    docs[c] = doc
+            cache.put_many(docs)
+            found.update(docs)
+    return found
+
+def fetch_definitions_single(coords: List[str], cache: DefinitionCache, sleep: float = 0.3) -> Dict[str, dict]:
+    """One GET per uncached coordinate, `sleep` seconds apart."""
+    found = cache.get_many(coords)
+    for coord in dict.fromkeys(coords):
+        if coord in found:
+            continue
+        doc = http_get(cd_url(coord))
+        if doc:
+            cache.put_many({coord: doc})
+            found[coord] = doc
+        time.sleep(sleep)
+    return found
 
 def guess_ecosystem(name: str) -> str:
     # Heuristics: scoped names -> npm, hyphenated lowercase -> npm, otherwise pypi fallback
@@ -136,51 +272,72 @@ def iter_spdx_csv(path: Path):
             repo = (row.get("repo") or "").strip()
             yield repo, pkg, ver
 
-def iter_edges_dir(path: Path):
-    for f in path.glob("*.csv"):
-        with open(f) as h:
-            r = csv.DictReader(h)
-            for row in r:
-                repo = (row.get("repo") or "").strip()
-                # Try both parent and child as packages (child is more likely a package)
-                child = (row.get("child") or "").strip()
-                ver = (row.get("version") or "").strip()
-                if child:
-                    yield repo, child, ver
+def iter_edges_dir(path: Path, store: bool = False, where=None):
+    if store:
+        from licensync.core.edge_store import EdgeStore
+        batches = EdgeStore(path).iter_batches(where, columns=("repo", "child", "version"))
+    else:
+        batches = iter_edge_batches(path, columns=("repo", "child", "version"))
+    for batch in batches:
+        # Try both parent and child as packages (child is more likely a package)
+        for repo, child, ver in zip(batch["repo"], batch["child"], batch["version"]):
+            child = child.strip()
+            if child:
+                yield repo.strip(), child, ver.strip()
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--from-spdx-csv", help="CSV from SPDX aligner (package->license)")
     ap.add_argument("--from-edges", help="Directory with edge CSVs")
+    ap.add_argument("--from-store", help="Columnar edge store (build_graph.py --parquet-dir)")
+    ap.add_argument("--where", nargs="*", default=None, help="With --from-store: column=value filters, e.g. lic_child=unknown")
     ap.add_argument("--out", default="baselines/clearlydefined_licenses.csv")
-    ap.add_argument("--sleep", type=float, default=0.3, help="Sleep seconds between requests (politeness)")
+    ap.add_argument("--mode", choices=["batch", "single"], default="batch",
+                    help="batch: POST coordinate arrays to /definitions; single: one GET per coordinate")
+    ap.add_argument("--batch-size", type=int, default=100, help="Coordinates per POST")
+    ap.add_argument("--workers", type=int, default=4, help="POSTs in flight at once")
+    ap.add_argument("--sleep", type=float, default=0.3, help="--mode single: sleep seconds between requests (politeness)")
+    ap.add_argument("--cache-db", default=str(CACHE_DB))
+    ap.add_argument("--migrate-cache", action="store_true",
+                    help="Import the legacy cache/clearlydefined/*.json files into --cache-db")
     args = ap.parse_args()
 
-    ensure_cache()
+    cache = DefinitionCache(Path(args.cache_db))
+    if args.migrate_cache:
+        print(f"[ok] imported {cache.migrate()} cached definitions from {CACHE_DIR} into {args.cache_db}")
+        if not (args.from_spdx_csv or args.from_edges or args.from_store):
+            return
 
     it = []
     if args.from_spdx_csv:
         it = iter_spdx_csv(Path(args.from_spdx_csv))
     elif args.from_edges:
         it = iter_edges_dir(Path(args.from_edges))
+    elif args.from_store:
+        from licensync.core.edge_store import parse_filters
+        it = iter_edges_dir(Path(args.from_store), store=True, where=parse_filters(args.where))
     else:
-        print("[fatal] provide --from-spdx-csv or --from-edges", file=sys.stderr)
+        print("[fatal] provide --from-spdx-csv, --from-edges or --from-store", file=sys.stderr)
         sys.exit(2)
 
     seen = set()
-    rows = []
+    wanted = []
     for repo, pkg, ver in it:
         coord = to_coord(pkg, ver, repo=repo)
         if not coord or coord in seen:
             continue
         seen.add(coord)
-        doc = load_cached(coord)
-        if doc is None:
-            url = cd_url(coord)
-            doc = http_get(url)
-            if doc:
-                save_cached(coord, doc)
-            time.sleep(args.sleep)
+        wanted.append((coord, repo, pkg, ver))
+
+    coords = [w[0] for w in wanted]
+    if args.mode == "batch":
+        docs = fetch_definitions(coords, cache, batch_size=args.batch_size, workers=args.workers)
+    else:
+        docs = fetch_definitions_single(coords, cache, sleep=args.sleep)
+
+    rows = []
+    for coord, repo, pkg, ver in wanted:
+        doc = docs.get(coord)
         lic = pick_license(doc) if doc else ""
         rows.append(dict(coord=coord, repo=repo, package=pkg, version=ver, license=lic))
 
@@ -8,7 +8,7 @@
 # - conservative baseline by default (unknown pairs => incompatible, toggleable)
 # - clearer errors when truth has no labels
 
-import os, sys, csv, json, random, argparse, importlib
+import os, sys, csv, json, argparse, importlib
 from pathlib import Path
 from typing import Dict, Tuple
 
@@ -18,17 +18,25 @@ if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
 def _import_eval_and_norm():
-    """Import evaluate_license_pair and normalize_license from your package."""
+    """Import a batch evaluator and normalize_license from your package.
+
+    Returns (eval_batch, normalize_license) where eval_batch takes a list of
+    (lic_parent, lic_child, jurisdiction) tuples and returns aligned results.
+    """
     eval_fn = None
     norm_fn = None
 
-    # evaluator
+    # evaluator (prefer the deduplicating batch API, else wrap the single-pair one)
     for modname in ["licensync.core.prolog_interface", "licensync.prolog_interface", "prolog_interface"]:
         try:
             mod = importlib.import_module(modname)
+            batch = getattr(mod, "evaluate_pairs", None)
             fn = getattr(mod, "evaluate_license_pair", None)
-            if callable(fn):
-                eval_fn = fn
+            if callable(batch):
+                eval_fn = batch
+            elif callable(fn):
+                eval_fn = lambda triples, _fn=fn: [_fn(*t) for t in triples]
+            if eval_fn is not None:
                 print(f"[info] using evaluator from {mod.__file__}")
                 break
         except Exception:
@@ -67,6 +75,8 @@ def to_prolog_atom(spdx: str, normalize_license=None) -> str:
 
 def coerce_verdict(v):
     """Return (bool_or_None, status_str) where None means unknown/skip."""
+    if isinstance(v, dict):
+        v = v.get("result", "unknown")
     if isinstance(v, bool):
         return v, "ok"
     s = str(v).strip().lower()
@@ -80,15 +90,12 @@ def coerce_verdict(v):
     return None, "unknown"
 
 def baseline_from_csv(path: Path) -> Dict[Tuple[str,str], bool]:
-    import pandas as pd
+    from licensync.core.edge_stream import iter_edge_batches
     tbl = {}
     if path.exists():
-        df = pd.read_csv(path)
-        for _, row in df.iterrows():
-            lp = str(row["lic_parent"]).strip()
-            lc = str(row["lic_child"]).strip()
-            ok = bool(int(row["ok"]))
-            tbl[(lp, lc)] = ok
+        for batch in iter_edge_batches(path, columns=("lic_parent", "lic_child", "ok")):
+            for lp, lc, ok in zip(batch["lic_parent"], batch["lic_child"], batch["ok"]):
+                tbl[(lp.strip(), lc.strip())] = bool(int(ok))
     return tbl
 
 def spdx_matrix_ok(lic_parent: str, lic_child: str, tbl, default_ok: bool=False) -> bool:
@@ -96,38 +103,17 @@ def spdx_matrix_ok(lic_parent: str, lic_child: str, tbl, default_ok: bool=False)
     return tbl.get((lic_parent, lic_child), default_ok)
 
 def f1_from_counts(tp, fp, fn):
-    prec = tp / (tp + fp) if (tp + fp) else 0.0
-    rec  = tp / (tp + fn) if (tp + fn) else 0.0
-    f1   = 2*prec*rec/(prec+rec) if (prec+rec) else 0.0
-    return prec, rec, f1
+    from licensync.core.metrics import f1_from_counts as _f1
+    return _f1(tp, fp, fn)
 
 def bootstrap_f1(samples, n_boot=1000, seed=42):
-    rng = random.Random(seed)
-    scores = []
-    n = len(samples)
-    if n == 0:
-        return 0.0, 0.0, 0.0
-    for _ in range(n_boot):
-        tp=fp=fn=0
-        for (y_true, y_pred) in (samples[rng.randrange(n)] for _ in range(n)):
-            if y_pred and y_true: tp += 1
-            elif y_pred and not y_true: fp += 1
-            elif (not y_pred) and y_true: fn += 1
-        _, _, f1 = f1_from_counts(tp, fp, fn)
-        scores.append(f1)
-    scores.sort()
-    lo = scores[int(0.025*len(scores))]
-    hi = scores[int(0.975*len(scores))]
-    med = scores[int(0.5*len(scores))]
-    return med, lo, hi
+    """(median, lo, hi) F1 over bootstrap replicates of (y_true, y_pred) samples."""
+    from licensync.core.metrics import bootstrap_f1 as _bootstrap
+    return _bootstrap([t for t, _ in samples], [p for _, p in samples], n_boot=n_boot, seed=seed)
 
 def mcnemar(b01, b10):
-    from math import comb
-    n = b01 + b10
-    if n == 0: return 1.0
-    tail = sum(comb(n, k) for k in range(0, min(b01, b10)+1)) / (2**n)
-    p = 2*tail
-    return min(1.0, p)
+    from licensync.core.metrics import mcnemar_exact
+    return mcnemar_exact(b01, b10)
 
 def main():
     ap = argparse.ArgumentParser(description="Evaluate edge-level compatibility vs. ground truth (LicenSync vs SPDX baseline)")
@@ -137,15 +123,17 @@ def main():
     ap.add_argument("--baseline-default", choices=["true","false"], default="false",
                     help="What to return when a pair isn't in the matrix (default: false => incompatible)")
     ap.add_argument("--out", default="results/eval_summary.json")
+    ap.add_argument("--n-boot", type=int, default=1000, help="Bootstrap replicates for the F1 CIs")
+    ap.add_argument("--seed", type=int, default=42)
     args = ap.parse_args()
 
     eval_fn, normalize_license = _import_eval_and_norm()
 
     # read truth (skip commented lines)
+    from licensync.core.edge_stream import TRUTH_COLUMNS, iter_edge_batches
     rows = []
-    with open(args.truth) as f:
-        reader = csv.DictReader((line for line in f if not line.lstrip().startswith("#")))
-        for r in reader:
+    for batch in iter_edge_batches(args.truth, columns=TRUTH_COLUMNS):
+        for r in batch.rows():
             lab = (r.get("label") or "").strip().lower()
             if lab not in {"compatible","incompatible"}:
                 continue  # only keep labeled rows
@@ -167,22 +155,24 @@ def main():
     evaluated=0
     skipped_unknown=0
 
+    # LicenSync predictions: one batched call, each distinct pair evaluated once
+    triples = []
     for r in rows:
-        y_true = (str(r["label"]).strip().lower() == "compatible")
         juris = (args.jurisdiction or r.get("jurisdiction") or "US").strip()
-
+        lp = to_prolog_atom(r.get("lic_parent",""), normalize_license)
+        lc = to_prolog_atom(r.get("lic_child",""), normalize_license)
+        triples.append((lp, lc, juris))
+    try:
+        preds = eval_fn(triples)
+    except Exception:
+        # treat runtime errors as unknown (skip)
+        preds = [None] * len(rows)
+
+    for r, yL_raw in zip(rows, preds):
+        y_true = (str(r["label"]).strip().lower() == "compatible")
         lp_raw = r.get("lic_parent","")
         lc_raw = r.get("lic_child","")
-        lp = to_prolog_atom(lp_raw, normalize_license)
-        lc = to_prolog_atom(lc_raw, normalize_license)
 
-        # LicenSync prediction
-        try:
-            yL_raw = eval_fn(lp, lc, juris)
-        except Exception:
-            # treat runtime errors as unknown (skip)
-            skipped_unknown += 1
-            continue
         yL_bool, status = coerce_verdict(yL_raw)
         if yL_bool is None:
             skipped_unknown += 1
@@ -210,8 +200,8 @@ def main():
 
     l_prec, l_rec, l_f1 = f1_from_counts(l_tp, l_fp, l_fn)
     b_prec, b_rec, b_f1 = f1_from_counts(b_tp, b_fp, b_fn)
-    l_med, l_lo, l_hi = bootstrap_f1(samples_L)
-    b_med, b_lo, b_hi = bootstrap_f1(samples_B)
+    l_med, l_lo, l_hi = bootstrap_f1(samples_L, n_boot=args.n_boot, seed=args.seed)
+    b_med, b_lo, b_hi = bootstrap_f1(samples_B, n_boot=args.n_boot, seed=args.seed)
     pval = mcnemar(b01, b10)
 
     coverage = evaluated / n_total if n_total else 0.0
@@ -2,7 +2,7 @@
 # In licensync/scripts/final_verification.py
 
 import pandas as pd
-from licensync.core.prolog_interface import evaluate_license_pair
+from licensync.core.prolog_interface import evaluate_pairs
 from licensync.scripts.advanced_eval import calculate_metrics, bootstrap_f1_ci
 
 def run_final_verification_with_comparison():
@@ -65,8 +65,7 @@ def run_final_verification_with_comparison():
     # --- Get Predictions for LicenSync ---
     licensync_preds = []
     licensync_risks = []
-    for _, row in truth_df.iterrows():
-        response = evaluate_license_pair(row["lic_parent"], row["lic_child"], row["jurisdiction"])
+    for response in evaluate_pairs(truth_df):
         verdict = response.get("result", "unknown_license")
         risk = response.get("risk", "undefined")
         licensync_risks.append(risk.capitalize())
@@ -25,10 +25,19 @@ def main():
     # Perf bar
     perfj = json.loads(Path(args.perf).read_text())
     fig = plt.figure()
-    xs = ["Edges", "Seconds"]
-    ys = [perfj.get("edges", 0), perfj.get("seconds", 0.0)]
-    plt.bar(xs, ys)
-    plt.title("Performance (total edges & seconds)")
+    stages = {k: v for k, v in perfj.get("stages", {}).items() if "p50_ms" in v}
+    if stages:
+        xs = list(stages)
+        plt.bar(xs, [v["p50_ms"] for v in stages.values()],
+                yerr=[[0] * len(xs), [v["p95_ms"] - v["p50_ms"] for v in stages.values()]])
+        plt.yscale("log"); plt.ylabel("ms (p50, bar to p95)"); plt.xticks(rotation=30, ha="right")
+        plt.title("Per-stage latency")
+        plt.tight_layout()
+    else:
+        xs = ["Edges", "Seconds"]
+        ys = [perfj.get("edges", 0), perfj.get("seconds", 0.0)]
+        plt.bar(xs, ys)
+        plt.title("Performance (total edges & seconds)")
     plt.savefig(Path(args.outdir)/"perf_bar.png", dpi=200)
 
 if __name__ == "__main__":
@@ -1,26 +1,21 @@
 #!/usr/bin/env python3
-import argparse, csv, random
+import argparse, csv, random, sys
 from pathlib import Path
 
-def read_edges(edges_dir: Path):
-    rows = []
-    for f in sorted(edges_dir.glob("*.csv")):
-        with f.open() as fh:
-            r = csv.DictReader(fh)
-            need = {"repo","sha","parent","child","lic_parent","lic_child"}
-            if not need.issubset(r.fieldnames or set()):
-                print(f"[warn] {f} missing columns {need - set(r.fieldnames or [])}; skipping")
-                continue
-            for row in r:
-                rows.append({
-                    "repo": row["repo"],
-                    "sha": row.get("sha",""),
-                    "parent": row["parent"],
-                    "child": row["child"],
-                    "lic_parent": row.get("lic_parent","unknown"),
-                    "lic_child": row.get("lic_child","unknown"),
-                })
-    return rows
+# Make `licensync.*` importable when run as a plain script
+_PKG_PARENT = str(Path(__file__).resolve().parents[2])
+if _PKG_PARENT not in sys.path:
+    sys.path.insert(0, _PKG_PARENT)
+from licensync.core.edge_stream import EDGE_COLUMNS, iter_edge_batches
+
+def read_edges(edges_dir: Path, store: str = None, where=None):
+    if store:
+        from licensync.core.edge_store import EdgeStore
+        batches = EdgeStore(store).iter_batches(where)
+    else:
+        batches = iter_edge_batches(edges_dir, require=EDGE_COLUMNS)
+    for batch in batches:
+        yield from batch.rows()
 
 def dedupe(rows):
     seen, out = set(), []
@@ -39,18 +34,23 @@ def main():
     ap.add_argument("--n", type=int, default=500, help="Sample this many edges total")
     ap.add_argument("--per-repo", type=int, default=0, help="If >0, sample this many edges per repo")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--store", default=None, help="Read edges from a columnar store (build_graph.py --parquet-dir) instead")
+    ap.add_argument("--where", nargs="*", default=None, help="With --store: column=value filters, e.g. repo=apache/airflow")
     args = ap.parse_args()
 
-    edges_dir = Path(args.edges_dir)
+    edges_dir = Path(args.store or args.edges_dir)
     if not edges_dir.exists():
         print(f"[error] {edges_dir} not found. Run scripts/build_graph.py first.")
         return
 
-    rows = read_edges(edges_dir)
+    where = None
+    if args.store:
+        from licensync.core.edge_store import parse_filters
+        where = parse_filters(args.where)
+    rows = dedupe(read_edges(edges_dir, args.store, where))
     if not rows:
         print(f"[error] No usable edge CSVs found in {edges_dir}.")
         return
-    rows = dedupe(rows)
 
     random.seed(args.seed)
     if args.per_repo > 0:
@@ -2,7 +2,9 @@ import os
 import pandas as pd
 import requests
 import json
-from typing import Set, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, Optional, Set, List, Tuple
 import time
 import traceback
 
@@ -10,6 +12,8 @@ import traceback
 from licensync.core.dependency_parser import load_dependencies, flatten_sbom
 from licensync.core.github_api import fetch_github_sbom
 from licensync.core.license_utils import normalize_license
+from licensync.core.cache import PackageLicenseCache, get_package_license_cache
+from licensync.core.rate_limit import HostRateLimiter
 
 # --- Configuration ---
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
@@ -41,6 +45,22 @@ SCANCODE_RESULTS_DIR = "licensync/data/scancode-results"
 
 # --- NEW: Multi-Source Enrichment Functions ---
 
+# Requests per second allowed to each host; every worker shares these buckets
+HOST_RATES = {
+    "api.clearlydefined.io": float(os.getenv("LICENSYNC_CD_RPS", "4")),
+    "pypi.org": float(os.getenv("LICENSYNC_PYPI_RPS", "10")),
+    "registry.npmjs.org": float(os.getenv("LICENSYNC_NPM_RPS", "10")),
+}
+ENRICH_WORKERS = int(os.getenv("LICENSYNC_ENRICH_WORKERS", "16"))
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=len(HOST_RATES), pool_maxsize=ENRICH_WORKERS))
+_limiter = HostRateLimiter(HOST_RATES)
+
+def _get(url: str) -> requests.Response:
+    _limiter.acquire(url)
+    return _session.get(url, timeout=10)
+
 def enrich_from_clearlydefined(name: str, ecosystem: str) -> str:
     """Tries to get a license from the ClearlyDefined API."""
     if ecosystem == "pypi":
@@ -51,7 +71,7 @@ def enrich_from_clearlydefined(name: str, ecosystem: str) -> str:
         return 'unknown'
 
     try:
-        res = requests.get(cd_url, timeout=10)
+        res = _get(cd_url)
         if res.status_code == 200:
             data = res.json()
             return data.get('licensed', {}).get('declared', 'unknown')
@@ -64,7 +84,7 @@ def enrich_from_native_registry(name: str, ecosystem: str) -> str:
     if ecosystem == "pypi":
         registry_url = f"https://pypi.org/pypi/{name}/json"
         try:
-            res = requests.get(registry_url, timeout=10)
+            res = _get(registry_url)
             if res.status_code == 200:
                 # PyPI license info is often in classifiers or the 'license' field
                 info = res.json().get('info', {})
@@ -80,39 +100,72 @@ def enrich_from_native_registry(name: str, ecosystem: str) -> str:
     elif ecosystem == "npm":
         registry_url = f"https://registry.npmjs.org/{name}"
         try:
-            res = requests.get(registry_url, timeout=10)
+            res = _get(registry_url)
             if res.status_code == 200:
                 return res.json().get('license', 'unknown')
         except requests.RequestException:
             return 'unknown'
     return 'unknown'
 
+def enrich_one(name: str, ecosystem: str) -> Tuple[str, str]:
+    """ClearlyDefined first, then the native registry; returns (license, source)."""
+    license = enrich_from_clearlydefined(name, ecosystem)
+    if license and license != 'unknown':
+        return normalize_license(license), "clearlydefined"
+    license = enrich_from_native_registry(name, ecosystem)
+    if license and license != 'unknown':
+        return normalize_license(license), "registry"
+    return 'unknown', ""
+
+def enrich_packages(packages: Iterable[Tuple[str, str]],
+                    workers: int = ENRICH_WORKERS,
+                    cache: Optional[PackageLicenseCache] = None) -> Dict[Tuple[str, str], str]:
+    """
+    Licenses for a set of (name, ecosystem) packages. Each distinct package is
+    looked up once: cached answers are reused, the rest are fetched by a thread
+    pool (rate limited per host) and written back to the cache.
+    """
+    cache = cache or get_package_license_cache()
+    wanted = list(dict.fromkeys(packages))
+    cached = cache.get_many((eco, name) for name, eco in wanted)
+    found = {(name, eco): cached[(eco, name)] for name, eco in wanted if (eco, name) in cached}
+    missing = [p for p in wanted if p not in found]
+    print(f"    -> {len(wanted)} packages: {len(found)} cached, {len(missing)} to fetch")
+    if not missing:
+        return found
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(enrich_one, name, eco): (name, eco) for name, eco in missing}
+        for fut in as_completed(futures):
+            name, eco = futures[fut]
+            try:
+                license, source = fut.result()
+            except Exception as e:
+                print(f"      -> {name} ({eco}) failed: {e}")
+                continue
+            found[(name, eco)] = license
+            cache.put(eco, name, license, source)
+            done += 1
+            if done % 250 == 0:
+                print(f"      -> fetched {done}/{len(missing)}")
+    return found
+
 def enrich_licenses_waterfall(dependencies: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
     """
     The main enrichment function. Takes (name, ecosystem) tuples and tries
     multiple sources to find a license.
     """
-    enriched_deps = []
-    for name, ecosystem in dependencies:
-        print(f"    -> Enriching '{name}' ({ecosystem})...")
-        time.sleep(0.25)  # Rate limit
-
-        # 1. Try ClearlyDefined first
-        license = enrich_from_clearlydefined(name, ecosystem)
-
-        # 2. If it fails, try the native registry
-        if license == 'unknown' or not license:
-            print(f"      -> ClearlyDefined failed, trying native registry...")
-            license = enrich_from_native_registry(name, ecosystem)
-
-        final_license = normalize_license(license)
-        print(f"      -> Found license: {final_license}")
-        enriched_deps.append((name, final_license))
-            
-    return enriched_deps
+    licenses = enrich_packages(dependencies)
+    return [(name, licenses.get((name, ecosystem), 'unknown')) for name, ecosystem in dependencies]
 
 # --- Modified Experiment Logic ---
 
+def _licensync_coverage(initial_deps, licenses) -> Tuple[Set[str], Set[str]]:
+    licensed_deps = {name for name, eco in initial_deps if licenses.get((name, eco), 'unknown') != 'unknown'}
+    all_deps = {name for name, _ in initial_deps}
+    return licensed_deps, all_deps
+
 def get_licensync_deps(repo: str, token: str) -> Tuple[Set[str], Set[str]]:
     """Runs your tool and enriches the results using the new waterfall method."""
     print(f"[LicenSync] Analyzing {repo}...")
@@ -120,13 +173,10 @@ def get_licensync_deps(repo: str, token: str) -> Tuple[Set[str], Set[str]]:
     
     if initial_deps:
         print(f"  -> Enriching licenses for {len(initial_deps)} dependencies...")
-        enriched_dependencies = enrich_licenses_waterfall(initial_deps)
+        licenses = enrich_packages(initial_deps)
     else:
-        enriched_dependencies = []
-
-    licensed_deps = {name for name, license in enriched_dependencies if license != 'unknown'}
-    all_deps = {name for name, _ in initial_deps}
-    return licensed_deps, all_deps
+        licenses = {}
+    return _licensync_coverage(initial_deps, licenses)
 
 # (The rest of the script, get_github_api_deps and run_experiment, remains the same)
 def get_github_api_deps(repo: str, token: str) -> Tuple[Set[str], Set[str]]:
@@ -179,12 +229,26 @@ def run_experiment():
     if not projects_to_test:
         return
     
+    projects_to_test = [p for p in projects_to_test if p]
+
+    # Collect every project's dependencies first, then enrich the union in one
+    # pass so packages shared across projects are fetched once.
+    deps_by_project = {}
+    for project in projects_to_test:
+        print(f"[LicenSync] Analyzing {project}...")
+        try:
+            deps_by_project[project] = load_dependencies(local_path=None, gh_repo=project, gh_token=GITHUB_TOKEN)
+        except Exception:
+            traceback.print_exc()
+            deps_by_project[project] = []
+    all_packages = [dep for deps in deps_by_project.values() for dep in deps]
+    print(f"[LicenSync] Enriching {len(set(all_packages))} distinct packages across {len(deps_by_project)} projects...")
+    licenses = enrich_packages(all_packages)
+
     results = []
-    # Now, loop through the list of projects correctly
     for project in projects_to_test:
-        if not project: continue
         # Get data from both your tool and the baseline
-        ls_licensed, ls_all = get_licensync_deps(project, GITHUB_TOKEN)
+        ls_licensed, ls_all = _licensync_coverage(deps_by_project[project], licenses)
         gh_licensed, gh_all = get_github_api_deps(project, GITHUB_TOKEN)
 
         master_list_deps = ls_all.union(gh_all)
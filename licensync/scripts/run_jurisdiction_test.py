@@ -2,7 +2,7 @@
 # In licensync/scripts/run_jurisdiction_test.py
 
 import pandas as pd
-from licensync.core.prolog_interface import evaluate_license_pair
+from licensync.core.prolog_interface import evaluate_pairs
 
 def run_jurisdiction_experiment():
     """
@@ -78,17 +78,20 @@ def run_jurisdiction_experiment():
     
     print(f"Analyzing {len(unique_pairs)} unique license pairs across multiple jurisdictions...")
 
-    for pair in unique_pairs:
-        lic1, lic2 = pair
-        
+    # One batched evaluation per jurisdiction instead of one call per pair
+    pairs = sorted(unique_pairs)
+    global_verdicts = evaluate_pairs(pairs, 'global')
+    juris_verdicts = {juris: evaluate_pairs(pairs, juris) for juris in ['us', 'eu', 'de']}
+
+    for i, (lic1, lic2) in enumerate(pairs):
         # Get the 'global' verdict as the baseline for this pair
-        global_verdict = evaluate_license_pair(lic1, lic2, 'global')
-        
+        global_verdict = global_verdicts[i]
+
         # Check other jurisdictions to see if the verdict flips
         for juris in ['us', 'eu', 'de']:
-            juris_verdict = evaluate_license_pair(lic1, lic2, juris)
-            
-            if juris_verdict != global_verdict and 'unknown' not in juris_verdict:
+            juris_verdict = juris_verdicts[juris][i]
+
+            if juris_verdict != global_verdict and 'unknown' not in juris_verdict["result"]:
                 flips.append({
                     "Test Case": f"{lic1} vs. {lic2}",
                     "Global Verdict": global_verdict,